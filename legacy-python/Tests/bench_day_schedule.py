@@ -0,0 +1,28 @@
+import sys
+import os
+import timeit
+from datetime import date, datetime
+
+# Add parent directory to path to import day_schedule
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from day_schedule import DaySchedule
+from prayer_api import get_next_prayer
+
+TIMINGS = {"Fajr": "05:00", "Sunrise": "06:30", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+NOW = datetime(2024, 3, 1, 16, 20, 5)
+
+def bench(number=200000):
+    schedule = DaySchedule(TIMINGS, date(2024, 3, 1))
+    cases = [
+        ("get_next_prayer", lambda: get_next_prayer(TIMINGS, NOW)),
+        ("DaySchedule.lookup", lambda: schedule.lookup(NOW)),
+        ("DaySchedule.next_prayer", lambda: schedule.next_prayer(NOW)),
+        ("DaySchedule(...) build", lambda: DaySchedule(TIMINGS, date(2024, 3, 1))),
+    ]
+    for label, fn in cases:
+        per_call = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        print(f"{label:<25} {per_call * 1e9:8.0f} ns/call")
+
+if __name__ == "__main__":
+    bench()
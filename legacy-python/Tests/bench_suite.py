@@ -0,0 +1,413 @@
+import sys
+import os
+import re
+import json
+import time
+import timeit
+import shutil
+import platform
+import argparse
+import itertools
+import tempfile
+import statistics
+import subprocess
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import prayer_api
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import prayer_api
+from day_schedule import DaySchedule
+from stub_server import StubServer, DEFAULT_ROUTES
+
+# Recorded Aladhan, ip-api and ArcGIS responses, all served by one stub
+ROUTES = dict(DEFAULT_ROUTES, **{
+    "/json": "ip_api.json",
+    "/arcgis/rest/services/World/GeocodeServer/find": "arcgis_find.json",
+})
+FORMAT_VERSION = 1
+LOCATION = (51.5074, -0.1278, "London")
+DAY = date(2024, 3, 15)  # The month the calendar fixture was recorded for
+TIMINGS = {"Fajr": "04:42", "Sunrise": "06:14", "Dhuhr": "12:09", "Asr": "15:21", "Maghrib": "18:06", "Isha": "19:38"}
+# Compared medians this much slower than the baseline count as regressions
+THRESHOLD = 1.25
+
+class BenchEnv:
+    """
+    Temporary working directory with prayer_api pointed at a local stub, so
+    nothing reaches the real APIs and every run starts from the same state.
+    """
+    SETTINGS = ("API_URL", "IP_API_URL", "ARCGIS_URL", "CACHE_FILE", "CACHE_BACKEND",
+                "PREFETCH", "CACHE_TTL_DAYS")
+
+    def __enter__(self):
+        self.stub = StubServer(ROUTES).start()
+        self.tmp = tempfile.mkdtemp(prefix="salah-bench-")
+        self.old_cwd = os.getcwd()
+        self.old = {name: getattr(prayer_api, name) for name in self.SETTINGS}
+        self.old_env = {name: os.environ.get(name) for name in ("SALAH_SERVICE", "SALAH_CONFIG_DIR")}
+        os.chdir(self.tmp)
+        # Never talk to a salah_service that happens to be running
+        os.environ["SALAH_SERVICE"] = os.path.join(self.tmp, "no-service.sock")
+        # settings.json is the one written here, not the user's
+        os.environ["SALAH_CONFIG_DIR"] = self.tmp
+        prayer_api.API_URL = self.stub.url + "/v1"
+        prayer_api.IP_API_URL = self.stub.url + "/json"
+        prayer_api.ARCGIS_URL = self.stub.url + "/arcgis/rest/services/World/GeocodeServer/find"
+        prayer_api.CACHE_FILE = os.path.join(self.tmp, "prayer_cache.json")
+        prayer_api.CACHE_BACKEND = "json"
+        prayer_api.PREFETCH = "month"
+        prayer_api.CACHE_TTL_DAYS = None  # The fixtures are from a past month
+        self.reset_cache()
+        return self
+
+    def reset_cache(self):
+        """Drops the in-memory cache so the next lookup loads CACHE_FILE from disk"""
+        if prayer_api._cache is not None:
+            prayer_api._cache.close()
+        prayer_api._cache = None
+
+    def __exit__(self, *exc):
+        self.reset_cache()
+        os.chdir(self.old_cwd)
+        for name, value in self.old.items():
+            setattr(prayer_api, name, value)
+        for name, value in self.old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self.stub.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+def summarize(name, samples, number, **extra):
+    """One result record: seconds per call over `samples` (one per repeat)"""
+    return dict({
+        "name": name,
+        "unit": "s",
+        "number": number,
+        "repeat": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "max": max(samples),
+    }, **extra)
+
+def measure(fn, number, repeat, setup=None):
+    """Seconds per call of fn, one sample per repeat; setup runs untimed before every call"""
+    if setup is None:
+        return [t / number for t in timeit.repeat(fn, number=number, repeat=repeat)]
+    samples = []
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(number):
+            setup()
+            start = time.perf_counter()
+            fn()
+            total += time.perf_counter() - start
+        samples.append(total / number)
+    return samples
+
+def bench_fetch(env, scale):
+    lat, lon, _ = LOCATION
+    results = []
+
+    prayer_api.fetch_prayer_times(lat, lon, DAY)
+    samples = measure(lambda: prayer_api.fetch_prayer_times(lat, lon, DAY), 2000 * scale, 5)
+    results.append(summarize("fetch_prayer_times/hit", samples, 2000 * scale))
+
+    # Every call lands in a tile nobody has asked for, so it prefetches a month from the stub
+    points = ((lat + 0.1 * i, lon) for i in range(1, 10 ** 6))
+    requests_before = len(env.stub.requests)
+    samples = measure(lambda: prayer_api.fetch_prayer_times(*next(points), DAY), 10 * scale, 3)
+    results.append(summarize("fetch_prayer_times/miss", samples, 10 * scale,
+                             requests=len(env.stub.requests) - requests_before))
+
+    # First lookup after start: CACHE_FILE (full of other tiles) is read and parsed
+    env.reset_cache()
+    samples = measure(lambda: prayer_api.fetch_prayer_times(lat, lon, DAY), 5 * scale, 3,
+                      setup=env.reset_cache)
+    results.append(summarize("fetch_prayer_times/cold_file", samples, 5 * scale,
+                             file_bytes=os.path.getsize(prayer_api.CACHE_FILE)))
+    return results
+
+def bench_tick(env, scale):
+    schedule = DaySchedule(TIMINGS, date.today())
+
+    def legacy_tick():
+        # What every tick cost before DaySchedule
+        now = datetime.now()
+        _, when = prayer_api.get_next_prayer(TIMINGS, now)
+        prayer_api.format_countdown(when - now)
+
+    def tick():
+        _, remaining = schedule.lookup()
+        prayer_api.format_countdown(remaining)
+
+    return [
+        summarize("tick/get_next_prayer+format_countdown",
+                  measure(legacy_tick, 20000 * scale, 5), 20000 * scale),
+        summarize("tick/DaySchedule.lookup+format_countdown",
+                  measure(tick, 20000 * scale, 5), 20000 * scale),
+    ]
+
+def bench_widget(env, scale):
+    from PyQt6.QtWidgets import QApplication
+    from widget import SalahWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    lat, lon, city = LOCATION
+    with open("settings.json", "w") as f:
+        loc = {"name": city, "lat": lat, "lon": lon}
+        json.dump({"active_location": loc, "saved_locations": [loc]}, f)
+    widget = SalahWidget()
+    widget.show()
+    # Let the startup refresh and warm-up land before timing ticks
+    widget.fetcher.wait()
+    app.processEvents()
+
+    results = []
+    for expanded in (False, True):
+        widget.expanded = expanded
+        widget.list_container.setVisible(expanded)
+        app.processEvents()
+
+        def tick():
+            widget.update_times()
+            app.processEvents()  # Includes the repaint the tick caused
+
+        samples = measure(tick, 2000 * scale, 5)
+        name = "expanded" if expanded else "collapsed"
+        results.append(summarize(f"widget/update_times/{name}", samples, 2000 * scale))
+    widget.close()
+    widget.fetcher.wait()
+    return results
+
+def bench_network(env, scale):
+    results = []
+    for name, fn in (("get_location/ip-api", prayer_api.get_location),
+                     ("search_location/gazetteer", lambda: prayer_api.search_location("London")),
+                     ("search_location/arcgis", lambda: prayer_api.search_location("Bradford on Avon"))):
+        fn()  # Imports, gazetteer index and connection set up outside the timing
+        results.append(summarize(name, measure(fn, 20 * scale, 3), 20 * scale))
+    return results
+
+FIRST_PAINT = re.compile(r"Time to first paint: ([\d.]+) ms")
+IMPORTS = re.compile(r"Import time: ([\d.]+) ms")
+
+def _run_dir(env, name):
+    """A directory with settings and a warm cache for fresh processes, and the environment to run them in"""
+    lat, lon, city = LOCATION
+    run_dir = os.path.join(env.tmp, name)
+    os.makedirs(run_dir, exist_ok=True)
+    today = date.today()
+    prayer_api.warm_cache([(lat, lon)], [today, today + timedelta(days=1)])
+    env.reset_cache()
+    shutil.copy(prayer_api.CACHE_FILE, os.path.join(run_dir, "prayer_cache.json"))
+    with open(os.path.join(run_dir, "settings.json"), "w") as f:
+        loc = {"name": city, "lat": lat, "lon": lon}
+        json.dump({"active_location": loc, "saved_locations": [loc]}, f)
+
+    proc_env = dict(os.environ, QT_QPA_PLATFORM="offscreen", SALAH_SERVICE=os.path.join(run_dir, "none.sock"),
+                    SALAH_CONFIG_DIR=run_dir,
+                    # Anything that does reach for the network gets the stub
+                    HTTP_PROXY=env.stub.url, http_proxy=env.stub.url, NO_PROXY="", no_proxy="")
+    return run_dir, proc_env
+
+def bench_startup(env, scale):
+    """main.py --startup-profile in fresh processes, with settings and a warm cache on disk"""
+    run_dir, proc_env = _run_dir(env, "startup")
+    paints, imports = [], []
+    for _ in range(3 * scale):
+        out = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--startup-profile"],
+                             cwd=run_dir, env=proc_env, capture_output=True, text=True, timeout=120)
+        paint, imported = FIRST_PAINT.search(out.stdout), IMPORTS.search(out.stdout)
+        if not paint:
+            raise RuntimeError(f"No first paint reported:\n{out.stdout}{out.stderr}")
+        paints.append(float(paint.group(1)) / 1000)
+        imports.append(float(imported.group(1)) / 1000)
+    return [summarize("startup/first_paint", paints, 1), summarize("startup/imports", imports, 1)]
+
+def rss_probe(painted):
+    """Run in a fresh process: prints the time and memory one expanded widget takes, as JSON"""
+    import psutil
+    from PyQt6.QtWidgets import QApplication, QLabel
+    import widget
+
+    app = QApplication(sys.argv[:1])
+    # Fonts and the platform plugin are loaded either way; only the widget itself counts
+    warm = QLabel("--:--")
+    warm.show()
+    app.processEvents()
+    warm.close()
+    process = psutil.Process()
+    before = process.memory_info().rss
+    start = time.perf_counter()
+    window = widget.SalahWidget(painted=painted)
+    window.expanded = True
+    window.list_container.setVisible(True)
+    window.update_times()
+    window.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    rss_kb = (process.memory_info().rss - before) / 1024
+    print(json.dumps({"seconds": elapsed, "rss_kb": rss_kb}))
+    window.fetcher.wait()
+
+def bench_render(env, scale):
+    """The styled widget tree against the QPainter view (main.py --painted)"""
+    from PyQt6.QtWidgets import QApplication
+    from widget import SalahWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    lat, lon, city = LOCATION
+    with open("settings.json", "w") as f:
+        loc = {"name": city, "lat": lat, "lon": lon}
+        json.dump({"active_location": loc, "saved_locations": [loc]}, f)
+    run_dir, proc_env = _run_dir(env, "render")
+
+    results = []
+    for mode in ("widgets", "painted"):
+        painted = mode == "painted"
+        widget = SalahWidget(painted=painted)
+        widget.expanded = True
+        widget.list_container.setVisible(True)
+        widget.update_times()
+        widget.show()
+        widget.fetcher.wait()
+        app.processEvents()
+
+        # Everything, as after being uncovered
+        samples = measure(widget.repaint, 200 * scale, 5)
+        results.append(summarize(f"render/{mode}/full_paint", samples, 200 * scale))
+
+        # The countdown changing: one text and whatever it invalidates
+        texts = itertools.cycle(("1h 04m", "1h 03m"))
+
+        def countdown():
+            widget.countdown_label.setText(next(texts))
+            app.processEvents()
+
+        samples = measure(countdown, 500 * scale, 5)
+        results.append(summarize(f"render/{mode}/countdown_paint", samples, 500 * scale))
+        widget.close()
+        widget.fetcher.wait()
+
+        # Fresh processes, so the two modes don't share anything already allocated
+        runs = []
+        for _ in range(3 * scale):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--rss-probe", mode],
+                                 cwd=run_dir, env=proc_env, capture_output=True, text=True, timeout=120)
+            lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+            if not lines:
+                raise RuntimeError(f"RSS probe failed:\n{out.stdout}{out.stderr}")
+            runs.append(json.loads(lines[-1]))
+        results.append(summarize(f"render/{mode}/create", [run["seconds"] for run in runs], 1,
+                                 rss_kb=statistics.median(run["rss_kb"] for run in runs)))
+    return results
+
+GROUPS = {
+    "fetch": bench_fetch,
+    "tick": bench_tick,
+    "widget": bench_widget,
+    "network": bench_network,
+    "startup": bench_startup,
+    "render": bench_render,
+}
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def run(groups=None, quick=False):
+    """Runs the benchmark groups (default all) and returns the report as a dict"""
+    scale = 1 if quick else 5
+    report = {
+        "format": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": [],
+    }
+    with BenchEnv() as env:
+        for group in groups or GROUPS:
+            report["results"].extend(GROUPS[group](env, scale))
+        report["stub_requests"] = len(env.stub.requests)
+    try:
+        from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+        report["qt"], report["pyqt"] = QT_VERSION_STR, PYQT_VERSION_STR
+    except ImportError:
+        pass
+    return report
+
+def _format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+def print_report(report, out=sys.stderr):
+    for r in report["results"]:
+        rss = f"  {r['rss_kb']:.0f} KiB RSS" if r.get("rss_kb") is not None else ""
+        print(f"{r['name']:<45} {_format_seconds(r['median'])}  (min {_format_seconds(r['min']).strip()}){rss}", file=out)
+
+def compare(report, baseline, threshold=THRESHOLD, out=sys.stderr):
+    """Prints median ratios against a baseline report; returns the names that regressed"""
+    before = {r["name"]: r for r in baseline["results"]}
+    regressed = []
+    for r in report["results"]:
+        old = before.get(r["name"])
+        if old is None:
+            print(f"{r['name']:<45} new", file=out)
+            continue
+        ratio = r["median"] / old["median"]
+        flag = ""
+        if ratio > threshold:
+            regressed.append(r["name"])
+            flag = "  REGRESSION"
+        print(f"{r['name']:<45} {_format_seconds(old['median'])} -> {_format_seconds(r['median'])}  x{ratio:.2f}{flag}",
+              file=out)
+    return regressed
+
+def main():
+    # python Tests/bench_suite.py [--quick] [--group fetch ...] [--output FILE] [--compare BASELINE]
+    parser = argparse.ArgumentParser(description="Benchmark prayer_api and widget hot paths against a local stub")
+    parser.add_argument("--group", action="append", choices=list(GROUPS), help="Run only these groups")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a smoke run")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report; exits 1 if a median regressed")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Slowdown ratio counted as a regression (default {THRESHOLD})")
+    # Used by the render group to measure one widget in a fresh process
+    parser.add_argument("--rss-probe", choices=["widgets", "painted"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_probe:
+        rss_probe(args.rss_probe == "painted")
+        return
+
+    report = run(args.group, args.quick)
+    print_report(report)
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
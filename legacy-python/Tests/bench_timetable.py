@@ -0,0 +1,63 @@
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# Add parent directory to path to import prayer_api
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prayer_calc import compute_prayer_times, compute_timetable, compute_timetable_parallel
+
+LOCATIONS = 10000
+DAYS = [date(2024, 1, 1) + timedelta(days=i) for i in range(366)]
+
+def bench():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-60, 60, LOCATIONS)
+    lons = rng.uniform(-180, 180, LOCATIONS)
+    tz = np.round(lons / 15)
+
+    start = time.perf_counter()
+    table = compute_timetable(lats, lons, DAYS, method=2, tz=tz)
+    elapsed = time.perf_counter() - start
+    cells = table.size
+    print(f"compute_timetable: {LOCATIONS} locations x {len(DAYS)} days = {cells} cells")
+    print(f"  {elapsed:.3f} s, {elapsed / cells * 1e9:.0f} ns/cell, {table.nbytes / 1e6:.1f} MB")
+
+    # Same work one day at a time, extrapolated from a sample
+    sample = 2000
+    start = time.perf_counter()
+    for i in range(sample):
+        compute_prayer_times(lats[i], lons[i], DAYS[i % len(DAYS)], method=2, tz=tz[i])
+    per_call = (time.perf_counter() - start) / sample
+    print(f"compute_prayer_times: {per_call * 1e6:.1f} us/call, ~{per_call * cells:.0f} s for the same grid")
+
+def bench_scaling(max_workers):
+    """compute_timetable_parallel on 1, 2, 4 ... max_workers processes"""
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-60, 60, LOCATIONS)
+    lons = rng.uniform(-180, 180, LOCATIONS)
+    tz = np.round(lons / 15)
+    cells = LOCATIONS * len(DAYS)
+    print(f"compute_timetable_parallel: {LOCATIONS} locations x {len(DAYS)} days, {os.cpu_count()} CPUs")
+
+    counts = sorted({min(1 << i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    base = None
+    for workers in counts:
+        start = time.perf_counter()
+        compute_timetable_parallel(lats, lons, DAYS, method=2, tz=tz, workers=workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        speedup = base / elapsed
+        print(f"  {workers:3d} workers: {elapsed:.3f} s, {elapsed / cells * 1e9:.0f} ns/cell, "
+              f"speedup {speedup:.2f}x, efficiency {speedup / workers:.0%}")
+
+if __name__ == "__main__":
+    # python Tests/bench_timetable.py [--scaling N]
+    if "--scaling" in sys.argv:
+        index = sys.argv.index("--scaling") + 1
+        bench_scaling(int(sys.argv[index]) if index < len(sys.argv) else os.cpu_count() or 1)
+    else:
+        bench()
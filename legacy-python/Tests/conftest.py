@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+import pytest
+
+# Add parent directory to path to import settings_store
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+import settings_store
+
+LONDON = {"name": "London", "lat": 51.5074, "lon": -0.1278}
+# Nothing listens here: widgets built without a stub fall back to the local engine at once
+OFFLINE = {"API_URL": "http://127.0.0.1:9/v1", "IP_API_URL": "http://127.0.0.1:9/json",
+           "ARCGIS_URL": "http://127.0.0.1:9/arcgis/rest/services/World/GeocodeServer/find"}
+
+def _offline(setattr):
+    for name, url in OFFLINE.items():
+        setattr(prayer_api, name, url)
+
+def pytest_configure(config):
+    # Scripts such as test_search.py run while being collected, before any fixture
+    config.salah_dir = tempfile.mkdtemp(prefix="salah-tests-")
+    os.environ["SALAH_CONFIG_DIR"] = config.salah_dir
+    _offline(setattr)
+
+def pytest_unconfigure(config):
+    shutil.rmtree(config.salah_dir, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """
+    Gives every test its own per-user directory, holding a settings.json with
+    London saved, so widgets neither read the real one nor geolocate over the
+    network on a "first run", and keep their completions.bin and prayer cache
+    there. The real APIs are out of reach; tests that need answers start a StubServer.
+    """
+    monkeypatch.setenv("SALAH_CONFIG_DIR", str(tmp_path))
+    _offline(monkeypatch.setattr)
+    monkeypatch.setattr(settings_store, "LEGACY_FILES", [])
+    if "widget" in sys.modules:
+        monkeypatch.setattr(sys.modules["widget"], "LEGACY_FILES", [])
+    with open(os.path.join(tmp_path, settings_store.SETTINGS_NAME), "w") as f:
+        json.dump({"active_location": LONDON, "saved_locations": [LONDON]}, f)
+    _close_cache()
+    yield tmp_path
+    _close_cache()
+
+def _close_cache():
+    # The next lookup opens the cache in this test's SALAH_CONFIG_DIR
+    if prayer_api._cache is not None:
+        prayer_api._cache.close()
+    prayer_api._cache = None
@@ -0,0 +1,202 @@
+import sys
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import widget
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import psutil
+import metrics
+import prayer_api
+from clock import SimulatedClock, set_clock
+from bench_suite import BenchEnv, LOCATION
+
+START = datetime(2024, 3, 1, 4, 0)
+DAYS = 60
+# The first days load imports, caches and allocator pools; growth is measured after them
+WARMUP_DAYS = 3
+# Most a per-day sample may rise from the first half of the run to the second
+LIMITS = {
+    "rss_kb": 4096,
+    "qt_objects": 0,
+    "widgets": 0,
+    "open_files": 0,
+    "timers": 4,
+    "file_writes": 4,
+    "network": 2,
+    "disk_kb": 64,
+}
+SECOND_LOCATION = {"name": "Makkah", "lat": 21.4225, "lon": 39.8262}
+# Every few days the machine sleeps through most of an hour at night, and the
+# clock on screen must catch up within this many seconds of the platform
+# reporting the resume
+SUSPEND_EVERY = 5
+SUSPEND = timedelta(minutes=50)
+MAX_RESUME_LAG = 1
+
+def _io_writes():
+    timings = metrics.snapshot()["timings"]
+    return sum(t["count"] for name, t in timings.items()
+               if name.startswith("io.") and not name.endswith(("_load", "_read")))
+
+def _disk_kb(folder):
+    return sum(e.stat().st_size for e in os.scandir(folder) if e.is_file()) / 1024
+
+def _flush(widget):
+    # Debounced writes run on real-time timers; settle them so each day's writes count on that day
+    prayer_api.get_cache().flush()
+    widget.settings.flush()
+    widget.completions.flush()
+
+def _resume(clock, widget, settle):
+    """Sleeps through SUSPEND, then runs until the clock label is right; returns the seconds that took"""
+    clock.jump(SUSPEND)
+    widget.clock_watch.notify()  # As WM_POWERBROADCAST or logind's PrepareForSleep would
+    awake = 3600 - int(SUSPEND.total_seconds())
+    lag = 0
+    while lag < awake and widget.clock_label.text() != clock.now().strftime("%H:%M"):
+        clock.advance(timedelta(seconds=1), between=settle)
+        lag += 1
+    # The rest of the hour
+    clock.advance(timedelta(seconds=awake - lag), between=settle)
+    return lag
+
+def simulate(days=DAYS, start=START, env=None):
+    """
+    Runs one SalahWidget for `days` of simulated time on a SimulatedClock,
+    against the stub APIs in a BenchEnv. Every timer the widget and prayer_api
+    arm fires in order, with Qt events and background fetches settled after
+    each. A user toggles prayers, opens and closes the list and switches
+    location every few days, and the machine sleeps for most of an hour every
+    SUSPEND_EVERY days. Returns one sample per simulated day.
+    """
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, qInstallMessageHandler
+    from widget import SalahWidget
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    # The offscreen platform warns on every resize; thousands of them would bury the report
+    previous_handler = qInstallMessageHandler(
+        lambda kind, context, message: None if "This plugin does not support" in message else print(message, file=sys.stderr))
+    clock = SimulatedClock(start)
+    previous_clock = set_clock(clock)
+    was_enabled = metrics.enabled()
+    metrics.enable()
+    lat, lon, city = LOCATION
+    home = {"name": city, "lat": lat, "lon": lon}
+    with open(os.path.join(env.tmp, "settings.json"), "w") as f:
+        json.dump({"active_location": home, "saved_locations": [home, SECOND_LOCATION],
+                   "reminders": {"offsets": [-15, 0, 10], "all_locations": True}}, f)
+    env.reset_cache()
+
+    process = psutil.Process()
+    widget = SalahWidget(clock=clock)
+    widget.show()
+
+    def settle():
+        widget.fetcher.wait()
+        app.processEvents()
+
+    samples = []
+    try:
+        settle()
+        last_writes, last_requests = _io_writes(), len(env.stub.requests)
+        for day in range(days):
+            started = time.perf_counter()
+            ticks, resume_lag = widget.ticker.ticks, 0
+            wakeups = widget.ticker.wakeups + widget.reminders.wakeups
+            sleeps = day % SUSPEND_EVERY == SUSPEND_EVERY - 1
+            for hour in range(24):
+                if hour == 2 and sleeps:
+                    resume_lag = _resume(clock, widget, settle)
+                else:
+                    clock.advance(timedelta(hours=1), between=settle)
+                if hour in (5, 12, 15, 18, 20) and day % 3:
+                    widget.toggle_prayer_completion(widget.schedule.names[(hour + day) % 5])
+                if hour == 17:
+                    widget.expanded = not widget.expanded
+                    widget.list_container.setVisible(widget.expanded)
+                if hour == 22 and day % 7 == 6:
+                    saved = widget.settings["saved_locations"]
+                    widget.set_active_location(saved[day // 7 % len(saved)])
+                settle()
+            _flush(widget)
+
+            writes, requests = _io_writes(), len(env.stub.requests)
+            samples.append({
+                "day": (start + timedelta(days=day)).date().isoformat(),
+                "seconds": time.perf_counter() - started,
+                "ticks": widget.ticker.ticks - ticks,
+                # Every timer the schedulers woke the process for: ticks, clock checks and reminders
+                "wakeups": widget.ticker.wakeups + widget.reminders.wakeups - wakeups,
+                "suspended_min": SUSPEND.total_seconds() // 60 if sleeps else 0,
+                "resume_lag": resume_lag,
+                "rss_kb": process.memory_info().rss / 1024,
+                "qt_objects": len(widget.findChildren(QObject)),
+                "widgets": len(QApplication.allWidgets()),
+                "open_files": len(process.open_files()),
+                "timers": clock.pending(),
+                "file_writes": writes - last_writes,
+                "network": requests - last_requests,
+                "disk_kb": _disk_kb(env.tmp),
+            })
+            last_writes, last_requests = writes, requests
+    finally:
+        widget.close()
+        widget.fetcher.wait()
+        app.processEvents()
+        set_clock(previous_clock)
+        qInstallMessageHandler(previous_handler)
+        metrics.enable(was_enabled)
+    return samples
+
+def unbounded(samples, limits=LIMITS, warmup=WARMUP_DAYS):
+    """
+    Names of the measurements whose largest per-day value in the second half
+    of the run (after warm-up) exceeds the first half's by more than its limit
+    """
+    measured = samples[warmup:]
+    half = len(measured) // 2
+    if half == 0:
+        return []
+    first, second = measured[:half], measured[half:]
+    return [name for name, limit in limits.items()
+            if max(s[name] for s in second) > max(s[name] for s in first) + limit]
+
+def print_report(samples, out=sys.stderr):
+    columns = ["day", "ticks", "wakeups", "resume_lag"] + list(LIMITS)
+    print("  ".join(f"{c:>11}" for c in columns), file=out)
+    for s in samples:
+        print("  ".join(f"{s[c]:>11.0f}" if isinstance(s[c], float) else f"{s[c]:>11}" for c in columns), file=out)
+    simulated = len(samples) * 86400
+    elapsed = sum(s["seconds"] for s in samples)
+    print(f"{len(samples)} simulated days in {elapsed:.1f} s ({simulated / elapsed:.0f}x real time)", file=out)
+
+def main():
+    # python Tests/soak.py [--days 120] [--output soak.json]
+    parser = argparse.ArgumentParser(description="Run the widget for months of simulated time and check nothing grows")
+    parser.add_argument("--days", type=int, default=DAYS, help="Simulated days")
+    parser.add_argument("--output", help="Write the per-day samples here as JSON")
+    args = parser.parse_args()
+
+    with BenchEnv() as env:
+        samples = simulate(args.days, env=env)
+    print_report(samples)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(samples, f, indent=2)
+    growing = unbounded(samples)
+    if growing:
+        print(f"Growing without bound: {', '.join(growing)}", file=sys.stderr)
+    slow = [s["day"] for s in samples if s["resume_lag"] > MAX_RESUME_LAG]
+    if slow:
+        print(f"Clock more than {MAX_RESUME_LAG} s behind after waking on {', '.join(slow)}", file=sys.stderr)
+    if growing or slow:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import sys
+import os
+import json
+
+# Add parent directory to path to import the benchmark suite
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import prayer_api
+import bench_suite
+
+def test_quick_run_report():
+    api_url = prayer_api.API_URL
+    report = bench_suite.run(quick=True)
+    names = [r["name"] for r in report["results"]]
+    for expected in ("fetch_prayer_times/hit", "fetch_prayer_times/miss", "fetch_prayer_times/cold_file",
+                     "tick/get_next_prayer+format_countdown", "widget/update_times/collapsed",
+                     "widget/update_times/expanded", "search_location/arcgis", "startup/first_paint"):
+        assert expected in names
+    for r in report["results"]:
+        assert 0 < r["min"] <= r["median"] <= r["max"], r
+    # Every miss went to the stub, and the report survives a round trip
+    miss = next(r for r in report["results"] if r["name"] == "fetch_prayer_times/miss")
+    assert miss["requests"] == miss["number"] * miss["repeat"]
+    assert json.loads(json.dumps(report)) == report
+    assert prayer_api.API_URL == api_url  # Put back afterwards
+    print(f"PASS: {len(names)} benchmarks, {report['stub_requests']} stub requests")
+
+def test_compare_flags_regressions():
+    base = {"results": [bench_suite.summarize("a", [1.0], 1), bench_suite.summarize("b", [1.0], 1)]}
+    now = {"results": [bench_suite.summarize("a", [1.1], 1), bench_suite.summarize("b", [2.0], 1),
+                       bench_suite.summarize("c", [1.0], 1)]}
+    with open(os.devnull, "w") as out:
+        assert bench_suite.compare(now, base, out=out) == ["b"]
+
+if __name__ == "__main__":
+    test_quick_run_report()
+    test_compare_flags_regressions()
@@ -0,0 +1,40 @@
+import sys
+import os
+import tempfile
+from datetime import date
+
+# Add parent directory to path to import prayer_api
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from stub_server import StubServer
+
+LAT, LON = 51.5074, -0.1278
+
+def test_month_prefetch_serves_daily_lookups():
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        prayer_api.PREFETCH = "month"
+        # The recorded payload is for a past month
+        prayer_api.CACHE_TTL_DAYS = None
+        try:
+            first = prayer_api.fetch_prayer_times(LAT, LON, date(2024, 3, 1))
+            assert len(stub.requests) == 1 and "/v1/calendar" in stub.requests[0]
+            assert first["Fajr"] == "05:13", first
+
+            # The rest of the month, including the day change, never touches the network
+            for d in range(2, 32):
+                timings = prayer_api.fetch_prayer_times(LAT, LON, date(2024, 3, d))
+                assert ":" in timings["Isha"] and "(" not in timings["Isha"]
+            assert len(stub.requests) == 1
+            print("PASS: One request for the whole month")
+        finally:
+            prayer_api.get_cache().flush()
+            prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS = old
+            stub.stop()
+
+if __name__ == "__main__":
+    test_month_prefetch_serves_daily_lookups()
@@ -0,0 +1,96 @@
+import sys
+import os
+import random
+import tempfile
+import timeit
+from datetime import date, timedelta
+
+# Add parent directory to path to import completion_log
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from completion_log import CompletionLog, PRAYERS, RECORD
+
+def brute_streak(truth, today):
+    day = today if truth.get(today) == set(PRAYERS) else today - timedelta(days=1)
+    streak = 0
+    while truth.get(day) == set(PRAYERS):
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+def test_queries_match_brute_force():
+    random.seed(7)
+    start = date(2024, 1, 1)
+    truth = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        log = CompletionLog(os.path.join(tmp, "completions.bin"))
+        # Two years of mostly complete days, written out of order
+        days = [start + timedelta(days=n) for n in range(730)]
+        random.shuffle(days)
+        for day in days:
+            done = set(p for p in PRAYERS if random.random() < 0.97)
+            truth[day] = done
+            for p in done:
+                log.set(day, p)
+
+        for n in range(-5, 740, 7):
+            today = start + timedelta(days=n)
+            assert log.streak(today) == brute_streak(truth, today), today
+            for p in PRAYERS:
+                expected = sum(p in truth.get(today - timedelta(days=i), ()) for i in range(30)) / 30
+                assert abs(log.rate(p, 30, today) - expected) < 1e-9
+
+        heat = log.heatmap(start, start + timedelta(days=364))
+        assert len(heat) == 365
+        assert all(n == len(truth[day]) for day, n in heat)
+        log.close()
+    print(f"PASS: longest streak {max(brute_streak(truth, d) for d in truth)} days")
+
+def test_reopen_compaction_and_torn_record():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "completions.bin")
+        log = CompletionLog(path, compact_every=100)
+        today = date(2025, 6, 1)
+        for n in range(60):
+            for p in PRAYERS:
+                log.set(today - timedelta(days=n), p)
+        log.toggle(today, "Isha")  # Today in progress
+        log.flush()
+        # 301 records, folded into the snapshot whenever 100 have built up
+        assert os.path.getsize(path + ".log") < 100 * RECORD.size
+        assert os.path.getsize(path) < 100
+        log.close()
+
+        # A crash mid-append leaves a partial record behind
+        with open(path + ".log", "ab") as f:
+            f.write(RECORD.pack((today + timedelta(days=1)).toordinal(), 31)[:3])
+
+        log = CompletionLog(path)
+        assert log.completed(today) == {"Fajr", "Dhuhr", "Asr", "Maghrib"}
+        assert log.completed(today + timedelta(days=1)) == set()
+        assert log.streak(today) == 59
+        assert log.rate("Isha", 10, today) == 0.9
+        log.compact()
+        assert os.path.getsize(path + ".log") == 0
+        log.close()
+
+        log = CompletionLog(path)
+        assert log.streak(today) == 59
+        log.close()
+    print("PASS: history survives reopen, compaction and a torn record")
+
+def test_toggle_does_not_wait_for_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = CompletionLog(os.path.join(tmp, "completions.bin"))
+        today = date.today()
+        per_toggle = min(timeit.repeat(lambda: log.toggle(today, "Asr"), number=1000, repeat=5)) / 1000
+        per_query = min(timeit.repeat(lambda: log.streak(today), number=1000, repeat=5)) / 1000
+        log.close()
+    print(f"Toggle: {per_toggle * 1e6:.1f} us, streak: {per_query * 1e6:.1f} us")
+    assert per_toggle < 1e-3
+    assert per_query < 1e-3
+
+if __name__ == "__main__":
+    test_queries_match_brute_force()
+    test_reopen_compaction_and_torn_record()
+    test_toggle_does_not_wait_for_disk()
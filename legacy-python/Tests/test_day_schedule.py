@@ -0,0 +1,52 @@
+import sys
+import os
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+# Add parent directory to path to import day_schedule
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from day_schedule import DaySchedule
+from prayer_api import get_next_prayer
+
+TODAY = {"Fajr": "05:00", "Sunrise": "06:30", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+TOMORROW = {"Fajr": "04:58", "Dhuhr": "12:00", "Asr": "15:01", "Maghrib": "18:02", "Isha": "20:03"}
+DAY = date(2024, 3, 1)
+
+def test_matches_get_next_prayer():
+    schedule = DaySchedule(TODAY, DAY)
+    now = datetime(2024, 3, 1, 0, 0, 30)
+    while now < datetime(2024, 3, 2):
+        name, when = get_next_prayer(TODAY, now)
+        assert schedule.next_prayer(now) == (name, (when - now).total_seconds())
+        now += timedelta(minutes=7)
+    print("PASS: Same answers as get_next_prayer over a whole day")
+
+def test_tomorrow_and_stale_days():
+    schedule = DaySchedule(TODAY, DAY, TOMORROW)
+    i, remaining = schedule.lookup(datetime(2024, 3, 1, 21, 0))
+    assert (schedule.names[i], schedule.times[i], remaining) == ("Fajr", "04:58", 7 * 3600 + 58 * 60)
+    # Two days later nothing newer has arrived: tomorrow's times repeat
+    assert schedule.next_prayer(datetime(2024, 3, 3, 13, 0)) == ("Asr", 2 * 3600 + 60)
+    assert schedule.next_prayer(datetime(2024, 3, 3, 21, 0)) == ("Fajr", 7 * 3600 + 58 * 60)
+
+def test_upcoming_crosses_days():
+    schedule = DaySchedule(TODAY, DAY, TOMORROW)
+    upcoming = list(islice(schedule.upcoming(datetime(2024, 3, 1, 16, 0)), 9))
+    assert [name for name, _ in upcoming] == ["Maghrib", "Isha", "Fajr", "Dhuhr", "Asr", "Maghrib", "Isha", "Fajr", "Dhuhr"]
+    assert upcoming[2][1] == datetime(2024, 3, 2, 4, 58)
+    assert upcoming[7][1] == datetime(2024, 3, 3, 4, 58)
+
+def test_immutable():
+    schedule = DaySchedule(TODAY, DAY)
+    with pytest.raises(AttributeError):
+        schedule.day = date(2024, 3, 2)
+    with pytest.raises(AttributeError):
+        schedule.extra = 1
+
+if __name__ == "__main__":
+    test_matches_get_next_prayer()
+    test_tomorrow_and_stale_days()
+    test_upcoming_crosses_days()
+    test_immutable()
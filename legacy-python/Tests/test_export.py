@@ -0,0 +1,149 @@
+import sys
+import os
+import io
+import csv
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+# Add parent directory to path to import export
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import export
+import prayer_api
+from prayer_calc import compute_prayer_times
+from stub_server import StubServer
+
+LOCATIONS = [
+    {"name": "East London Mosque", "lat": 51.5175, "lon": -0.0653, "method": 2, "school": 0},
+    {"name": "Masjid, \"Al-Noor\"; Leicester", "lat": 52.6369, "lon": -1.1398, "method": 3, "school": 1, "tz": 0},
+]
+
+def to_minutes(time_str):
+    hour, minute = map(int, time_str.split(':'))
+    return hour * 60 + minute
+
+def test_csv_matches_daily_calculation():
+    out = io.StringIO()
+    count = export.write_csv(export.timetable(LOCATIONS, date(2024, 3, 25), date(2024, 4, 3), "local"), out)
+    assert count == 20
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [r["name"] for r in rows] == [LOCATIONS[0]["name"]] * 10 + [LOCATIONS[1]["name"]] * 10
+    for row in rows:
+        loc = LOCATIONS[row["name"] != LOCATIONS[0]["name"]]
+        timings = compute_prayer_times(loc["lat"], loc["lon"], date.fromisoformat(row["date"]),
+                                       method=loc["method"], school=loc["school"], tz=loc.get("tz"))
+        for field in export.FIELDS:
+            diff = abs(to_minutes(row[field]) - to_minutes(timings[field]))
+            assert min(diff, 1440 - diff) <= 1, (row, field)
+    print("PASS: CSV rows match the single day calculation")
+
+def test_cached_months_and_no_daily_requests():
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.CACHE_TTL_DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        prayer_api.CACHE_TTL_DAYS = None
+        try:
+            london = [dict(LOCATIONS[0], lat=51.5074, lon=-0.1278)]
+            rows = list(export.timetable(london, date(2024, 3, 1), date(2024, 3, 31), "fetch"))
+            # One calendar request for the month, none per day
+            assert len(stub.requests) == 1 and "/v1/calendar" in stub.requests[0]
+            assert rows[0][2]["Fajr"] == "05:13"
+            # Later exports reuse it without asking again
+            assert [r[2] for r in export.timetable(london, date(2024, 3, 1), date(2024, 3, 31))] == [r[2] for r in rows]
+            assert len(stub.requests) == 1
+        finally:
+            prayer_api.get_cache().flush()
+            prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.CACHE_TTL_DAYS = old
+            stub.stop()
+    print("PASS: a month of cached timings took one request")
+
+def test_fetched_months_outlast_the_widget_cache():
+    # More months than the widget's JSON cache holds, so none of them may be evicted
+    count = prayer_api.CACHE_SIZE + 8
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_BACKEND, sys.argv
+    with tempfile.TemporaryDirectory() as tmp:
+        sites = os.path.join(tmp, "sites.csv")
+        with open(sites, "w") as f:
+            f.write("name,lat,lon\n")
+            for i in range(count):
+                f.write(f"Site {i},{40 + i % 20},{-10 + i // 20}\n")
+
+        def run(*flags):
+            out = os.path.join(tmp, "out.csv")
+            sys.argv = ["export.py", "--from", "2024-03-01", "--to", "2024-03-31",
+                        "--locations", sites, *flags, out]
+            export.main()
+            with open(out) as f:
+                return f.read()
+
+        prayer_api.API_URL = stub.url + "/v1"
+        try:
+            fetched = run("--fetch")
+            assert len(stub.requests) == count
+            # Every month is still there, for another --fetch and for auto mode
+            assert run("--fetch") == fetched and run() == fetched
+            assert len(stub.requests) == count
+        finally:
+            prayer_api.API_URL, prayer_api.CACHE_BACKEND, sys.argv = old
+            stub.stop()
+    print(f"PASS: {count} fetched months kept for later exports")
+
+def test_ics_events():
+    out = io.StringIO(newline="")
+    count = export.write_ics(export.timetable(LOCATIONS[1:], date(2024, 3, 1), date(2024, 3, 2), "local"), out)
+    text = out.getvalue()
+    assert count == 10 and text.count("BEGIN:VEVENT") == 10
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
+    assert "\n" not in text.replace("\r\n", "")
+    lines = text.split("\r\n")
+    assert all(len(line.encode()) <= 75 for line in lines)
+    # Unfolded, the summary keeps the name with its commas and semicolons escaped
+    unfolded = text.replace("\r\n ", "")
+    assert "SUMMARY:Fajr (Masjid\\, \"Al-Noor\"\\; Leicester)" in unfolded
+    assert "DTSTART:20240301T" in unfolded
+    print(f"PASS: {count} calendar events")
+
+def test_memory_flat_over_range():
+    def peak(days):
+        tracemalloc.start()
+        with open(os.devnull, "w", newline="") as f:
+            export.write_csv(export.timetable(LOCATIONS, date(2020, 1, 1), date(2020, 1, 1) + timedelta(days=days),
+                                              "local"), f)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    peak(10)  # Imports and caches
+    short, long = peak(2 * export.CHUNK_DAYS), peak(10 * export.CHUNK_DAYS)
+    print(f"Peak memory: {short / 1024:.0f} KiB for 2 years, {long / 1024:.0f} KiB for 10")
+    assert long < short * 1.5
+
+def test_parquet():
+    path = os.path.join(tempfile.mkdtemp(), "timetable.parquet")
+    rows = export.timetable(LOCATIONS, date(2024, 1, 1), date(2024, 1, 31), "local")
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        try:
+            export.write_parquet(rows, path)
+            assert False, "expected an error without pyarrow"
+        except RuntimeError as e:
+            assert "pyarrow" in str(e)
+        print("PASS: Parquet export explains that it needs pyarrow")
+        return
+    assert export.write_parquet(rows, path, batch_rows=16) == 62
+    table = pq.read_table(path)
+    assert table.num_rows == 62 and table.column_names[:4] == ["name", "lat", "lon", "date"]
+    print("PASS: Parquet written in row groups")
+
+if __name__ == "__main__":
+    test_csv_matches_daily_calculation()
+    test_cached_months_and_no_daily_requests()
+    test_fetched_months_outlast_the_widget_cache()
+    test_ics_events()
+    test_memory_flat_over_range()
+    test_parquet()
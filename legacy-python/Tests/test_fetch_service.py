@@ -0,0 +1,45 @@
+import sys
+import os
+import time
+import threading
+
+# Add parent directory to path to import fetch_service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt6.QtCore import QCoreApplication
+from fetch_service import FetchService
+
+def wait_for(app, condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+def test_coalesces_and_drops_stale():
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    service = FetchService(max_threads=1)
+    calls = []
+    results = []
+    release = threading.Event()
+
+    def slow_fetch(name):
+        calls.append(name)
+        release.wait(5)
+        return name.upper()
+
+    # Three requests for the same key share one call
+    for _ in range(3):
+        service.request("times", "london", slow_fetch, ("london",), lambda r, e: results.append(r))
+    # Switching away while "london" is running, then to "paris" while "dubai" is still queued
+    service.request("times", "dubai", slow_fetch, ("dubai",), lambda r, e: results.append(r))
+    service.request("times", "paris", slow_fetch, ("paris",), lambda r, e: results.append(r))
+    release.set()
+    service.wait(5000)
+    wait_for(app, lambda: results)
+
+    assert calls == ["london", "paris"], calls  # "dubai" never started
+    assert results == ["PARIS"], results        # "london" finished but was stale
+    print("PASS: Coalesced duplicate requests and dropped stale ones")
+
+if __name__ == "__main__":
+    test_coalesces_and_drops_stale()
@@ -0,0 +1,85 @@
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path to import gazetteer
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gazetteer
+import prayer_api
+from gazetteer import Gazetteer, build_index, read_cities
+
+def make_index(tmp, cities=None):
+    path = os.path.join(tmp, "gazetteer.idx")
+    build_index(cities or read_cities(gazetteer.GAZETTEER_TSV), path)
+    return Gazetteer(path)
+
+def test_prefix_ranking_and_aliases():
+    with tempfile.TemporaryDirectory() as tmp:
+        g = make_index(tmp)
+        assert g.search("lond")[0][2] == "London"
+        # Later words and aliases are indexed too
+        assert g.search("york")[0][2] == "New York"
+        assert g.search("makkah")[0][2] == "Mecca"
+        assert g.search("são pau")[0][2] == "Sao Paulo"
+        # Same name: bigger city first, a country narrows it down
+        assert [c[:2] for c in g.search("san jose")] == [(37.3394, -121.895), (9.9333, -84.0833)]
+        assert g.search("san jose, cr") == [(9.9333, -84.0833, "San Jose")]
+        assert g.completions("birm") == [("Birmingham, GB", (52.4814, -1.8998, "Birmingham"))]
+        assert g.search("") == [] and g.search("qqqq") == []
+        g.close()
+    print("PASS: Prefix search")
+
+def test_find_needs_whole_name():
+    with tempfile.TemporaryDirectory() as tmp:
+        g = make_index(tmp)
+        assert g.find("Lond") is None
+        assert g.find("hyderabad, pk")[:2] == (25.3924, 68.3737)
+        assert g.find("Tromsø")[2] == "Tromso"
+        g.close()
+
+def test_geonames_rows():
+    row = ["2643743", "London", "London", "Londinium,Londres", "51.50853", "-0.12574", "P", "PPLC", "GB",
+           "", "ENG", "GLA", "", "", "8961989", "", "25", "Europe/London", "2023-01-01"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cities15000.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\t".join(row) + "\n")
+        cities = list(read_cities(path))
+        assert cities == [("London", "GB", 51.50853, -0.12574, 8961989, ["London"])]
+        g = make_index(tmp, cities)
+        assert g.find("london")[2] == "London"
+        g.close()
+
+def test_search_speed():
+    with tempfile.TemporaryDirectory() as tmp:
+        g = make_index(tmp)
+        queries = ["lo", "lon", "ne", "new y", "ka", "kar", "sa", "san j"]
+        start = time.perf_counter()
+        for _ in range(200):
+            for q in queries:
+                g.search(q)
+        per_query = (time.perf_counter() - start) / (200 * len(queries))
+        g.close()
+    print(f"Search: {per_query * 1e6:.1f} us/query")
+    assert per_query < 0.001
+
+def test_search_location_offline():
+    with tempfile.TemporaryDirectory() as tmp:
+        gazetteer.GAZETTEER_INDEX = os.path.join(tmp, "gazetteer.idx")
+        gazetteer._gazetteer = None
+        try:
+            # Answered from the index, so this works without a network
+            assert prayer_api.search_location("Istanbul") == (41.0138, 28.9497, "Istanbul")
+        finally:
+            gazetteer._gazetteer.close()
+            gazetteer._gazetteer = None
+            gazetteer.GAZETTEER_INDEX = None
+
+if __name__ == "__main__":
+    test_prefix_ranking_and_aliases()
+    test_find_needs_whole_name()
+    test_geonames_rows()
+    test_search_speed()
+    test_search_location_offline()
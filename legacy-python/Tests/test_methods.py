@@ -0,0 +1,135 @@
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import timeit
+from datetime import date
+from urllib.parse import urlparse, parse_qs
+
+# Add parent directory to path to import prayer_calc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from prayer_calc import METHODS, compute_methods, compute_prayer_times
+from timing_store import SqliteTimingStore
+from stub_server import StubServer
+
+DAY = date(2024, 3, 15)
+
+def test_compute_methods_matches_single_method():
+    for lat, lon in ((51.5074, -0.1278), (21.4225, 39.8262), (64.1466, -21.9426), (69.6492, 18.9553), (-33.8688, 151.2093)):
+        times = compute_methods(lat, lon, DAY, tz=0)
+        assert len(times) == 2 * len(METHODS)
+        for (method, school), timings in times.items():
+            assert timings == compute_prayer_times(lat, lon, DAY, method, school, tz=0), (lat, method, school)
+
+    one = min(timeit.repeat(lambda: compute_prayer_times(51.5, -0.13, DAY, tz=0), number=500, repeat=3)) / 500
+    every = min(timeit.repeat(lambda: compute_methods(51.5, -0.13, DAY, tz=0), number=500, repeat=3)) / 500
+    separate = min(timeit.repeat(lambda: [compute_prayer_times(51.5, -0.13, DAY, m, s, tz=0)
+                                          for m in METHODS for s in (0, 1)], number=20, repeat=3)) / 20
+    print(f"One method {one * 1e6:.0f} us; all {2 * len(METHODS)} method/school pairs "
+          f"{every * 1e6:.0f} us shared, {separate * 1e6:.0f} us one at a time")
+    assert every < separate / 2
+
+def test_method_and_school_are_in_cache_key():
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        prayer_api.PREFETCH = "month"
+        prayer_api.CACHE_TTL_DAYS = None
+        try:
+            prayer_api.fetch_prayer_times(51.5074, -0.1278, DAY)
+            prayer_api.fetch_prayer_times(51.5074, -0.1278, DAY, method=3)
+            prayer_api.fetch_prayer_times(51.5074, -0.1278, DAY, method=3, school=1)
+            prayer_api.fetch_prayer_times(51.5074, -0.1278, DAY, method=3, school=1)
+            sent = [parse_qs(urlparse(r).query) for r in stub.requests]
+            assert [(q["method"], q["school"]) for q in sent] == [(["2"], ["0"]), (["3"], ["0"]), (["3"], ["1"])]
+            assert prayer_api.get_cached_prayer_times(51.5074, -0.1278, DAY, method=4) is None
+            try:
+                prayer_api.fetch_prayer_times(51.5074, -0.1278, DAY, method=6)
+                assert False, "method 6 doesn't exist"
+            except ValueError:
+                pass
+            try:
+                prayer_api.get_cached_prayer_times(51.5074, -0.1278, DAY, school=2)
+                assert False, "school 2 doesn't exist"
+            except ValueError:
+                pass
+            print("PASS: Each method and school cached separately")
+        finally:
+            prayer_api.get_cache().flush()
+            prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS = old
+            stub.stop()
+
+def test_store_adds_school_to_old_databases():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        db = sqlite3.connect(path)
+        db.executescript("""
+            CREATE TABLE timings (lat_q INTEGER NOT NULL, lon_q INTEGER NOT NULL, date TEXT NOT NULL,
+                                  method INTEGER NOT NULL, data TEXT NOT NULL,
+                                  PRIMARY KEY (lat_q, lon_q, date, method)) WITHOUT ROWID;
+            INSERT INTO timings VALUES (515074, -1278, '2024-03-15', 2, '{"Fajr": "05:00"}');
+        """)
+        db.close()
+        store = SqliteTimingStore(path)
+        assert store.get("51.5074,-0.1278,2-0,2024-03-15") == {"Fajr": "05:00"}
+        assert store.get("51.5074,-0.1278,2024-03-15") == {"Fajr": "05:00"}
+        store.put("51.5074,-0.1278,2-1,2024-03-15", {"Fajr": "05:00", "Asr": "16:10"})
+        assert store.get("51.5074,-0.1278,2-0,2024-03-15") == {"Fajr": "05:00"}
+        assert len(store) == 2
+        store.close()
+
+def test_widget_saves_method_per_location():
+    from PyQt6.QtWidgets import QApplication
+    import widget as widget_module
+    from widget import SalahWidget, MethodComparisonDialog
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    old_settings, old_api = widget_module.SETTINGS_FILE, prayer_api.API_URL
+    with tempfile.TemporaryDirectory() as tmp:
+        widget_module.SETTINGS_FILE = os.path.join(tmp, "settings.json")
+        # Saved before locations had methods
+        london = {"name": "London", "lat": 51.5074, "lon": -0.1278}
+        makkah = {"name": "Makkah", "lat": 21.4225, "lon": 39.8262}
+        with open(widget_module.SETTINGS_FILE, "w") as f:
+            json.dump({"active_location": dict(london), "saved_locations": [london, makkah]}, f)
+        prayer_api.API_URL = "http://127.0.0.1:9/v1"  # Nothing listens; times come from the local engine
+        try:
+            w = SalahWidget()
+            assert (w.method, w.school) == (prayer_api.METHOD, prayer_api.SCHOOL)
+            w.set_location_method(method=3)
+            w.set_location_method(school=1)
+            assert (w.method, w.school) == (3, 1)
+            w.set_active_location(w.settings["saved_locations"][1])
+            assert (w.method, w.school) == (prayer_api.METHOD, prayer_api.SCHOOL)
+            w.set_location_method(method=4)
+            w.settings.flush()
+            with open(widget_module.SETTINGS_FILE) as f:
+                saved = {l["name"]: (l.get("method"), l.get("school")) for l in json.load(f)["saved_locations"]}
+            assert saved == {"London": (3, 1), "Makkah": (4, 0)}
+            # A late geolocation result adds to the saved list without switching away from Makkah
+            w.on_location_detected((48.8566, 2.3522, "Paris"))
+            assert [l["name"] for l in w.settings["saved_locations"]] == ["London", "Makkah", "Paris"]
+            assert w.city == "Makkah" and w.settings["saved_locations"][0]["method"] == 3
+
+            dialog = MethodComparisonDialog(w.city, w.lat, w.lon, w.method, w)
+            assert dialog.table.rowCount() == len(METHODS)
+            assert dialog.selected_method() == 4
+            assert dialog.table.item(list(METHODS).index(4), 0).text() == compute_prayer_times(w.lat, w.lon, method=4)["Fajr"]
+            dialog.close()
+            w.fetcher.wait()
+            app.processEvents()
+            w.close()
+            print("PASS: Method and school saved per location")
+        finally:
+            widget_module.SETTINGS_FILE, prayer_api.API_URL = old_settings, old_api
+
+if __name__ == "__main__":
+    test_compute_methods_matches_single_method()
+    test_method_and_school_are_in_cache_key()
+    test_store_adds_school_to_old_databases()
+    test_widget_saves_method_per_location()
@@ -0,0 +1,132 @@
+import sys
+import os
+import json
+import time
+import timeit
+import tempfile
+import urllib.request
+from datetime import date
+
+# Add parent directory to path to import metrics
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+import prayer_api
+from loop_profile import LoopProfiler
+from stub_server import StubServer
+
+def with_metrics(test):
+    metrics.get_registry().reset()
+    metrics.enable()
+    try:
+        test()
+    finally:
+        metrics.enable(False)
+        metrics.get_registry().reset()
+
+def test_disabled_is_a_no_op():
+    metrics.get_registry().reset()
+    assert not metrics.enabled()
+    metrics.count("x")
+    with metrics.timer("y"):
+        pass
+
+    @metrics.timed("z")
+    def work():
+        return 1
+
+    assert work() == 1
+    snap = metrics.snapshot()
+    assert snap["counters"] == {} and snap["timings"] == {}
+
+    # The wrapper is the only cost left on a decorated hot path
+    plain = min(timeit.repeat(lambda: None, number=100000, repeat=5)) / 100000
+    wrapped = min(timeit.repeat(work, number=100000, repeat=5)) / 100000
+    print(f"Disabled @timed overhead: {(wrapped - plain) * 1e9:.0f} ns/call")
+    assert wrapped - plain < 2e-6
+
+def test_fetch_records_network_and_cache():
+    def test():
+        stub = StubServer().start()
+        old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.CACHE_TTL_DAYS
+        with tempfile.TemporaryDirectory() as tmp:
+            prayer_api.API_URL = stub.url + "/v1"
+            prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+            prayer_api.CACHE_TTL_DAYS = None
+            try:
+                prayer_api.fetch_prayer_times(51.5074, -0.1278, date(2024, 3, 15))
+                prayer_api.fetch_prayer_times(51.5074, -0.1278, date(2024, 3, 16))
+                prayer_api.get_cache().flush()
+                snap = metrics.snapshot()
+                path = metrics.dump(os.path.join(tmp, "metrics.json"))
+                with open(path) as f:
+                    assert json.load(f)["counters"] == snap["counters"]
+            finally:
+                prayer_api.get_cache().flush()
+                prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.CACHE_TTL_DAYS = old
+                stub.stop()
+        assert snap["timings"]["net.aladhan/calendar"]["count"] == 1
+        assert snap["timings"]["fetch_prayer_times"]["count"] == 2
+        assert snap["timings"]["io.cache_write"]["count"] >= 1
+        assert snap["counters"] == {"fetch.calendar": 1, "fetch.cached": 1}
+        # Sources report the cache's and the transport's own (process-wide) counters
+        assert snap["cache"]["hits"] >= 1 and snap["network"]["aladhan/calendar"]["calls"] >= 1
+        print(f"PASS: calendar fetch {snap['timings']['net.aladhan/calendar']['avg_ms']:.1f} ms")
+
+    with_metrics(test)
+
+def test_widget_metrics_and_endpoint():
+    from PyQt6.QtWidgets import QApplication
+    from widget import SalahWidget
+
+    def test():
+        app = QApplication.instance() or QApplication(sys.argv)
+        widget = SalahWidget()
+        widget.expanded = True
+        widget.list_container.setVisible(True)
+        for _ in range(100):
+            widget.update_times()
+        widget.toggle_prayer_completion("Asr")
+        widget.fetcher.wait()
+        app.processEvents()
+
+        server = metrics.serve()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                snap = json.load(response)
+        finally:
+            server.shutdown()
+            server.server_close()
+        widget.close()
+        assert snap["timings"]["widget.update_times"]["count"] >= 101
+        assert snap["counters"]["widget.schedule_builds"] >= 1
+        # Rows change on the first tick, the toggle and a location change, not every tick
+        assert 1 <= snap["counters"]["widget.row_updates"] <= 15
+        print(f"PASS: update_times p50 {snap['timings']['widget.update_times']['p50_ms'] * 1000:.0f} us")
+
+    with_metrics(test)
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+def test_loop_profiler_samples_main_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.txt")
+        profiler = LoopProfiler(seconds=0.3, interval=0.002, path=path).start()
+        busy_loop(0.4)
+        profiler.wait()
+        with open(path) as f:
+            lines = f.read().splitlines()
+    assert profiler.samples > 20
+    assert any("busy_loop" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    print(f"PASS: {profiler.samples} samples, top: {profiler.top(1)}")
+
+if __name__ == "__main__":
+    test_disabled_is_a_no_op()
+    test_fetch_records_network_and_cache()
+    test_widget_metrics_and_endpoint()
+    test_loop_profiler_samples_main_thread()
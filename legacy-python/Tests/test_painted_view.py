@@ -0,0 +1,90 @@
+import sys
+import os
+
+# Add parent directory to path to import widget
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QPoint
+from PyQt6.QtTest import QTest
+from widget import SalahWidget
+
+TIMINGS = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+
+def make_widget(painted):
+    widget = SalahWidget(painted=painted)
+    widget.prayer_times = TIMINGS
+    widget.show()
+    widget.fetcher.wait()
+    QApplication.processEvents()
+    return widget
+
+def test_same_face_as_widget_tree():
+    app = QApplication.instance() or QApplication(sys.argv)
+    tree, painted = make_widget(False), make_widget(True)
+    for widget in (tree, painted):
+        widget.prayer_times = TIMINGS
+        widget.expanded = True
+        widget.list_container.setVisible(True)
+        widget.update_times()
+    for name in ("clock_label", "next_name_label", "next_time_label", "countdown_label", "stats_label"):
+        assert getattr(tree, name).text() == getattr(painted, name).text(), name
+    for a, b in zip(tree.prayer_rows, painted.prayer_rows):
+        assert (a.name, a.is_next, a.is_completed) == (b.name, b.is_next, b.is_completed)
+    # Within a few pixels of the widget tree, collapsed and expanded
+    assert abs(painted.view.collapsed_height + 40 - 240) < 10
+    assert abs(painted.view.expanded_height + 40 - tree.sizeHint().height()) < 15
+    tree.close()
+    painted.close()
+    print("PASS: painted view shows what the widget tree shows")
+
+def test_hit_testing():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = make_widget(True)
+    view = widget.view
+    assert view.hit(view.city_label.rect.center()) == "city"
+    assert view.hit(view.prayer_rows[0].rect.center()) is None  # Collapsed
+
+    # The separator expands the list, like the widget tree's toggle frame
+    QTest.mouseClick(view, Qt.MouseButton.LeftButton, pos=view.toggle_rect.center())
+    assert widget.expanded and view.height() == view.expanded_height
+
+    asr = view.prayer_rows[2]
+    before = "Asr" in widget.completed_prayers
+    QTest.mouseClick(view, Qt.MouseButton.LeftButton, pos=asr.rect.center())
+    assert ("Asr" in widget.completed_prayers) != before
+    assert asr.is_completed != before
+    QTest.mouseClick(view, Qt.MouseButton.LeftButton, pos=asr.rect.center())
+    assert ("Asr" in widget.completed_prayers) == before
+    widget.close()
+    print("PASS: clicks reach the location menu, list toggle and rows")
+
+def test_only_dirty_regions_repaint():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = make_widget(True)
+    view = widget.view
+    widget.update_times()
+    QTest.qWait(100)  # Let the first paints land
+    painted = []
+    paint = view.paintEvent
+
+    def record(event):
+        painted.append(event.rect())
+        paint(event)
+
+    view.paintEvent = record
+
+    widget.update_times()
+    app.processEvents()
+    assert painted == []  # Nothing visible changed
+
+    view.countdown_label.setText("0h 01m")
+    app.processEvents()
+    assert painted and all(view.countdown_label.rect.contains(rect) for rect in painted)
+    widget.close()
+    print(f"PASS: a countdown change repaints {painted[0].width()}x{painted[0].height()} px")
+
+if __name__ == "__main__":
+    test_same_face_as_widget_tree()
+    test_hit_testing()
+    test_only_dirty_regions_repaint()
@@ -0,0 +1,88 @@
+import sys
+import os
+from datetime import date, timedelta
+
+# Add parent directory to path to import prayer_calc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prayer_calc import compute_prayer_times, compute_timetable, compute_timetable_parallel, METHODS, TIMING_KEYS
+
+def to_minutes(time_str):
+    hour, minute = map(int, time_str.split(':'))
+    return hour * 60 + minute
+
+def test_london_summer_solstice():
+    # Published values for London, 21 June 2024 (BST): sunrise 04:43, noon 13:02, sunset 21:21
+    timings = compute_prayer_times(51.5074, -0.1278, date(2024, 6, 21), method=2, tz=1)
+    print(f"London ISNA: {timings}")
+    assert list(timings) == TIMING_KEYS
+    assert abs(to_minutes(timings["Sunrise"]) - to_minutes("04:43")) <= 1
+    assert abs(to_minutes(timings["Dhuhr"]) - to_minutes("13:02")) <= 1
+    assert abs(to_minutes(timings["Sunset"]) - to_minutes("21:21")) <= 1
+
+def test_prayer_order_all_methods():
+    for method in METHODS:
+        timings = compute_prayer_times(21.4225, 39.8262, date(2024, 3, 1), method=method, tz=3)
+        order = [to_minutes(timings[k]) for k in ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]]
+        assert order == sorted(order), f"Method {method} out of order: {timings}"
+    print("PASS: All methods ordered")
+
+def test_fixed_isha_and_hanafi_asr():
+    umm_al_qura = compute_prayer_times(21.4225, 39.8262, date(2024, 3, 1), method=4, tz=3)
+    assert to_minutes(umm_al_qura["Isha"]) - to_minutes(umm_al_qura["Maghrib"]) == 90
+
+    shafi = compute_prayer_times(24.8607, 67.0011, date(2024, 3, 1), method=1, school=0, tz=5)
+    hanafi = compute_prayer_times(24.8607, 67.0011, date(2024, 3, 1), method=1, school=1, tz=5)
+    assert to_minutes(hanafi["Asr"]) > to_minutes(shafi["Asr"])
+    print("PASS: Fixed Isha interval and Hanafi Asr")
+
+def test_high_latitude_has_no_gaps():
+    # Tromsø at midsummer: the sun never sets, every key must still be a valid time
+    timings = compute_prayer_times(69.6492, 18.9553, date(2024, 6, 21), method=2, tz=2)
+    for key in TIMING_KEYS:
+        assert 0 <= to_minutes(timings[key]) < 24 * 60
+    print("PASS: High latitude timings valid")
+
+def test_timetable_matches_single_day():
+    lats = [51.5074, 21.4225, -33.8688, 69.6492]
+    lons = [-0.1278, 39.8262, 151.2093, 18.9553]
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(0, 366, 11)]
+    for method in (2, 4, 7):
+        table = compute_timetable(lats, lons, days, method=method, tz=[0, 3, 10, 1])
+        assert table.shape == (len(lats), len(days))
+        for i, (lat, lon, tz) in enumerate(zip(lats, lons, [0, 3, 10, 1])):
+            for j, day in enumerate(days):
+                timings = compute_prayer_times(lat, lon, day, method=method, tz=tz)
+                for key in TIMING_KEYS:
+                    diff = abs(int(table[i, j][key]) - to_minutes(timings[key]))
+                    # Rounding may land on the other side of a minute boundary
+                    assert min(diff, 1440 - diff) <= 1, f"{key} {lat},{lon} {day}"
+    print("PASS: Timetable matches single day calculation")
+
+def test_parallel_timetable_matches_serial():
+    import tempfile
+    import numpy as np
+    rng = np.random.default_rng(1)
+    lats, lons = rng.uniform(-60, 60, 7), rng.uniform(-180, 180, 7)
+    days = [date(2024, 1, 1) + timedelta(days=i) for i in range(40)]
+    for tz in (None, np.round(lons / 15)):
+        serial = compute_timetable(lats, lons, days, method=3, school=1, tz=tz)
+        # Small shards so the grid is cut by location and by date
+        parallel = compute_timetable_parallel(lats, lons, days, method=3, school=1, tz=tz,
+                                              workers=2, shard_cells=30)
+        assert parallel.dtype == serial.dtype and np.array_equal(parallel, serial)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "timetable.npy")
+        table = compute_timetable_parallel(lats, lons, days, workers=1, path=path, shard_cells=100)
+        assert isinstance(table, np.memmap) and np.array_equal(table, compute_timetable(lats, lons, days))
+        assert np.array_equal(np.load(path), table)
+        del table
+    print("PASS: Parallel timetable is identical to the serial one")
+
+if __name__ == "__main__":
+    test_london_summer_solstice()
+    test_prayer_order_all_methods()
+    test_fixed_isha_and_hanafi_asr()
+    test_high_latitude_has_no_gaps()
+    test_timetable_matches_single_day()
+    test_parallel_timetable_matches_serial()
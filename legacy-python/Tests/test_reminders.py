@@ -0,0 +1,191 @@
+import sys
+import os
+import json
+import time
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import reminders
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from day_schedule import DaySchedule
+from prayer_calc import compute_prayer_times
+from clock import SimulatedClock
+from clock_watch import BACKSTOP_MS
+from reminders import ReminderQueue, LATE_GRACE, SLACK_MS, describe
+
+TIMINGS = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+TOMORROW = {"Fajr": "05:01", "Dhuhr": "12:00", "Asr": "14:59", "Maghrib": "18:01", "Isha": "20:02"}
+DAY = date(2024, 3, 1)
+
+class FakeClock:
+    def __init__(self, start):
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, **kwargs):
+        self.time += timedelta(**kwargs)
+
+def run_until(queue, clock, end):
+    """Jumps the clock from one armed reminder to the next, as the timer would"""
+    fired = []
+    while queue.next_time() is not None and queue.next_time() <= end:
+        clock.time = queue.next_time()
+        fired.extend(queue.due())
+    clock.time = end
+    return fired
+
+def test_offsets_across_midnight():
+    clock = FakeClock(datetime(2024, 3, 1, 4, 0))
+    queue = ReminderQueue((-15, 0, 10), now=clock)
+    queue.set_location("home", DaySchedule(TIMINGS, DAY, TOMORROW))
+    fired = run_until(queue, clock, datetime(2024, 3, 2, 6, 0))
+
+    expected = []
+    for day, timings in ((DAY, TIMINGS), (DAY + timedelta(days=1), TOMORROW)):
+        for prayer, hhmm in timings.items():
+            adhan = datetime.combine(day, datetime.strptime(hhmm, "%H:%M").time())
+            expected += [(adhan + timedelta(minutes=m), prayer, m) for m in (-15, 0, 10)]
+    expected = sorted(e for e in expected if e[0] <= clock.time)
+    assert [(r.when, r.prayer, r.offset) for r in fired] == expected
+    assert describe(fired[0]) == "Fajr in 15 minutes"
+    assert describe(fired[2]) == "Fajr iqamah"
+    print(f"PASS: {len(fired)} reminders in order across midnight")
+
+def test_new_timings_replace_old_ones():
+    clock = FakeClock(datetime(2024, 3, 1, 11, 0))
+    queue = ReminderQueue((0,), now=clock)
+    queue.set_location("home", DaySchedule(TIMINGS, DAY))
+    # A refresh moves Dhuhr; the old 12:00 entry must not fire as well
+    queue.set_location("home", DaySchedule(dict(TIMINGS, Dhuhr="12:05"), DAY))
+    fired = run_until(queue, clock, datetime(2024, 3, 1, 13, 0))
+    assert [(r.when.time().isoformat(), r.prayer) for r in fired] == [("12:05:00", "Dhuhr")]
+    queue.remove_location("home")
+    assert queue.next_time() is None
+    print("PASS: replaced schedules and removed locations leave nothing behind")
+
+def test_resume_after_suspend():
+    clock = FakeClock(datetime(2024, 3, 1, 11, 0))
+    queue = ReminderQueue((-15, 0), now=clock)
+    queue.set_location("home", DaySchedule(TIMINGS, DAY))
+    # Asleep from 11:00 until just after Asr: Dhuhr and Asr-15 are long gone, Asr is just due
+    clock.time = datetime(2024, 3, 1, 15, 0) + LATE_GRACE - timedelta(seconds=1)
+    fired = queue.due()
+    assert [(r.prayer, r.offset) for r in fired] == [("Asr", 0)]
+    assert queue.missed == 3
+    assert queue.next_time() == datetime(2024, 3, 1, 17, 45)
+    print("PASS: missed reminders dropped after a resume, recent ones shown")
+
+def test_hundreds_of_locations():
+    clock = FakeClock(datetime(2024, 3, 1, 0, 0, 1))
+    queue = ReminderQueue((-15, 0, 10), now=clock)
+    for i in range(500):
+        lat, lon = -50 + i * 0.2, -120 + i * 0.45
+        timings = compute_prayer_times(lat, lon, DAY, tz=0)
+        queue.set_location(f"loc{i}", DaySchedule(timings, DAY), f"City {i}")
+    assert len(queue._heap) == 500
+
+    start = time.perf_counter()
+    fired = run_until(queue, clock, datetime(2024, 3, 2, 0, 0))
+    elapsed = time.perf_counter() - start
+    times = [r.when for r in fired]
+    assert times == sorted(times)
+    assert len(fired) >= 500 * 5 * 3 * 0.95  # A few locations' Fajr-15 fall before midnight in UTC
+    assert len(queue._heap) <= 500
+    print(f"500 locations: {len(fired)} reminders in {elapsed * 1000:.0f} ms "
+          f"({elapsed / len(fired) * 1e6:.1f} us each)")
+    assert elapsed / len(fired) < 1e-3
+
+def test_scheduler_arms_one_timer():
+    from PyQt6.QtWidgets import QApplication
+    from reminders import ReminderScheduler
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    clock = FakeClock(datetime(2024, 3, 1, 11, 50))
+    scheduler = ReminderScheduler(offsets=(-15, 0), now=clock)
+    shown = []
+    scheduler.reminder.connect(shown.append)
+    scheduler.set_locations({"home": (DaySchedule(TIMINGS, DAY), None)})
+    # Dhuhr in 10 minutes: one wake-up, not one a minute
+    assert scheduler.timer.isActive()
+    assert scheduler.timer.interval() == 10 * 60 * 1000 + SLACK_MS
+    clock.time = datetime(2024, 3, 1, 11, 59, 59, 990000)
+    scheduler._fire()
+    assert shown == [] and 10 <= scheduler.timer.interval() <= 100
+
+    clock.time = datetime(2024, 3, 1, 12, 0)
+    scheduler._fire()
+    assert [r.prayer for r in shown] == ["Dhuhr"]
+    assert scheduler.timer.interval() == (2 * 60 + 45) * 60 * 1000 + SLACK_MS  # 15 minutes before Asr
+    scheduler.set_locations({})
+    assert not scheduler.timer.isActive()
+    print("PASS: one timer, armed for the earliest reminder")
+
+def test_reminder_survives_a_suspend():
+    from PyQt6.QtWidgets import QApplication
+    from reminders import ReminderScheduler
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    # Simulated timers count monotonic time, which stops while asleep, like QTimer
+    clock = SimulatedClock(datetime(2024, 3, 1, 11, 0))
+    scheduler = ReminderScheduler(offsets=(0,), clock=clock)
+    shown = []
+    scheduler.reminder.connect(lambda r: shown.append((r.prayer, clock.now())))
+    scheduler.set_locations({"home": (DaySchedule(TIMINGS, DAY), None)})
+
+    clock.advance(timedelta(minutes=5))
+    clock.jump(timedelta(minutes=52))  # Asleep 11:05 to 11:57
+    clock.advance(timedelta(minutes=10))
+    assert len(shown) == 1 and shown[0][0] == "Dhuhr", shown
+    # Nothing reported the resume: the watch's backstop noticed it
+    assert shown[0][1] - datetime(2024, 3, 1, 12, 0) <= timedelta(milliseconds=BACKSTOP_MS)
+    assert scheduler.queue.missed == 0
+    print("PASS: A reminder due soon after waking still fires")
+
+def test_widget_rebuilds_only_the_active_location():
+    from PyQt6.QtWidgets import QApplication
+    import prayer_api
+    import widget as widget_module
+    from widget import SalahWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    old_settings, old_api = widget_module.SETTINGS_FILE, prayer_api.API_URL
+    with tempfile.TemporaryDirectory() as tmp:
+        widget_module.SETTINGS_FILE = os.path.join(tmp, "settings.json")
+        saved = [{"name": "London", "lat": 51.5074, "lon": -0.1278},
+                 {"name": "Makkah", "lat": 21.4225, "lon": 39.8262},
+                 {"name": "Jakarta", "lat": -6.2088, "lon": 106.8456}]
+        with open(widget_module.SETTINGS_FILE, "w") as f:
+            json.dump({"active_location": saved[0], "saved_locations": saved,
+                       "reminders": {"offsets": [-15, 0], "all_locations": True}}, f)
+        prayer_api.API_URL = "http://127.0.0.1:9/v1"  # Nothing listens; times come from the local engine
+        try:
+            w = SalahWidget()
+            w.schedule_reminders()
+            w.fetcher.wait()
+            app.processEvents()
+            queue = w.reminders.queue
+            assert sorted(queue.keys()) == ["Jakarta", "London", "Makkah"]
+            generations = {key: queue._locations[key][0] for key in queue.keys()}
+
+            # A new schedule for the active location (an hourly refresh) leaves the others alone
+            w.prayer_times = dict(w.prayer_times)
+            changed = [key for key in queue.keys() if queue._locations[key][0] != generations[key]]
+            assert changed == ["London"], changed
+            w.fetcher.wait()
+            app.processEvents()
+            w.close()
+            print("PASS: Only the active location re-armed on a schedule change")
+        finally:
+            widget_module.SETTINGS_FILE, prayer_api.API_URL = old_settings, old_api
+
+if __name__ == "__main__":
+    test_offsets_across_midnight()
+    test_new_timings_replace_old_ones()
+    test_resume_after_suspend()
+    test_hundreds_of_locations()
+    test_scheduler_arms_one_timer()
+    test_reminder_survives_a_suspend()
+    test_widget_rebuilds_only_the_active_location()
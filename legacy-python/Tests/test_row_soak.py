@@ -0,0 +1,52 @@
+import sys
+import os
+
+# Add parent directory to path to import widget
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import psutil
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QObject
+from widget import SalahWidget
+
+TICKS = 20000
+
+def test_rows_flat_over_long_run():
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = SalahWidget()
+    widget.prayer_times = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+    widget.expanded = True
+    widget.list_container.setVisible(True)
+    rows = list(widget.prayer_rows)
+    process = psutil.Process()
+
+    def run(ticks):
+        for i in range(ticks):
+            # Flip a strikethrough every few ticks, as a user clicking rows would
+            if i % 7 == 0:
+                widget.toggle_prayer_completion(rows[i % 5].name)
+            else:
+                widget.update_times()
+        app.processEvents()
+
+    # Let the first-run location lookup (and its imports) settle before measuring
+    widget.fetcher.wait()
+    app.processEvents()
+    widget.fetcher.wait()
+    run(1000)  # Warm up caches and allocator pools
+    widgets_before = len(widget.findChildren(QObject))
+    rss_before = process.memory_info().rss
+
+    run(TICKS)
+    widgets_after = len(widget.findChildren(QObject))
+    growth = process.memory_info().rss - rss_before
+
+    print(f"Widgets: {widgets_before} -> {widgets_after}, RSS growth over {TICKS} ticks: {growth / 1024:.0f} KiB")
+    assert widgets_after == widgets_before
+    assert widget.prayer_rows == rows
+    assert growth < 2 * 1024 * 1024
+
+    widget.close()
+
+if __name__ == "__main__":
+    test_rows_flat_over_long_run()
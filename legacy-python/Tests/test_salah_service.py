@@ -0,0 +1,258 @@
+import sys
+import os
+import json
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+import pytest
+
+# Add parent directory to path to import salah_service
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from clock import SimulatedClock, set_clock
+from day_schedule import DaySchedule
+from salah_service import SalahService, ServiceClient
+from stub_server import StubServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LOCATIONS = [(51.5074, -0.1278), (52.4814, -1.8998), (53.4809, -2.2374), (55.9521, -3.1965)]
+
+def run_service(tmp, test, address=None):
+    """Runs test(service, stub) against a service in tmp and a stub API"""
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, os.environ.get("SALAH_SERVICE_TOKEN")
+    prayer_api.API_URL = stub.url + "/v1"
+    prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+    prayer_api.PREFETCH = "month"
+    os.environ["SALAH_SERVICE_TOKEN"] = os.path.join(tmp, "service.token")
+    if address is None:
+        address = os.path.join(tmp, "salah.sock") if hasattr(socket, "AF_UNIX") else ("127.0.0.1", 0)
+    service = SalahService(address).start()
+    try:
+        test(service, stub)
+    finally:
+        service.stop()
+        prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH = old[:3]
+        if old[3] is None:
+            os.environ.pop("SALAH_SERVICE_TOKEN", None)
+        else:
+            os.environ["SALAH_SERVICE_TOKEN"] = old[3]
+        stub.stop()
+
+def test_starts_without_qt():
+    code = "import sys, salah_service; print('PyQt6' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+def test_concurrent_requests_for_a_key_share_one_fetch():
+    def test(service, stub):
+        stub.delay = 0.3
+        client = ServiceClient(service.address)
+        results = []
+
+        def worker():
+            results.append(client.fetch_prayer_times(*LOCATIONS[0]))
+            client.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 50 and all(r == results[0] for r in results)
+        assert len(stub.requests) == 1
+        assert service.batcher.calls == 1 and service.batcher.joined == 49
+        print("PASS: 50 concurrent clients, one upstream request")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test)
+
+def test_answers_follow_the_clock():
+    def test(service, stub):
+        clock = SimulatedClock(datetime(2024, 3, 15, 11, 0))
+        previous = set_clock(clock)
+        try:
+            client = ServiceClient(service.address)
+            timings = client.fetch_prayer_times(*LOCATIONS[0])
+            assert timings == prayer_api.get_cached_prayer_times(*LOCATIONS[0], date(2024, 3, 15))
+            # 11:00 on the simulated day, whatever the real time is
+            schedule = DaySchedule(timings, clock.today())
+            i, remaining = schedule.lookup(clock.now())
+            assert client.next_prayer(*LOCATIONS[0]) == (schedule.names[i], schedule.times[i], remaining)
+            client.close()
+        finally:
+            set_clock(previous)
+        print("PASS: The service reads the same clock as the widget")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test)
+
+def test_client_without_service():
+    with tempfile.TemporaryDirectory() as tmp:
+        address = os.path.join(tmp, "none.sock") if hasattr(socket, "AF_UNIX") else ("127.0.0.1", 1)
+        assert ServiceClient.connect(address) is None
+
+def test_socket_is_for_the_group():
+    if not hasattr(socket, "AF_UNIX"):
+        pytest.skip("needs AF_UNIX")
+
+    def test(service, stub):
+        assert os.stat(service.address).st_mode & 0o777 == 0o660
+        assert ServiceClient(service.address).fetch_prayer_times(51.5074, -0.1278)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test)
+
+        # A folder it creates lets the group reach the socket but not add files
+        shared = os.path.join(tmp, "shared", "salah.sock")
+        service = SalahService(shared).start()
+        try:
+            assert os.stat(os.path.dirname(shared)).st_mode & 0o777 == 0o750
+            assert ServiceClient.connect(shared)
+        finally:
+            service.stop()
+
+        # Something else at the path is left alone, not deleted and replaced
+        taken = os.path.join(tmp, "taken.sock")
+        with open(taken, "w") as f:
+            f.write("not a socket")
+        with pytest.raises(RuntimeError):
+            SalahService(taken).start()
+        assert os.path.exists(taken) and ServiceClient.connect(taken) is None
+
+        # Nor does it serve from a folder anyone could have put a socket in
+        public = os.path.join(tmp, "public")
+        os.mkdir(public)
+        os.chmod(public, 0o777)
+        with pytest.raises(RuntimeError):
+            SalahService(os.path.join(public, "salah.sock")).start()
+    print("PASS: Socket open to the service's group only")
+
+def test_tcp_needs_the_token():
+    def test(service, stub):
+        token = os.path.join(tmp, "service.token")
+        assert open(token).read() == service.token
+        if hasattr(os, "getuid"):
+            assert os.stat(token).st_mode & 0o777 == 0o640
+
+        # Without the token: refused before anything is fetched
+        with socket.create_connection(service.address) as sock:
+            sock.sendall(b'{"op": "times", "lat": 51.5074, "lon": -0.1278}\n')
+            assert json.loads(sock.makefile("rb").readline()) == {"ok": False, "error": "not authorized"}
+        wrong = os.path.join(tmp, "wrong.token")
+        with open(wrong, "w") as f:
+            f.write("0" * 32)
+        assert ServiceClient.connect(service.address, token_path=wrong) is None
+        assert ServiceClient.connect(service.address, token_path=os.path.join(tmp, "missing")) is None
+        assert stub.requests == []
+
+        client = ServiceClient(service.address)
+        assert client.fetch_prayer_times(*LOCATIONS[0]) and len(stub.requests) == 1
+        client.close()
+        print("PASS: TCP clients need the token")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test, ("127.0.0.1", 0))
+        assert not os.path.exists(os.path.join(tmp, "service.token"))
+
+def test_widget_never_waits_for_the_service():
+    from PyQt6.QtWidgets import QApplication
+    from widget import SalahWidget
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    blocking = []
+    original = ServiceClient.call
+
+    def call(client, op, **params):
+        # Connecting pings once at startup, with a short timeout; nothing else may run on the GUI thread
+        if op != "ping" and threading.current_thread() is threading.main_thread():
+            blocking.append(op)
+        return original(client, op, **params)
+
+    def test(service, stub):
+        old_env = os.environ.get("SALAH_SERVICE")
+        os.environ["SALAH_SERVICE"] = service.address if isinstance(service.address, str) else "%s:%d" % service.address
+        ServiceClient.call = call
+        try:
+            w = SalahWidget()
+            assert w.api is not prayer_api
+            for _ in range(3):
+                w.fetcher.wait()
+                app.processEvents()
+            w.set_active_location({"name": "Birmingham", "lat": 52.4814, "lon": -1.8998})
+            for _ in range(3):
+                w.fetcher.wait()
+                app.processEvents()
+            assert w.service_times[(52.4814, -1.8998, date.today(), w.method, w.school)]
+            w.close()
+        finally:
+            ServiceClient.call = original
+            if old_env is None:
+                os.environ.pop("SALAH_SERVICE", None)
+            else:
+                os.environ["SALAH_SERVICE"] = old_env
+        assert blocking == [], blocking
+        print("PASS: The widget asks the service in the background only")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test)
+
+def load_test(clients=200, requests_each=25):
+    """Returns requests/sec for `clients` concurrent connections once the cache is warm"""
+    rate = []
+
+    def test(service, stub):
+        client = ServiceClient(service.address)
+        client.warm_cache(LOCATIONS, [date.today()])
+        errors = []
+        ready = threading.Barrier(clients + 1)
+
+        def worker(n):
+            ready.wait()
+            try:
+                for i in range(requests_each):
+                    lat, lon = LOCATIONS[(n + i) % len(LOCATIONS)]
+                    if i % 2:
+                        client.next_prayer(lat, lon)
+                    else:
+                        client.fetch_prayer_times(lat, lon)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                client.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+        for t in threads:
+            t.start()
+        ready.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        assert not errors, errors[:3]
+        rate.append(clients * requests_each / elapsed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_service(tmp, test)
+    return rate[0]
+
+def test_load():
+    rate = load_test()
+    print(f"Load: 200 concurrent clients, {rate:.0f} requests/s")
+    assert rate > 200
+
+if __name__ == "__main__":
+    test_starts_without_qt()
+    test_concurrent_requests_for_a_key_share_one_fetch()
+    test_answers_follow_the_clock()
+    test_client_without_service()
+    test_socket_is_for_the_group()
+    test_tcp_needs_the_token()
+    test_widget_never_waits_for_the_service()
+    for clients in (10, 100, 200, 500):
+        print(f"{clients:>4} clients: {load_test(clients):.0f} requests/s")
@@ -0,0 +1,162 @@
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Add parent directory to path to import settings_store
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import settings_store
+from settings_store import SettingsStore, settings_path, user_file, validate
+
+LONDON = {"name": "London", "lat": 51.5074, "lon": -0.1278, "method": 2, "school": 0}
+MAKKAH = {"name": "Makkah", "lat": 21.4225, "lon": 39.8262}
+DEFAULTS = {"active_location": LONDON, "saved_locations": [LONDON]}
+
+def test_burst_of_changes_is_one_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "config", "settings.json")
+        store = SettingsStore(path, DEFAULTS, save_delay=0.2)
+        assert not store.loaded and not os.path.exists(path)  # Defaults aren't written until changed
+        heard = []
+        store.add_listener(lambda key, value: heard.append(key))
+
+        for offset in range(-30, 0):
+            store.set("reminders", {"offsets": [offset], "all_locations": False})
+        store.set("saved_locations", [LONDON, MAKKAH])
+        assert not store.set("saved_locations", [LONDON, MAKKAH])  # Unchanged, nobody told
+        assert heard == ["reminders"] * 30 + ["saved_locations"]
+        assert not os.path.exists(path)
+
+        time.sleep(0.5)  # The debounce fires on its own thread
+        assert store.stats["writes"] == 1
+        assert os.listdir(os.path.dirname(path)) == ["settings.json"]  # No temp files left behind
+        with open(path) as f:
+            saved = json.load(f)
+        assert saved["reminders"]["offsets"] == [-1] and saved["saved_locations"][1]["name"] == "Makkah"
+        assert SettingsStore(path).loaded
+        print("PASS: A burst of changes is written once")
+
+def test_corrupt_file_recovers_last_good_copy():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "settings.json")
+        store = SettingsStore(path, DEFAULTS)
+        store.set("saved_locations", [LONDON, MAKKAH])
+        store.flush()
+        store.set("active_location", MAKKAH)
+        store.flush()
+        # Cut short mid-write
+        with open(path, "r+") as f:
+            f.truncate(40)
+
+        store = SettingsStore(path, DEFAULTS)
+        assert store.loaded and store.stats["recovered"] == 1
+        assert store["active_location"]["name"] == "London"  # The copy before the last save
+        assert os.path.exists(path + ".corrupt")
+        store.flush()
+        assert SettingsStore(path)["saved_locations"][1]["name"] == "Makkah"
+        print("PASS: A corrupt file is set aside and the backup loaded")
+
+def test_validation():
+    data = validate({"active_location": {"name": "Nowhere", "lat": 200, "lon": 0},
+                     "saved_locations": [MAKKAH, "London", dict(LONDON, lat="51.5", school=3)],
+                     "reminders": {"offsets": "soon", "all_locations": True}})
+    assert data["active_location"] == MAKKAH
+    assert data["saved_locations"][1]["lat"] == 51.5 and "school" not in data["saved_locations"][1]
+    assert data["reminders"] == {"all_locations": True}
+    for bad in ([], {"saved_locations": []}, {"active_location": {"name": "X"}}):
+        try:
+            validate(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+    store = SettingsStore(os.path.join(tempfile.mkdtemp(), "settings.json"), DEFAULTS)
+    try:
+        store.set("active_location", {"name": "X"})
+        assert False, "expected a ValueError"
+    except ValueError:
+        assert store["active_location"] == LONDON
+    print("PASS: Unusable entries dropped, bad changes refused")
+
+def test_per_user_directory_and_legacy_file():
+    old = os.environ.get("SALAH_CONFIG_DIR")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SALAH_CONFIG_DIR"] = os.path.join(tmp, "config")
+        try:
+            assert settings_path() == os.path.join(tmp, "config", "settings.json")
+            legacy = os.path.join(tmp, "settings.json")
+            with open(legacy, "w") as f:
+                json.dump({"active_location": MAKKAH, "saved_locations": [MAKKAH]}, f, indent=4)
+            store = SettingsStore(legacy=[legacy])
+            assert store.loaded and store["active_location"]["name"] == "Makkah"
+            store.flush()
+            assert SettingsStore()["active_location"]["name"] == "Makkah"
+        finally:
+            if old is None:
+                os.environ.pop("SALAH_CONFIG_DIR", None)
+            else:
+                os.environ["SALAH_CONFIG_DIR"] = old
+    print("PASS: Settings moved from beside the scripts to the config directory")
+
+def test_user_files_move_from_beside_the_scripts():
+    old = os.environ.pop("SALAH_CONFIG_DIR", None), settings_store.LEGACY_DIR, settings_store.config_dir
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "config")
+        settings_store.LEGACY_DIR = tmp
+        settings_store.config_dir = lambda: config
+        try:
+            for name in ("completions.bin", "completions.bin.log"):
+                with open(os.path.join(tmp, name), "wb") as f:
+                    f.write(name.encode())
+            path = user_file("completions.bin", (".log",))
+            assert path == os.path.join(config, "completions.bin")
+            assert sorted(os.listdir(config)) == ["completions.bin", "completions.bin.log"]
+            assert not os.path.exists(os.path.join(tmp, "completions.bin.log"))
+            # Chosen explicitly: nothing is moved
+            os.environ["SALAH_CONFIG_DIR"] = config
+            with open(os.path.join(tmp, "other.bin"), "wb") as f:
+                f.write(b"x")
+            user_file("other.bin")
+            assert os.path.exists(os.path.join(tmp, "other.bin"))
+        finally:
+            if old[0] is None:
+                os.environ.pop("SALAH_CONFIG_DIR", None)
+            else:
+                os.environ["SALAH_CONFIG_DIR"] = old[0]
+            settings_store.LEGACY_DIR, settings_store.config_dir = old[1:]
+    print("PASS: completions.bin moved to the config directory with its log")
+
+def test_prayer_cache_moves_from_the_working_directory():
+    import metrics
+    import prayer_api
+    old = (os.environ.pop("SALAH_CONFIG_DIR", None), settings_store.cache_dir, os.getcwd(),
+           prayer_api.CACHE_FILE, prayer_api._cache)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "cache")
+        settings_store.cache_dir = lambda: cache
+        prayer_api.CACHE_FILE, prayer_api._cache = None, None
+        os.chdir(tmp)
+        try:
+            with open("prayer_cache.json", "w") as f:
+                json.dump({}, f)
+            assert prayer_api.get_cache().path == os.path.join(cache, "prayer_cache.json")
+            assert os.listdir(cache) == ["prayer_cache.json"] and not os.path.exists("prayer_cache.json")
+            assert metrics.dump() == os.path.join(cache, "metrics.json")
+            prayer_api._cache.close()
+        finally:
+            os.chdir(old[2])
+            if old[0] is not None:
+                os.environ["SALAH_CONFIG_DIR"] = old[0]
+            settings_store.cache_dir = old[1]
+            prayer_api.CACHE_FILE, prayer_api._cache = old[3:]
+    print("PASS: prayer_cache.json moved from the working directory to the cache directory")
+
+if __name__ == "__main__":
+    test_burst_of_changes_is_one_write()
+    test_corrupt_file_recovers_last_good_copy()
+    test_validation()
+    test_per_user_directory_and_legacy_file()
+    test_user_files_move_from_beside_the_scripts()
+    test_prayer_cache_moves_from_the_working_directory()
@@ -0,0 +1,71 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import clock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clock import SimulatedClock
+from clock_watch import BACKSTOP_MS
+from bench_suite import BenchEnv
+import soak
+
+def test_simulated_timers_fire_in_order():
+    clock = SimulatedClock(datetime(2024, 3, 1, 23, 0))
+    fired = []
+    hourly = clock.timer()
+    hourly.timeout.connect(lambda: fired.append(("hourly", clock.now())))
+    hourly.start(3600 * 1000)
+    once = clock.timer()
+    once.setSingleShot(True)
+    once.timeout.connect(lambda: fired.append(("once", clock.now())))
+    once.start(90 * 60 * 1000)
+    clock.single_shot(0, lambda: fired.append(("now", clock.now())))
+    cancelled = clock.timer()
+    cancelled.timeout.connect(lambda: fired.append(("cancelled", clock.now())))
+    cancelled.start(1000)
+    cancelled.stop()
+
+    assert clock.advance(timedelta(hours=3)) == 5
+    start = datetime(2024, 3, 1, 23, 0)
+    assert fired == [("now", start), ("hourly", start + timedelta(hours=1)),
+                     ("once", start + timedelta(minutes=90)), ("hourly", start + timedelta(hours=2)),
+                     ("hourly", start + timedelta(hours=3))]
+    assert clock.today().day == 2 and clock.monotonic() == 3 * 3600
+    assert hourly.isActive() and not once.isActive() and hourly.remainingTime() == 3600 * 1000
+
+    # A suspend moves the wall clock but not the timers: nothing fires, and the next one is late
+    clock.jump(timedelta(hours=5))
+    assert clock.monotonic() == 3 * 3600 and hourly.remainingTime() == 3600 * 1000
+    assert clock.advance(timedelta(seconds=1)) == 0
+    assert clock.advance(timedelta(hours=1)) == 1
+    assert fired[-1] == ("hourly", start + timedelta(hours=9))
+    print("PASS: Simulated timers fire in order")
+
+def test_weeks_of_uptime_stay_flat():
+    with BenchEnv() as env:
+        samples = soak.simulate(days=14, env=env)
+    soak.print_report(samples, out=sys.stdout)
+    assert len(samples) == 14
+    # A tick about every minute awake, every day, midnight rollovers included
+    assert all(1400 <= s["ticks"] + s["suspended_min"] <= 1450 for s in samples)
+    # On top of them, a clock check every BACKSTOP_MS and one per reminder (three a prayer at two locations)
+    assert all(s["wakeups"] - s["ticks"] <= 24 * 3600 * 1000 // BACKSTOP_MS + 3 * 5 * 2 for s in samples)
+    assert sum(s["suspended_min"] > 0 for s in samples) == 2
+    assert max(s["resume_lag"] for s in samples) <= soak.MAX_RESUME_LAG
+    assert sum(s["network"] for s in samples) <= 4  # Month tables, not a request per day or per hour
+    assert soak.unbounded(samples) == []
+    print("PASS: Two simulated weeks without growth")
+
+def test_growth_is_flagged():
+    flat = {name: 10 for name in soak.LIMITS}
+    samples = [dict(flat, rss_kb=60000 + day * 500) for day in range(30)]
+    assert soak.unbounded(samples) == ["rss_kb"]
+    samples = [dict(flat, widgets=26 + (day > 20)) for day in range(30)]
+    assert soak.unbounded(samples) == ["widgets"]
+    print("PASS: Growing measurements are reported")
+
+if __name__ == "__main__":
+    test_simulated_timers_fire_in_order()
+    test_weeks_of_uptime_stay_flat()
+    test_growth_is_flagged()
@@ -40,7 +40,7 @@ def test_strikethrough():
         return
 
     print("Checking initial state...")
-    if "line-through" in fajr_row.name_label.styleSheet():
+    if fajr_row.name_label.font().strikeOut():
          print("FAIL: Initial state has line-through")
     else:
          print("PASS: Initial state correct")
@@ -49,7 +49,7 @@ def test_strikethrough():
     # Simulate click logic (calling the callback directly as we can't easily fake mouse events in headless without more setup)
     widget.toggle_prayer_completion("Fajr")
     
-    # Re-find the row as update_times clears and recreates them
+    # Re-find the row (rows are updated in place, so it is the same widget)
     fajr_row = None
     for i in range(widget.list_layout.count()):
         item = widget.list_layout.itemAt(i)
@@ -64,7 +64,7 @@ def test_strikethrough():
         return
 
     print("Checking toggled state...")
-    if "line-through" in fajr_row.name_label.styleSheet():
+    if fajr_row.name_label.font().strikeOut():
          print("PASS: Toggled state has line-through")
     else:
          print("FAIL: Toggled state missing line-through")
@@ -82,7 +82,7 @@ def test_strikethrough():
                 fajr_row = row
                 break
     
-    if "line-through" in fajr_row.name_label.styleSheet():
+    if fajr_row.name_label.font().strikeOut():
          print("PASS: State persisted after update")
     else:
          print("FAIL: State lost after update")
@@ -0,0 +1,75 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import tick_scheduler
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from clock import SimulatedClock
+from clock_watch import ClockWatch, BACKSTOP_MS
+from day_schedule import DaySchedule
+from reminders import ReminderScheduler
+from tick_scheduler import TickScheduler, next_change
+
+TIMINGS = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+
+def test_next_change_boundaries():
+    assert next_change(datetime(2024, 3, 1, 10, 15, 42, 500000), TIMINGS) == datetime(2024, 3, 1, 10, 16)
+    assert next_change(datetime(2024, 3, 1, 11, 59, 59), TIMINGS) == datetime(2024, 3, 1, 12, 0)
+    assert next_change(datetime(2024, 3, 1, 23, 59, 30), TIMINGS) == datetime(2024, 3, 2, 0, 0)
+    print("PASS: Minute, prayer and midnight boundaries")
+
+def test_wakeups_per_hour():
+    # One simulated day of the ticker and reminders, counting every timer that wakes the process
+    clock = SimulatedClock(datetime(2024, 3, 1, 0, 0, 0, 300000))
+    watch = ClockWatch(clock=clock)
+    ticker = TickScheduler(None, TIMINGS, clock=clock, watch=watch)
+    reminders = ReminderScheduler(offsets=(-15, 0), clock=clock, watch=watch)
+    reminders.set_locations({"home": (DaySchedule(TIMINGS, clock.today()), None)})
+    ticker.start()
+    clock.advance(timedelta(days=1))
+    per_hour = (ticker.wakeups + reminders.wakeups) / 24
+    print(f"Wake-ups per hour: 3600 with the 1 s timer, {per_hour:.0f} with the schedulers "
+          f"({ticker.ticks / 24:.0f} ticks, {watch.wakeups / 24:.0f} clock checks, "
+          f"{reminders.wakeups / 24:.1f} reminders)")
+    assert reminders.wakeups == 10 and watch.wakeups == 24 * 3600 * 1000 // BACKSTOP_MS
+    assert per_hour <= 61 + 3600 * 1000 / BACKSTOP_MS + 1
+    assert ticker.wakeups_per_hour() == ticker.wakeups / 24
+
+def test_unreported_resume_is_noticed_by_the_next_tick():
+    clock = SimulatedClock(datetime(2024, 3, 1, 10, 15, 30))
+    ticker = TickScheduler(None, TIMINGS, clock=clock)
+    shown = []
+    ticker.tick.connect(lambda: shown.append(clock.now().strftime("%H:%M")))
+    ticker.start()
+    clock.advance(timedelta(seconds=45))
+    assert shown == ["10:16"] and ticker.resyncs == 0
+
+    # Asleep for 50 minutes, and nothing reported it: the pending tick comes due
+    # ~45 s after waking, late, and tells the watch (and so the reminders)
+    clock.jump(timedelta(minutes=50))
+    clock.advance(timedelta(seconds=46))
+    assert ticker.resyncs == 1 and ticker.watch.changes == 1 and shown[-1] == "11:07", shown
+    clock.advance(timedelta(milliseconds=BACKSTOP_MS))
+    assert ticker.resyncs == 1 and shown[-4:] == ["11:08", "11:09", "11:10", "11:11"], shown
+    print("PASS: Unreported resume noticed by the next tick")
+
+def test_reported_resume_resyncs_at_once():
+    clock = SimulatedClock(datetime(2024, 3, 1, 10, 15, 30))
+    ticker = TickScheduler(None, TIMINGS, clock=clock)
+    shown = []
+    ticker.tick.connect(lambda: shown.append(clock.now().strftime("%H:%M")))
+    ticker.start()
+    clock.jump(timedelta(minutes=50))
+    ticker.watch.notify()  # What WM_POWERBROADCAST or logind's PrepareForSleep report on waking
+    assert ticker.resyncs == 1 and shown == ["11:05"], shown
+    # The backstop's next check doesn't count the same jump again
+    clock.advance(timedelta(milliseconds=BACKSTOP_MS))
+    assert ticker.resyncs == 1 and ticker.watch.changes == 1
+    print("PASS: Reported resume shown at once")
+
+if __name__ == "__main__":
+    test_next_change_boundaries()
+    test_wakeups_per_hour()
+    test_unreported_resume_is_noticed_by_the_next_tick()
+    test_reported_resume_resyncs_at_once()
@@ -0,0 +1,101 @@
+import sys
+import os
+import json
+import random
+import tempfile
+from datetime import date, timedelta
+
+# Add parent directory to path to import prayer_api
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from prayer_calc import compute_prayer_times, compute_prayer_hours
+from stub_server import StubServer
+
+TRACE = os.path.join(os.path.dirname(__file__), "fixtures", "location_trace.json")
+KEYS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
+
+def replay(tile_degrees):
+    """Runs the recorded coordinate trace through fetch_prayer_times; returns (lookups, requests)"""
+    with open(TRACE) as f:
+        trace = json.load(f)
+    stub = StubServer().start()
+    old = (prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH,
+           prayer_api.CACHE_TTL_DAYS, prayer_api.TILE_DEGREES)
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        prayer_api.PREFETCH = "month"
+        prayer_api.CACHE_TTL_DAYS = None  # The trace is from a past month
+        prayer_api.TILE_DEGREES = tile_degrees
+        try:
+            for lat, lon, day in trace:
+                prayer_api.fetch_prayer_times(lat, lon, date.fromisoformat(day))
+            return len(trace), len(stub.requests)
+        finally:
+            prayer_api.get_cache().flush()
+            (prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH,
+             prayer_api.CACHE_TTL_DAYS, prayer_api.TILE_DEGREES) = old
+            stub.stop()
+
+def test_tile_center():
+    assert prayer_api.tile_center(51.5074, -0.1278) == (51.525, -0.125)
+    # About a kilometre apart, same tile; the centre is in its own tile
+    assert prayer_api.tile_center(51.5160, -0.1390) == (51.525, -0.125)
+    assert prayer_api.tile_center(51.525, -0.125) == (51.525, -0.125)
+    assert prayer_api.tile_center(-33.8679, 151.2073) == (-33.875, 151.225)
+
+def test_trace_hit_rate():
+    lookups, exact = replay(None)
+    _, tiled = replay(0.05)
+    print(f"Trace of {lookups} lookups: {exact} requests per point, {tiled} per 0.05 degree tile")
+    assert tiled < exact / 4
+    assert 1 - tiled / lookups > 0.9
+
+def minutes_apart(a, b):
+    diff = abs(int(a[:2]) * 60 + int(a[3:5]) - int(b[:2]) * 60 - int(b[3:5]))
+    return min(diff, 1440 - diff)
+
+def test_tile_error_bound():
+    rng = random.Random(7)
+    worst = 0.0
+    for _ in range(500):
+        lat, lon = rng.uniform(-55, 55), rng.uniform(-180, 180)
+        day = date(2024, 1, 1) + timedelta(days=rng.randrange(366))
+        tile = prayer_api.tile_center(lat, lon)
+        here = compute_prayer_hours(lat, lon, day, tz=0)
+        there = compute_prayer_hours(tile[0], tile[1], day, tz=0)
+        worst = max(worst, max(abs(here[k] - there[k]) * 3600 for k in KEYS))
+    print(f"Uncorrected 0.05 degree tile error below 55N/S: up to {worst:.1f} s")
+    assert worst < 30
+
+def test_correction_on_coarse_tiles():
+    rng = random.Random(7)
+    old = prayer_api.TILE_DEGREES
+    prayer_api.TILE_DEGREES = 0.25
+    worst_corrected = worst_uncorrected = 0
+    try:
+        for _ in range(500):
+            lat, lon = rng.uniform(-65, 65), rng.uniform(-180, 180)
+            day = date(2024, 1, 1) + timedelta(days=rng.randrange(366))
+            tile = prayer_api.tile_center(lat, lon)
+            # The local engine stands in for the API: the tile's rounded timings moved to the point
+            cached = compute_prayer_times(tile[0], tile[1], day, tz=0)
+            served = prayer_api._from_tile(cached, lat, lon, tile, day, 2, 0)
+            exact = compute_prayer_times(lat, lon, day, tz=0)
+            for k in KEYS:
+                worst_corrected = max(worst_corrected, minutes_apart(served[k], exact[k]))
+                worst_uncorrected = max(worst_uncorrected, minutes_apart(cached[k], exact[k]))
+    finally:
+        prayer_api.TILE_DEGREES = old
+    print(f"0.25 degree tiles up to 65N/S: {worst_uncorrected} min off uncorrected, {worst_corrected} corrected")
+    # Only the rounding of the cached minute is left
+    assert worst_corrected <= 1 < worst_uncorrected
+
+if __name__ == "__main__":
+    test_tile_center()
+    for degrees in (None, 0.01, 0.05, 0.1):
+        lookups, requests = replay(degrees)
+        print(f"TILE_DEGREES={degrees}: {requests} requests, hit rate {1 - requests / lookups:.1%}")
+    test_tile_error_bound()
+    test_correction_on_coarse_tiles()
@@ -0,0 +1,109 @@
+import sys
+import gc
+import weakref
+import os
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+
+# Add parent directory to path to import timing_cache
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from timing_cache import TimingCache
+
+TIMINGS = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+
+def day_key(offset, lat=51.5074):
+    return f"{lat},-0.1278,{(date.today() + timedelta(days=offset)).isoformat()}"
+
+def test_lru_eviction_and_counters():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TimingCache(os.path.join(tmp, "cache.json"), capacity=2, flush_delay=60)
+        cache.put(day_key(0, 1), TIMINGS)
+        cache.put(day_key(0, 2), TIMINGS)
+        assert cache.get(day_key(0, 1)) == TIMINGS  # 1 becomes most recent
+        cache.put(day_key(0, 3), TIMINGS)           # evicts 2
+        assert cache.get(day_key(0, 2)) is None
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+        assert cache.stats["evictions"] == 1
+        cache.flush()
+        print(f"PASS: LRU eviction {cache.stats}")
+
+def test_writes_are_batched_and_atomic():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.json")
+        cache = TimingCache(path, flush_delay=60)
+        for lat in range(10):
+            cache.put(day_key(0, lat), TIMINGS)
+            cache.get(day_key(0, lat))
+        assert not os.path.exists(path)  # nothing written until the debounce fires
+        cache.flush()
+        cache.flush()
+        assert cache.stats["writes"] == 1
+        assert os.listdir(tmp) == ["cache.json"]  # no temp files left behind
+
+        reloaded = TimingCache(path)
+        assert reloaded.get(day_key(0, 9)) == TIMINGS
+        print("PASS: One write for a burst of changes")
+
+def test_failed_write_is_retried():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "missing", "cache.json")
+        cache = TimingCache(path, flush_delay=60)
+        cache.put(day_key(0), TIMINGS)
+        cache.flush()  # The folder isn't there: the write fails
+        assert cache.stats["writes"] == 0
+        os.mkdir(os.path.dirname(path))
+        cache.close()  # What exit would do
+        assert cache.stats["writes"] == 1 and TimingCache(path).get(day_key(0)) == TIMINGS
+        # A closed cache is no longer kept alive for the flush at exit
+        closed = weakref.ref(cache)
+        del cache
+        gc.collect()
+        assert closed() is None
+        print("PASS: Failed write kept pending and retried")
+
+def test_concurrent_flushes_keep_the_newest_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.json")
+        cache = TimingCache(path, capacity=200, flush_delay=60)
+
+        def writer(start):
+            for lat in range(start, start + 20):
+                cache.put(day_key(0, lat), TIMINGS)
+                cache.flush()
+
+        threads = [threading.Thread(target=writer, args=(n * 20,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Whichever flush ran last wrote every entry; an older snapshot never lands after it
+        assert len(TimingCache(path, capacity=200)) == 160
+        assert cache.stats["writes"] <= 160
+        print(f"PASS: {cache.stats['writes']} concurrent flushes, newest snapshot on disk")
+
+def test_migration_and_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.json")
+        with open(path, 'w') as f:
+            # Old single-object format
+            json.dump({"key": day_key(0), "data": TIMINGS}, f)
+        assert TimingCache(path).get(day_key(0)) == TIMINGS
+
+        with open(path, 'w') as f:
+            json.dump({"locations": [{"key": day_key(-5), "data": TIMINGS},
+                                     {"key": day_key(1), "data": TIMINGS}]}, f)
+        cache = TimingCache(path, ttl_days=1)
+        assert cache.get(day_key(-5)) is None  # expired by date
+        assert cache.get(day_key(1)) == TIMINGS
+        cache.flush()
+        print("PASS: Migration and TTL")
+
+if __name__ == "__main__":
+    test_lru_eviction_and_counters()
+    test_writes_are_batched_and_atomic()
+    test_failed_write_is_retried()
+    test_concurrent_flushes_keep_the_newest_snapshot()
+    test_migration_and_ttl()
@@ -0,0 +1,67 @@
+import sys
+import os
+import json
+import tempfile
+from datetime import date
+
+# Add parent directory to path to import timing_store
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from timing_store import SqliteTimingStore
+
+TIMINGS = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+FIELDS = list(TIMINGS)
+
+def test_day_and_month_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SqliteTimingStore(os.path.join(tmp, "cache.db"))
+        store.put("51.5074,-0.1278,2024-03-15", TIMINGS)
+        assert store.get("51.5074,-0.1278,2024-03-15") == TIMINGS
+        assert store.get("51.5074,-0.1278,2024-03-16") is None
+
+        # A month table is upserted as one row per day, in one transaction
+        table = {"fields": FIELDS, "days": [list(TIMINGS.values())] * 31}
+        store.put("51.5074,-0.1278,2024-03", table)
+        assert len(store) == 31
+        assert store.get("51.5074,-0.1278,2024-03-31") == TIMINGS
+        assert store.get("51.5074,-0.1278,2024-03") == table
+        assert store.get("51.5074,-0.1278,2024-04") is None
+
+        week = store.query_range(51.5074, -0.1278, date(2024, 3, 1), date(2024, 3, 7))
+        assert [d.day for d, _ in week] == list(range(1, 8))
+        print(f"PASS: Day and month rows {store.stats}")
+        store.close()
+
+def test_methods_are_separate():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        isna, mwl = SqliteTimingStore(path, method=2), SqliteTimingStore(path, method=3)
+        isna.put("51.5074,-0.1278,2024-03-15", TIMINGS)
+        assert mwl.get("51.5074,-0.1278,2024-03-15") is None
+        isna.close()
+        mwl.close()
+        print("PASS: Method is part of the index")
+
+def test_migrates_json_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "prayer_cache.json")
+        with open(json_path, 'w') as f:
+            json.dump({"locations": [{"key": "21.4225,39.8262,2024-03-15", "data": TIMINGS},
+                                     {"key": "51.5074,-0.1278,2024-02", "data": {"fields": FIELDS, "days": [list(TIMINGS.values())] * 29}}]}, f)
+        store = SqliteTimingStore(os.path.join(tmp, "cache.db"), json_path=json_path)
+        assert store.get("21.4225,39.8262,2024-03-15") == TIMINGS
+        assert store.get("51.5074,-0.1278,2024-02-29") == TIMINGS
+        assert len(store) == 30
+
+        # Only migrated once
+        store.put("21.4225,39.8262,2024-03-15", {"Fajr": "04:00"})
+        store.close()
+        store = SqliteTimingStore(os.path.join(tmp, "cache.db"), json_path=json_path)
+        assert store.get("21.4225,39.8262,2024-03-15") == {"Fajr": "04:00"}
+        store.close()
+        print("PASS: Migrated prayer_cache.json")
+
+if __name__ == "__main__":
+    test_day_and_month_rows()
+    test_methods_are_separate()
+    test_migrates_json_cache()
@@ -0,0 +1,103 @@
+import sys
+import os
+import time
+import tempfile
+from datetime import date, timedelta
+
+# Add parent directory to path to import transport
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from transport import Transport, CircuitOpenError
+from stub_server import StubServer
+
+def no_sleep(seconds):
+    pass
+
+def test_retries_with_backoff():
+    stub = StubServer().start()
+    try:
+        transport = Transport(retries=2, sleep=no_sleep)
+        stub.faults = [500, "drop"]
+        response = transport.get(stub.url + "/v1/timings", endpoint="timings")
+        assert response.status_code == 200
+        stats = transport.metrics()["timings"]
+        assert stats["calls"] == 3 and stats["failures"] == 2, stats
+        print(f"PASS: Retried to success {stats}")
+    finally:
+        stub.stop()
+
+def test_circuit_breaker_fails_fast_then_recovers():
+    stub = StubServer().start()
+    try:
+        transport = Transport(retries=0, failure_threshold=2, reset_timeout=0.2, sleep=no_sleep)
+        stub.faults = [503, 503]
+        for _ in range(2):
+            assert transport.get(stub.url + "/v1/timings").status_code == 503
+        try:
+            transport.get(stub.url + "/v1/timings")
+            assert False, "expected the circuit to be open"
+        except CircuitOpenError:
+            pass
+        assert len(stub.requests) == 2  # the rejected call never reached the server
+
+        time.sleep(0.25)  # half-open: one trial call closes it again
+        assert transport.get(stub.url + "/v1/timings").status_code == 200
+        assert transport.metrics()["breakers"][stub.url[7:]] == "closed"
+        print("PASS: Circuit opened and recovered")
+    finally:
+        stub.stop()
+
+def test_timeouts_are_counted():
+    stub = StubServer().start()
+    try:
+        transport = Transport(retries=1, sleep=no_sleep)
+        stub.delay = 0.5
+        start = time.perf_counter()
+        try:
+            transport.get(stub.url + "/v1/timings", timeout=0.1, endpoint="timings")
+            assert False, "expected a timeout"
+        except CircuitOpenError:
+            assert False, "breaker should still be closed"
+        except Exception:
+            pass
+        assert time.perf_counter() - start < 0.5
+        assert transport.metrics()["timings"]["failures"] == 2
+        print("PASS: Timeouts retried and counted")
+    finally:
+        stub.delay = 0
+        stub.stop()
+
+def test_serves_stale_cache_while_api_down():
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE
+    transport = prayer_api.get_transport()
+    old_sleep = transport.sleep
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        transport.sleep = no_sleep
+        try:
+            # The oldest day allowed, so it must also outlive the cache TTL on a restart
+            oldest = date.today() - timedelta(days=prayer_api.STALE_DAYS)
+            stale = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:00", "Maghrib": "18:00", "Isha": "20:00"}
+            # Cached for the tile London falls in, with the default method
+            lat, lon = prayer_api.tile_center(51.5074, -0.1278)
+            settings = f"{prayer_api.METHOD}-{prayer_api.SCHOOL}"
+            prayer_api.get_cache().put(f"{lat},{lon},{settings},{oldest.isoformat()}", stale)
+            prayer_api.get_cache().close()
+            prayer_api._cache = None
+            stub.faults = [503] * 20
+            assert prayer_api.fetch_prayer_times(51.5074, -0.1278) == stale
+            print("PASS: Stale timings served while the API is down")
+        finally:
+            prayer_api.get_cache().flush()
+            prayer_api.API_URL, prayer_api.CACHE_FILE = old
+            transport.sleep = old_sleep
+            stub.stop()
+
+if __name__ == "__main__":
+    test_retries_with_backoff()
+    test_circuit_breaker_fails_fast_then_recovers()
+    test_timeouts_are_counted()
+    test_serves_stale_cache_while_api_down()
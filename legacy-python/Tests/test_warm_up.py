@@ -0,0 +1,51 @@
+import sys
+import os
+import tempfile
+import time
+from datetime import date
+
+# Add parent directory to path to import prayer_api
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import prayer_api
+from stub_server import StubServer
+
+# Two spots in the same tile and two cities elsewhere
+LOCATIONS = [(51.5074, -0.1278), (51.5160, -0.1390), (52.4814, -1.8998), (53.4809, -2.2374)]
+# The last day of a month and the first of the next
+DAYS = [date(2024, 3, 31), date(2024, 4, 1)]
+
+def test_warm_cache_fetches_each_tile_once_in_parallel():
+    stub = StubServer().start()
+    old = prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        prayer_api.API_URL = stub.url + "/v1"
+        prayer_api.CACHE_FILE = os.path.join(tmp, "prayer_cache.json")
+        prayer_api.PREFETCH = "month"
+        prayer_api.CACHE_TTL_DAYS = None  # Past dates
+        stub.delay = 0.2
+        try:
+            start = time.perf_counter()
+            fetched = prayer_api.warm_cache(LOCATIONS, DAYS)
+            elapsed = time.perf_counter() - start
+            # 3 tiles x 2 months, each fetched once, several at a time
+            assert fetched == 6 and len(stub.requests) == 6 and len(set(stub.requests)) == 6
+            print(f"Warm-up: {fetched} fetches in {elapsed:.2f} s ({fetched * stub.delay:.1f} s one at a time), "
+                  f"{stub.peak} at once")
+            assert stub.peak > 1
+
+            # Switching between them, on either side of midnight, is a cache hit
+            for lat, lon in LOCATIONS:
+                for day in DAYS:
+                    assert prayer_api.get_cached_prayer_times(lat, lon, day)
+                    prayer_api.fetch_prayer_times(lat, lon, day)
+            assert len(stub.requests) == 6
+            assert prayer_api.warm_cache(LOCATIONS, DAYS) == 0
+            print("PASS: Every saved location served from the cache")
+        finally:
+            prayer_api.get_cache().flush()
+            prayer_api.API_URL, prayer_api.CACHE_FILE, prayer_api.PREFETCH, prayer_api.CACHE_TTL_DAYS = old
+            stub.stop()
+
+if __name__ == "__main__":
+    test_warm_cache_fetches_each_tile_once_in_parallel()
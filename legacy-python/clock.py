@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import time
+import weakref
+from datetime import datetime, timedelta
+
+class SystemClock:
+    """The real wall clock, monotonic clock and QTimers"""
+
+    def now(self):
+        return datetime.now()
+
+    def today(self):
+        return datetime.now().date()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def timer(self, parent=None):
+        from PyQt6.QtCore import QTimer
+        return QTimer(parent)
+
+    def single_shot(self, msec, callback):
+        from PyQt6.QtCore import QTimer
+        QTimer.singleShot(msec, callback)
+
+class _Signal:
+    """Just enough of a pyqtSignal for SimulatedTimer.timeout"""
+
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        self._slots = [] if slot is None else [s for s in self._slots if s != slot]
+
+    def emit(self):
+        for slot in list(self._slots):
+            slot()
+
+class SimulatedTimer:
+    """Stands in for a QTimer on a SimulatedClock: the QTimer methods the widget uses"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.timeout = _Signal()
+        self._interval = 0
+        self._single_shot = False
+        self._generation = 0
+        self._due = None
+
+    def setSingleShot(self, single_shot):
+        self._single_shot = single_shot
+
+    def isSingleShot(self):
+        return self._single_shot
+
+    def setTimerType(self, timer_type):
+        pass  # Simulated timers are exact
+
+    def setInterval(self, msec):
+        self._interval = msec
+
+    def interval(self):
+        return self._interval
+
+    def start(self, msec=None):
+        if msec is not None:
+            self._interval = msec
+        self._generation += 1
+        self._due = self.clock._schedule(self._interval, timer=self)
+
+    def stop(self):
+        self._generation += 1
+        self._due = None
+
+    def isActive(self):
+        return self._due is not None
+
+    def remainingTime(self):
+        if self._due is None:
+            return -1
+        return max(0, int((self._due - self.clock._elapsed).total_seconds() * 1000))
+
+    def _fire(self):
+        if self._single_shot:
+            self._due = None
+        else:
+            self.start()
+        self.timeout.emit()
+
+class SimulatedClock:
+    """
+    A clock that only moves when told to, for running days of the widget in
+    seconds. Its timers fire in order as advance() moves time past them, and
+    `between` (e.g. processing Qt events) runs after each one. Like QTimers,
+    they count monotonic time, so a jump() of the wall clock doesn't fire them.
+    """
+
+    def __init__(self, start):
+        self._now = start
+        self._elapsed = timedelta(0)  # The monotonic clock, exact
+        self._queue = []  # (monotonic due, sequence, callback or None, timer weakref or None, timer generation)
+        self._sequence = itertools.count()
+        self.fired = 0
+
+    def now(self):
+        return self._now
+
+    def today(self):
+        return self._now.date()
+
+    def monotonic(self):
+        return self._elapsed.total_seconds()
+
+    def timer(self, parent=None):
+        return SimulatedTimer(self)
+
+    def single_shot(self, msec, callback):
+        self._schedule(msec, callback)
+
+    def _schedule(self, msec, callback=None, timer=None):
+        # Timers are held weakly: one that was dropped, stopped or restarted just doesn't fire
+        due = self._elapsed + timedelta(milliseconds=max(0, msec))
+        if timer is None:
+            entry = (due, next(self._sequence), callback, None, None)
+        else:
+            entry = (due, next(self._sequence), None, weakref.ref(timer), timer._generation)
+        heapq.heappush(self._queue, entry)
+        return due
+
+    def _set(self, elapsed):
+        self._now += elapsed - self._elapsed
+        self._elapsed = elapsed
+
+    def advance(self, delta, between=None):
+        """Moves time on by `delta`, firing every timer due on the way; returns how many fired"""
+        end = self._elapsed + delta
+        fired = 0
+        while self._queue and self._queue[0][0] <= end:
+            due, _, callback, timer, generation = heapq.heappop(self._queue)
+            if timer is not None:
+                timer = timer()
+                if timer is None or timer._generation != generation:
+                    continue
+                callback = timer._fire
+            if due > self._elapsed:
+                self._set(due)
+            callback()
+            fired += 1
+            if between:
+                between()
+        self._set(end)
+        self.fired += fired
+        return fired
+
+    def jump(self, delta):
+        """
+        Moves the wall clock only, as a clock change does, or a suspend to a
+        monotonic clock that stops while asleep: no timer fires, and each is
+        then late by `delta` in wall time
+        """
+        self._now += delta
+
+    def pending(self):
+        return len(self._queue)
+
+_clock = SystemClock()
+
+def get_clock():
+    """The clock prayer_api and the widget read: the system clock unless set_clock() was called"""
+    return _clock
+
+def set_clock(clock):
+    """Replaces the process-wide clock (None: the system clock); returns the previous one"""
+    global _clock
+    previous, _clock = _clock, clock or SystemClock()
+    return previous
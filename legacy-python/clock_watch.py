@@ -0,0 +1,123 @@
+import sys
+
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QGuiApplication
+from clock import get_clock
+
+# Wall clock and monotonic clock disagreeing by more than this means a clock
+# change or a suspend/resume
+JUMP_TOLERANCE = 2.0
+# How often the clocks are compared, for resumes and clock changes the platform
+# doesn't report (a clock set on Linux or macOS); within reminders.LATE_GRACE
+BACKSTOP_MS = 4 * 60 * 1000
+
+# Windows messages (winuser.h)
+WM_TIMECHANGE = 0x001E
+WM_POWERBROADCAST = 0x0218
+PBT_APMRESUMESUSPEND = 0x0007
+PBT_APMRESUMEAUTOMATIC = 0x0012
+
+if sys.platform == "win32":
+    from PyQt6.QtCore import QAbstractNativeEventFilter
+
+    class _WindowsFilter(QAbstractNativeEventFilter):
+        """Passes on the resume and time change messages sent to the widget's windows"""
+
+        def __init__(self, callback):
+            super().__init__()
+            self.callback = callback
+
+        def nativeEventFilter(self, event_type, message):
+            if bytes(event_type) == b"windows_generic_MSG":
+                import ctypes.wintypes
+                msg = ctypes.wintypes.MSG.from_address(int(message))
+                if msg.message == WM_TIMECHANGE or (
+                        msg.message == WM_POWERBROADCAST
+                        and msg.wParam in (PBT_APMRESUMESUSPEND, PBT_APMRESUMEAUTOMATIC)):
+                    # Not from inside the native event
+                    QTimer.singleShot(0, self.callback)
+            return False, 0
+
+class _PlatformEvents(QObject):
+    """What the platform reports: the application active again, and where it can, a resume or a clock set"""
+    changed = pyqtSignal()
+
+    def __init__(self, app):
+        super().__init__(app)
+        app.applicationStateChanged.connect(self._on_state_changed)
+        self._filter = None
+        if sys.platform == "win32":
+            self._filter = _WindowsFilter(self.changed.emit)
+            app.installNativeEventFilter(self._filter)
+        elif sys.platform.startswith("linux"):
+            try:
+                from PyQt6.QtDBus import QDBusConnection
+            except ImportError:
+                return  # Noticed by the backstop instead
+            QDBusConnection.systemBus().connect("org.freedesktop.login1", "/org/freedesktop/login1",
+                                                "org.freedesktop.login1.Manager", "PrepareForSleep",
+                                                self._on_prepare_for_sleep)
+
+    def _on_state_changed(self, state):
+        if state == Qt.ApplicationState.ApplicationActive:
+            self.changed.emit()
+
+    @pyqtSlot(bool)
+    def _on_prepare_for_sleep(self, sleeping):
+        if not sleeping:
+            self.changed.emit()
+
+_platform = None
+
+def platform_events():
+    """The application's _PlatformEvents, or None before there is a QGuiApplication"""
+    global _platform
+    app = QGuiApplication.instance()
+    if app is None:
+        return None
+    # A new application (tests make several) needs its own
+    if _platform is None or sip.isdeleted(_platform):
+        _platform = _PlatformEvents(app)
+    return _platform
+
+class ClockWatch(QObject):
+    """
+    Emits `changed` when timers, which count monotonic time, may have gone
+    stale: after a resume or a clock change. The platform reports those as they
+    happen; comparing the two clocks every BACKSTOP_MS catches the rest.
+    One is shared by everything the widget schedules, so the backstop is the
+    only wake-up it adds.
+    """
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None, clock=None, now=None):
+        super().__init__(parent)
+        self.clock = clock or get_clock()
+        self.now = now or self.clock.now
+        self.wakeups = 0
+        self.changes = 0
+        self._checked = (self.now().timestamp(), self.clock.monotonic())
+
+        self.timer = self.clock.timer(self)
+        self.timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self.timer.timeout.connect(self._check)
+        self.timer.start(BACKSTOP_MS)
+
+        events = platform_events()
+        if events is not None:
+            events.changed.connect(self.notify)
+
+    def _check(self):
+        self.wakeups += 1
+        wall, mono = self.now().timestamp(), self.clock.monotonic()
+        last_wall, last_mono = self._checked
+        self._checked = (wall, mono)
+        if abs((wall - last_wall) - (mono - last_mono)) > JUMP_TOLERANCE:
+            self.notify()
+
+    def notify(self):
+        """Reports a resume or a clock change, e.g. from the platform"""
+        self._checked = (self.now().timestamp(), self.clock.monotonic())  # Noticed; don't count it again
+        self.changes += 1
+        self.changed.emit()
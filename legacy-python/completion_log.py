@@ -0,0 +1,303 @@
+import atexit
+import os
+import queue
+import struct
+import tempfile
+import threading
+from datetime import date, timedelta
+
+import metrics
+
+PRAYERS = ("Fajr", "Dhuhr", "Asr", "Maghrib", "Isha")
+ALL_DONE = (1 << len(PRAYERS)) - 1
+# Log records: day ordinal and that day's mask after the change; replaying is idempotent
+RECORD = struct.Struct("<IB")
+# Snapshot: magic, ordinal of the first day, number of days, then one mask byte per day
+SNAPSHOT = struct.Struct("<4sII")
+MAGIC = b"SCL1"
+# Log records written before the next compaction folds them into the snapshot
+COMPACT_RECORDS = 4096
+
+class _Fenwick:
+    """Prefix sums over a fixed number of slots, O(log n) updates and queries"""
+    __slots__ = ("tree",)
+
+    def __init__(self, values):
+        # Linear-time build from the initial values
+        tree = [0] + list(values)
+        n = len(tree)
+        for i in range(1, n):
+            parent = i + (i & -i)
+            if parent < n:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, i, delta):
+        tree = self.tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """Sum of slots [0, i)"""
+        tree, total = self.tree, 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def last_gap(self, i):
+        """Largest slot < i holding 0 (slots hold 0 or 1), or -1 if there is none"""
+        zeros = i - self.prefix(i)
+        if zeros == 0:
+            return -1
+        # Walk down to the slot holding the zeros-th zero
+        tree, pos, step = self.tree, 0, 1 << (len(self.tree).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and step - tree[nxt] < zeros:
+                pos = nxt
+                zeros -= step - tree[nxt]
+            step >>= 1
+        return pos
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+class CompletionLog:
+    """
+    Which prayers were completed on which day, kept for years.
+    On disk: a dense snapshot (one byte per day, a bit per prayer) and an
+    append-only log of changes since, folded into the snapshot every
+    `compact_every` records. Writes go to a background thread, so toggling
+    never waits on the disk. In memory, a Fenwick tree per prayer and one for
+    fully completed days answer streaks and completion rates in O(log n).
+    """
+
+    def __init__(self, path, compact_every=COMPACT_RECORDS):
+        self.path = path
+        self.log_path = path + ".log"
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._origin = None  # Ordinal of masks[0]
+        self._masks = bytearray()
+        self._log_records = 0
+        self._load()
+        self._rebuild()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="completion-log", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # Loading
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    data = f.read()
+                magic, origin, days = SNAPSHOT.unpack_from(data)
+                if magic != MAGIC or len(data) < SNAPSHOT.size + days:
+                    raise ValueError("not a completion snapshot")
+                self._origin = origin
+                self._masks = bytearray(data[SNAPSHOT.size:SNAPSHOT.size + days])
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Completion history read error: {e}")
+        if os.path.exists(self.log_path):
+            try:
+                with open(self.log_path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                print(f"Completion log read error: {e}")
+                return
+            # A torn last record (crash mid-write) is ignored
+            usable = len(data) - len(data) % RECORD.size
+            for ordinal, mask in RECORD.iter_unpack(data[:usable]):
+                self._store(ordinal, mask & ALL_DONE)
+            self._log_records = usable // RECORD.size
+
+    def _store(self, ordinal, mask):
+        """Sets a day's mask, growing the day range (used while loading, before the trees exist)"""
+        if self._origin is None:
+            self._origin = ordinal
+        if ordinal < self._origin:
+            self._masks[0:0] = bytes(self._origin - ordinal)
+            self._origin = ordinal
+        i = ordinal - self._origin
+        if i >= len(self._masks):
+            self._masks.extend(bytes(i + 1 - len(self._masks)))
+        self._masks[i] = mask
+
+    def _rebuild(self):
+        # Room to grow so a new day rarely needs another rebuild
+        capacity = max(64, 2 * len(self._masks))
+        masks = self._masks + bytes(capacity - len(self._masks))
+        self._capacity = capacity
+        self._prayer_trees = [_Fenwick((m >> bit) & 1 for m in masks) for bit in range(len(PRAYERS))]
+        self._done_tree = _Fenwick(int(m == ALL_DONE) for m in masks)
+
+    def _index(self, day, grow=False):
+        ordinal = day.toordinal()
+        if self._origin is None:
+            if not grow:
+                return None
+            self._origin = ordinal
+        i = ordinal - self._origin
+        if grow and not 0 <= i < self._capacity:
+            self._store(ordinal, self.mask(day))
+            self._rebuild()
+            i = ordinal - self._origin
+        elif grow and i >= len(self._masks):
+            self._masks.extend(bytes(i + 1 - len(self._masks)))
+        return i
+
+    # Changes
+
+    def mask(self, day):
+        """Bit i set if PRAYERS[i] was completed on `day`"""
+        if self._origin is None:
+            return 0
+        i = day.toordinal() - self._origin
+        return self._masks[i] if 0 <= i < len(self._masks) else 0
+
+    def completed(self, day):
+        """Set of prayer names completed on `day`"""
+        mask = self.mask(day)
+        return {name for bit, name in enumerate(PRAYERS) if mask >> bit & 1}
+
+    def set(self, day, prayer, done=True):
+        """Marks a prayer done (or not) on a day; returns without waiting for the disk"""
+        bit = 1 << PRAYERS.index(prayer)
+        with self._lock:
+            i = self._index(day, grow=True)
+            old = self._masks[i]
+            new = old | bit if done else old & ~bit
+            if new == old:
+                return
+            self._masks[i] = new
+            self._prayer_trees[PRAYERS.index(prayer)].add(i, 1 if done else -1)
+            if (old == ALL_DONE) != (new == ALL_DONE):
+                self._done_tree.add(i, 1 if new == ALL_DONE else -1)
+        self._queue.put(RECORD.pack(day.toordinal(), new))
+
+    def toggle(self, day, prayer):
+        """Flips a prayer's completion on a day; returns the new state"""
+        done = prayer not in self.completed(day)
+        self.set(day, prayer, done)
+        return done
+
+    # Queries
+
+    def _clamp(self, day):
+        """Index just past `day`, within the range the trees cover"""
+        return min(max(day.toordinal() - self._origin + 1, 0), self._capacity)
+
+    def streak(self, today=None):
+        """
+        Consecutive days with every prayer completed, up to today, or up to
+        yesterday while today is still in progress.
+        """
+        today = today or date.today()
+        with self._lock:
+            if self._origin is None:
+                return 0
+            last = today if self.mask(today) == ALL_DONE else today - timedelta(days=1)
+            end = last.toordinal() - self._origin + 1
+            if not 0 < end <= self._capacity:
+                return 0  # The last day counted was never recorded
+            return end - 1 - self._done_tree.last_gap(end)
+
+    def rate(self, prayer, days, today=None):
+        """Share of the last `days` days (ending today) on which `prayer` was completed"""
+        today = today or date.today()
+        with self._lock:
+            if self._origin is None:
+                return 0.0
+            tree = self._prayer_trees[PRAYERS.index(prayer)]
+            end = self._clamp(today)
+            start = self._clamp(today - timedelta(days=days))
+            return (tree.prefix(end) - tree.prefix(start)) / days
+
+    def rates(self, days, today=None):
+        """{prayer: completion rate} over the last `days` days"""
+        return {prayer: self.rate(prayer, days, today) for prayer in PRAYERS}
+
+    def heatmap(self, start, end):
+        """[(date, prayers completed)] for every day from start to end inclusive, e.g. a calendar year"""
+        return [(start + timedelta(days=n), popcount(self.mask(start + timedelta(days=n))))
+                for n in range((end - start).days + 1)]
+
+    # Disk
+
+    def _write_loop(self):
+        log = None
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already waiting, so a burst of toggles costs one write
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                records = [r for r in batch if r is not None]
+                if records:
+                    with metrics.timer("io.completions_write"):
+                        if log is None:
+                            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                            log = open(self.log_path, "ab")
+                        log.write(b"".join(records))
+                        log.flush()
+                    self._log_records += len(records)
+                    if self._log_records >= self.compact_every:
+                        log.close()
+                        log = None
+                        self._compact()
+            except Exception as e:
+                print(f"Completion log write error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if None in batch:
+                if log:
+                    log.close()
+                return
+
+    def _compact(self):
+        """Writes the whole history as a snapshot and empties the log (writer thread only)"""
+        with self._lock:
+            origin, masks = self._origin, bytes(self._masks)
+        if origin is None:
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".completions", suffix=".tmp")
+        try:
+            with metrics.timer("io.completions_compact"), os.fdopen(fd, "wb") as f:
+                f.write(SNAPSHOT.pack(MAGIC, origin, len(masks)))
+                f.write(masks)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        # Changes queued after the copy are appended again after this, and replay is idempotent
+        open(self.log_path, "wb").close()
+        self._log_records = 0
+
+    def compact(self):
+        """Folds the log into the snapshot now (on the writer thread) and waits for it"""
+        self.flush()
+        self._log_records = self.compact_every
+        # An empty record wakes the writer, which then sees the log is due
+        self._queue.put(b"")
+        self.flush()
+
+    def flush(self):
+        """Waits until every change so far is on disk"""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
@@ -0,0 +1,75 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+PRAYERS = ("Fajr", "Dhuhr", "Asr", "Maghrib", "Isha")
+DAY_SECONDS = 86400
+
+def _minutes(time_str):
+    # "HH:MM", possibly followed by a zone as in calendar responses
+    return int(time_str[:2]) * 60 + int(time_str[3:5])
+
+class DaySchedule:
+    """
+    One day's prayer times parsed once into second offsets from that day's
+    midnight, followed by the next day's (reusing today's when tomorrow's
+    timings aren't known). Lookups are a bisect over a tuple of ints.
+    Immutable: build a new one when the timings change.
+    """
+    __slots__ = ("day", "names", "times", "offsets", "_ordinal")
+
+    def __init__(self, timings, day=None, tomorrow=None):
+        day = day or date.today()
+        names, times, offsets = [], [], []
+        for shift, source in enumerate((timings, tomorrow or timings)):
+            # Sorted in case a source lists them out of order
+            for minutes, name in sorted((_minutes(source[p]), p) for p in PRAYERS):
+                names.append(name)
+                times.append(f"{minutes // 60:02d}:{minutes % 60:02d}")
+                offsets.append(shift * DAY_SECONDS + minutes * 60)
+        set_ = object.__setattr__
+        set_(self, "day", day)
+        set_(self, "names", tuple(names))
+        set_(self, "times", tuple(times))
+        set_(self, "offsets", tuple(offsets))
+        set_(self, "_ordinal", day.toordinal())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DaySchedule is immutable")
+
+    def _seconds(self, now):
+        return ((now.toordinal() - self._ordinal) * DAY_SECONDS
+                + now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6)
+
+    def lookup(self, now=None):
+        """Returns (index, seconds remaining) of the next prayer; index into names/times"""
+        seconds = self._seconds(now or datetime.now())
+        i = bisect_right(self.offsets, seconds)
+        if i < len(self.offsets):
+            return i, self.offsets[i] - seconds
+        # Past tomorrow's Isha: the schedule is stale, repeat tomorrow's times
+        seconds = (seconds - DAY_SECONDS) % DAY_SECONDS + DAY_SECONDS
+        i = bisect_right(self.offsets, seconds)
+        if i == len(self.offsets):
+            return len(PRAYERS), self.offsets[len(PRAYERS)] + DAY_SECONDS - seconds
+        return i, self.offsets[i] - seconds
+
+    def next_prayer(self, now=None):
+        """Returns (name, seconds remaining)"""
+        i, remaining = self.lookup(now)
+        return self.names[i], remaining
+
+    def upcoming(self, now=None):
+        """Lazily yields (name, datetime) for every prayer after now, across days"""
+        now = now or datetime.now()
+        midnight = datetime.combine(self.day, datetime.min.time())
+        seconds = self._seconds(now)
+        count = len(PRAYERS)
+        # Later days repeat the last known day
+        extra_days = max(0, int(seconds // DAY_SECONDS) - 1)
+        while True:
+            base = extra_days * DAY_SECONDS
+            for i in range(count if extra_days else 0, 2 * count):
+                offset = base + self.offsets[i]
+                if offset > seconds:
+                    yield self.names[i], midnight + timedelta(seconds=offset)
+            extra_days += 1
@@ -0,0 +1,224 @@
+import csv
+import itertools
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import prayer_api
+from prayer_api import METHOD, SCHOOL
+from prayer_calc import compute_timetable
+from settings_store import settings_path
+
+# Columns in CSV and Parquet exports
+FIELDS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
+# Calendar events (Sunrise is not a prayer)
+EVENT_PRAYERS = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+EVENT_MINUTES = 15
+# Days computed at once per location; bounds memory whatever the range
+CHUNK_DAYS = 366
+# Rows per Parquet row group
+PARQUET_BATCH = 65536
+FORMATS = {".csv": "csv", ".ics": "ics", ".parquet": "parquet"}
+# A year of months for many locations would be evicted from the widget's
+# CACHE_SIZE-entry JSON cache; the SQLite store keeps every one (and imports
+# the widget's cache the first time)
+CACHE_BACKEND = "sqlite"
+
+_HHMM = [f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)]
+
+def read_locations(path):
+    """
+    Yields locations as stored in settings.json: from its saved_locations, or
+    from a CSV with a name,lat,lon[,method,school,tz] header (tz an IANA name
+    or hours from UTC; the computer's zone when empty).
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            yield from json.load(f)["saved_locations"]
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            loc = {"name": row["name"], "lat": float(row["lat"]), "lon": float(row["lon"]),
+                   "method": int(row.get("method") or METHOD), "school": int(row.get("school") or SCHOOL)}
+            tz = (row.get("tz") or "").strip()
+            if tz:
+                try:
+                    loc["tz"] = float(tz)
+                except ValueError:
+                    loc["tz"] = tz
+            yield loc
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _prefetch_months(loc, days, method, school):
+    """One calendar request per month the cache doesn't have yet, never one per day"""
+    for year, month in sorted({(d.year, d.month) for d in days}):
+        first = date(year, month, 1)
+        if not prayer_api.get_cached_prayer_times(loc["lat"], loc["lon"], first, method, school):
+            prayer_api.prefetch_calendar(loc["lat"], loc["lon"], year, month, method, school)
+
+def timetable(locations, start, end, source="auto"):
+    """
+    Yields (location, date, {field: "HH:MM"}) for every location and day from
+    start to end inclusive, location by location.
+    source: "auto" uses cached timings (prefetched month tables included) and
+    computes the rest locally; "local" computes everything; "fetch" first
+    fetches each month the cache is missing as one calendar request.
+    Never makes a request per day.
+    """
+    for loc in locations:
+        method, school = loc.get("method", METHOD), loc.get("school", SCHOOL)
+        tz = loc.get("tz")
+        for days in _chunks(_days(start, end), CHUNK_DAYS):
+            if source == "fetch":
+                _prefetch_months(loc, days, method, school)
+            table = compute_timetable([loc["lat"]], [loc["lon"]], days, method, school, tz)[0]
+            minutes = {field: table[field].tolist() for field in FIELDS}
+            for i, day in enumerate(days):
+                timings = None
+                if source != "local":
+                    timings = prayer_api.get_cached_prayer_times(loc["lat"], loc["lon"], day, method, school)
+                if timings:
+                    yield loc, day, {field: timings[field][:5] for field in FIELDS}
+                else:
+                    yield loc, day, {field: _HHMM[minutes[field][i]] for field in FIELDS}
+    if source == "fetch":
+        prayer_api.get_cache().flush()
+
+def write_csv(rows, out):
+    """Writes rows as CSV to a text file object; returns the number of rows"""
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["name", "lat", "lon", "date"] + FIELDS)
+    count = 0
+    for loc, day, timings in rows:
+        writer.writerow([loc["name"], loc["lat"], loc["lon"], day.isoformat()] + [timings[f] for f in FIELDS])
+        count += 1
+    return count
+
+def _ics_text(value):
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+def _ics_line(line):
+    # Content lines are folded at 75 octets (RFC 5545 3.1)
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a UTF-8 character
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = 74  # Continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+def write_ics(rows, out):
+    """
+    Writes one event per prayer per day as iCalendar to a text file object
+    (opened with newline=""); returns the number of events. Times are floating
+    local times, shown as written in any calendar's zone.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    write = out.write
+    write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Salah Widget//Timetable Export//EN\r\n"
+          "CALSCALE:GREGORIAN\r\n")
+    count = 0
+    for loc, day, timings in rows:
+        ymd = day.strftime("%Y%m%d")
+        place = f"{loc['lat']:.4f}_{loc['lon']:.4f}"
+        for prayer in EVENT_PRAYERS:
+            hhmm = timings[prayer]
+            write("BEGIN:VEVENT\r\n")
+            write(_ics_line(f"UID:{ymd}-{prayer.lower()}-{place}@salah-widget"))
+            write(f"DTSTAMP:{stamp}\r\n")
+            write(f"DTSTART:{ymd}T{hhmm[:2]}{hhmm[3:5]}00\r\n")
+            write(f"DURATION:PT{EVENT_MINUTES}M\r\n")
+            write(_ics_line(f"SUMMARY:{_ics_text(prayer)} ({_ics_text(loc['name'])})"))
+            write("END:VEVENT\r\n")
+            count += 1
+    write("END:VCALENDAR\r\n")
+    return count
+
+def write_parquet(rows, path, batch_rows=PARQUET_BATCH):
+    """
+    Writes rows to a Parquet file one row group at a time; times are stored as
+    time32 seconds since local midnight. Needs pyarrow. Returns the number of rows.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([("name", pa.string()), ("lat", pa.float64()), ("lon", pa.float64()),
+                        ("date", pa.date32())] + [(f, pa.time32("s")) for f in FIELDS])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _chunks(rows, batch_rows):
+            columns = [[loc["name"] for loc, _, _ in batch],
+                       [loc["lat"] for loc, _, _ in batch],
+                       [loc["lon"] for loc, _, _ in batch],
+                       [day for _, day, _ in batch]]
+            for f in FIELDS:
+                columns.append([int(t[f][:2]) * 3600 + int(t[f][3:5]) * 60 for _, _, t in batch])
+            writer.write_table(pa.Table.from_arrays([pa.array(c, type=schema.field(i).type)
+                                                     for i, c in enumerate(columns)], schema=schema))
+            count += len(batch)
+    return count
+
+def export(locations, start, end, path, fmt=None, source="auto"):
+    """Writes a timetable file; fmt defaults from the extension. "-" writes CSV or iCalendar to stdout."""
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+    rows = timetable(locations, start, end, source)
+    if fmt == "parquet":
+        return write_parquet(rows, path)
+    writer = write_ics if fmt == "ics" else write_csv
+    if path == "-":
+        return writer(rows, sys.stdout)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        return writer(rows, f)
+
+def main():
+    # python export.py --from 2025-01-01 --to 2025-12-31 [--locations FILE] [--local | --fetch] OUTPUT
+    import argparse
+    parser = argparse.ArgumentParser(description="Export prayer timetables for many locations")
+    parser.add_argument("output", help="File to write (.csv, .ics or .parquet), or - for stdout")
+    parser.add_argument("--from", dest="start", required=True, type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", required=True, type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--locations", default=settings_path(),
+                        help="settings.json (its saved locations; default the widget's) "
+                             "or a CSV of name,lat,lon[,method,school,tz]")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="Default: from the extension")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--local", action="store_true", help="Compute every day locally, ignore the cache")
+    group.add_argument("--fetch", action="store_true", help="Fetch months missing from the cache, one request each")
+    args = parser.parse_args()
+
+    source = "local" if args.local else "fetch" if args.fetch else "auto"
+    prayer_api.CACHE_BACKEND = CACHE_BACKEND
+    fmt = args.format or FORMATS.get(os.path.splitext(args.output)[1].lower(), "csv")
+    try:
+        count = export(read_locations(args.locations), args.start, args.end, args.output, fmt, source)
+    except (OSError, ValueError, KeyError, RuntimeError) as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.output != "-":
+        print(f"Wrote {count} {'events' if fmt == 'ics' else 'rows'} to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class _Job(QRunnable):
+    def __init__(self, service, key, fn, args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.service = service
+        self.key = key
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        try:
+            result, error = self.fn(*self.args), None
+        except Exception as e:
+            result, error = None, e
+        # Queued back to the service's (GUI) thread
+        try:
+            self.service.finished.emit(self.key, result, error)
+        except RuntimeError:
+            pass  # The widget closed while this was running
+
+class FetchService(QObject):
+    """
+    Runs blocking prayer_api calls on a thread pool and delivers the results on
+    the GUI thread. A request for a key already in flight joins that job instead
+    of starting another. Each channel ("times", "search", ...) only cares about
+    its latest request: older queued jobs are dropped and late results ignored.
+    """
+    finished = pyqtSignal(object, object, object)  # key, result, error
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._jobs = {}       # key -> _Job
+        self._waiting = {}    # key -> [(channel, callback)]
+        self._latest = {}     # channel -> key
+        self.finished.connect(self._on_finished)
+
+    def request(self, channel, key, fn, args, callback):
+        """Runs fn(*args) in the background and calls callback(result, error) when done"""
+        previous = self._latest.get(channel)
+        self._latest[channel] = key
+        if previous is not None and previous != key:
+            self._drop_stale(previous)
+
+        self._waiting.setdefault(key, []).append((channel, callback))
+        if key in self._jobs:
+            return
+        job = _Job(self, key, fn, args)
+        self._jobs[key] = job
+        self.pool.start(job)
+
+    def _drop_stale(self, key):
+        # Only drop the job if no other channel still wants it
+        if any(self._latest.get(channel) == key for channel, _ in self._waiting.get(key, [])):
+            return
+        job = self._jobs.get(key)
+        if job is not None and self.pool.tryTake(job):
+            del self._jobs[key]
+            self._waiting.pop(key, None)
+
+    def is_pending(self, key):
+        return key in self._jobs
+
+    def _on_finished(self, key, result, error):
+        self._jobs.pop(key, None)
+        for channel, callback in self._waiting.pop(key, []):
+            if self._latest.get(channel) == key:
+                callback(result, error)
+
+    def wait(self, msecs=-1):
+        """Blocks until every job has finished (for shutdown and tests)"""
+        return self.pool.waitForDone(msecs)
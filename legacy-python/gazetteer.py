@@ -0,0 +1,227 @@
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import unicodedata
+from array import array
+
+from settings_store import cache_dir
+
+GAZETTEER_TSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.tsv")
+# None: gazetteer.idx in the per-user cache directory (settings_store.cache_dir)
+GAZETTEER_INDEX = None
+
+MAGIC = b"GZ01"
+HEADER = struct.Struct("<4sIII")  # magic, cities, keys, bytes of names
+# Set on keys that start at the beginning of a city's name (not a later word)
+NAME_START = 0x80000000
+NO_MATCH = (False, False, -1)
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+def normalize(text):
+    """Lowercase ASCII with accents and punctuation removed: "São Paulo" -> "sao paulo" """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+def read_cities(path, min_population=0):
+    """
+    Yields (name, country, lat, lon, population, alternates) from the bundled
+    cities.tsv or from a GeoNames dump (cities15000.txt, allCountries.txt, ...).
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) >= 15:
+                # GeoNames: name, asciiname and the coordinates/country/population columns
+                name, alternates = cols[1], [cols[2]]
+                lat, lon, country, population = cols[4], cols[5], cols[8], cols[14]
+            elif cols[0] == "name":
+                continue
+            else:
+                name, country, lat, lon, population = cols[:5]
+                alternates = cols[5].split(",") if len(cols) > 5 and cols[5] else []
+            population = int(population or 0)
+            if population >= min_population:
+                yield name, country, float(lat), float(lon), population, alternates
+
+def build_index(cities, path):
+    """
+    Writes the search index: columns of coordinates, populations and names,
+    then every name word-prefix key sorted so a prefix is one contiguous range.
+    """
+    lats, lons, pops = array("f"), array("f"), array("I")
+    name_offsets, names = array("I", [0]), bytearray()
+    keys = []
+    for i, (name, country, lat, lon, population, alternates) in enumerate(cities):
+        lats.append(lat)
+        lons.append(lon)
+        pops.append(population)
+        names += f"{name}\t{country}".encode()
+        name_offsets.append(len(names))
+        seen = set()
+        for alias in [name] + alternates:
+            words = normalize(alias).split()
+            # "new york" is found by "new y..." and by "york"
+            for w in range(len(words)):
+                key = " ".join(words[w:])
+                if key and key not in seen:
+                    seen.add(key)
+                    keys.append((key.encode(), i | (NAME_START if w == 0 else 0)))
+    keys.sort()
+
+    key_offsets, key_records, key_bytes = array("I", [0]), array("I"), bytearray()
+    for key, record in keys:
+        key_bytes += key
+        key_offsets.append(len(key_bytes))
+        key_records.append(record)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(lats), len(keys), len(names)))
+            for column in (lats, lons, pops, name_offsets, key_offsets, key_records):
+                if sys.byteorder != "little":
+                    column.byteswap()
+                column.tofile(f)
+            f.write(names)
+            f.write(key_bytes)
+        os.replace(tmp, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+class Gazetteer:
+    """
+    Read-only city index, memory-mapped so opening it is instant and only the
+    pages a search touches are read. Search is a bisect to the first key with
+    the typed prefix, then a scan of that range ranked by exact name and size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, cities, keys, names_len = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer index")
+        view = memoryview(self._map)
+        pos = HEADER.size
+
+        def column(count, fmt):
+            nonlocal pos
+            start, pos = pos, pos + count * 4
+            return view[start:pos].cast(fmt)
+
+        self.lats = column(cities, "f")
+        self.lons = column(cities, "f")
+        self.pops = column(cities, "I")
+        self._name_offsets = column(cities + 1, "I")
+        self._key_offsets = column(keys + 1, "I")
+        self._key_records = column(keys, "I")
+        self._names = view[pos:pos + names_len]
+        self._keys = view[pos + names_len:]
+        self.size = cities
+
+    def __len__(self):
+        return len(self._key_records)
+
+    def _key(self, i):
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1]].tobytes()
+
+    def _first(self, prefix):
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def city(self, record):
+        """Returns (lat, lon, name, country) for a record number"""
+        name, country = bytes(self._names[self._name_offsets[record]:self._name_offsets[record + 1]]).decode().split("\t")
+        return round(self.lats[record], 4), round(self.lons[record], 4), name, country
+
+    def _matches(self, query, limit):
+        text, _, country = query.partition(",")
+        prefix = normalize(text).encode()
+        country = normalize(country).upper()
+        if not prefix:
+            return [], {}
+        lo = self._first(prefix)
+        # 0xff never occurs in UTF-8, so this is just past the last key with the prefix
+        hi = self._first(prefix + b"\xff")
+        exact = set()
+        i = lo
+        while i < hi and self._key(i) == prefix:
+            if self._key_records[i] >= NAME_START:
+                exact.add(self._key_records[i])
+            i += 1
+        # Whole-name matches first, then name prefixes, then by population
+        best = {}
+        pops = self.pops
+        for record in self._key_records[lo:hi]:
+            score = (record in exact, record >= NAME_START, pops[record & ~NAME_START])
+            record &= ~NAME_START
+            if score > best.get(record, NO_MATCH):
+                best[record] = score
+        if country:
+            best = {r: s for r, s in best.items() if self.city(r)[3].startswith(country)}
+        return heapq.nlargest(limit, best, key=best.get), best
+
+    def search(self, query, limit=8):
+        """Returns up to `limit` ranked (lat, lon, name) matches for a partial name"""
+        records, _ = self._matches(query, limit)
+        return [self.city(r)[:3] for r in records]
+
+    def completions(self, query, limit=8):
+        """Returns [(label, (lat, lon, name))] for an autocomplete list, e.g. "London, GB" """
+        records, _ = self._matches(query, limit)
+        return [(f"{name}, {country}", (lat, lon, name))
+                for lat, lon, name, country in map(self.city, records)]
+
+    def find(self, query):
+        """The best city whose whole name (or alias) is `query`, else None"""
+        records, scores = self._matches(query, 1)
+        if records and scores[records[0]][0]:
+            return self.city(records[0])[:3]
+        return None
+
+    def close(self):
+        for view in (self.lats, self.lons, self.pops, self._name_offsets,
+                     self._key_offsets, self._key_records, self._names, self._keys):
+            view.release()
+        self._map.close()
+
+def index_path():
+    if GAZETTEER_INDEX:
+        return GAZETTEER_INDEX
+    return os.path.join(cache_dir(), "gazetteer.idx")
+
+def get_gazetteer():
+    """Returns the process-wide Gazetteer, (re)building the index from cities.tsv when needed"""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            path = index_path()
+            if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(GAZETTEER_TSV):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                build_index(read_cities(GAZETTEER_TSV), path)
+            _gazetteer = Gazetteer(path)
+        return _gazetteer
+
+if __name__ == "__main__":
+    # python gazetteer.py cities15000.txt [gazetteer.idx] [min_population]
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    min_population = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    build_index(read_cities(source, min_population), target)
+    print(f"Wrote {target} ({os.path.getsize(target) / 1e6:.1f} MB)")
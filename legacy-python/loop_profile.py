@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+# python main.py --profile-loop [SECONDS], or SALAH_PROFILE=SECONDS
+DEFAULT_SECONDS = 30
+INTERVAL = 0.005
+# None: salah_profile.txt in the per-user cache directory (settings_store.cache_dir)
+PROFILE_FILE = None
+
+class LoopProfiler:
+    """
+    Sampling profiler for the Qt event loop. A background thread records the
+    main thread's Python stack every `interval` seconds for a fixed window and
+    writes it in collapsed-stack format ("outer;inner count" per line), which
+    flamegraph.pl and speedscope read. Samples where the loop is idle (waiting
+    inside app.exec()) show up as the exec() call itself.
+    """
+
+    def __init__(self, seconds=DEFAULT_SECONDS, interval=INTERVAL, path=None):
+        self.seconds = seconds
+        self.interval = interval
+        self.path = path or PROFILE_FILE or metrics._default_path("salah_profile.txt")
+        self.stacks = {}  # "outer;...;inner" -> samples
+        self.samples = 0
+        self._target = threading.main_thread().ident
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def sample(self):
+        frame = sys._current_frames().get(self._target)
+        if frame is None:
+            return
+        names = []
+        while frame is not None:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        key = ";".join(reversed(names))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        end = time.perf_counter() + self.seconds
+        while time.perf_counter() < end:
+            self.sample()
+            time.sleep(self.interval)
+        self.write()
+        self.report()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="loop-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        if self._thread:
+            self._thread.join()
+
+    def write(self):
+        with open(self.path, "w") as f:
+            for stack, n in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+                f.write(f"{stack} {n}\n")
+
+    def top(self, limit=10):
+        """[(function, share of samples)] by samples where it was the innermost frame"""
+        own = {}
+        for stack, n in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            own[leaf] = own.get(leaf, 0) + n
+        total = self.samples or 1
+        return [(name, n / total) for name, n in sorted(own.items(), key=lambda kv: -kv[1])[:limit]]
+
+    def report(self):
+        print(f"Event loop profile: {self.samples} samples over {self.seconds:g} s written to {self.path}")
+        for name, share in self.top():
+            print(f"  {share:6.1%}  {name}")
@@ -1,20 +1,62 @@
+import os
 import sys
-from PyQt6.QtWidgets import QApplication
-from widget import SalahWidget
+import time
+
+START = time.perf_counter()
+
+def _flag_value(flag, default):
+    # "--flag N" -> N, "--flag" alone -> default, absent -> None
+    if flag not in sys.argv:
+        return None
+    i = sys.argv.index(flag)
+    if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("--"):
+        return sys.argv[i + 1]
+    return default
 
 def main():
+    profiler = None
+    if "--startup-profile" in sys.argv:
+        from startup_profile import StartupProfiler
+        profiler = StartupProfiler(START)
+
+    # --metrics (or SALAH_METRICS=1) collects timings and counters, written to
+    # metrics.json on exit; --metrics-port N also serves them on 127.0.0.1:N/metrics
+    import metrics
+    if "--metrics" in sys.argv:
+        metrics.enable()
+    metrics_port = _flag_value("--metrics-port", None) or os.environ.get("SALAH_METRICS_PORT")
+    if metrics_port:
+        metrics.enable()
+        metrics.serve(int(metrics_port))
+    # --profile-loop [SECONDS] (or SALAH_PROFILE=SECONDS) samples the event loop
+    profile_seconds = _flag_value("--profile-loop", "30") or os.environ.get("SALAH_PROFILE")
+    # --painted (or SALAH_PAINTED=1) draws the widget with QPainter instead of styled labels
+    painted = "--painted" in sys.argv or os.environ.get("SALAH_PAINTED", "") not in ("", "0")
+
+    # Imported here so the startup profile can time them
+    from PyQt6.QtWidgets import QApplication
+    from widget import SalahWidget
+
     app = QApplication(sys.argv)
     
     # Set application-wide font if possible
     # app.setFont(QFont("Segoe UI", 10)) 
     
     try:
-        window = SalahWidget()
+        window = SalahWidget(painted=painted)
         # Initial position (top right corner roughly)
         screen = app.primaryScreen().geometry()
         window.move(screen.width() - window.width() - 50, 50)
+        if profiler:
+            profiler.watch_first_paint(window)
         window.show()
-        sys.exit(app.exec())
+        if profile_seconds:
+            from loop_profile import LoopProfiler
+            LoopProfiler(float(profile_seconds)).start()
+        code = app.exec()
+        if metrics.enabled():
+            print(f"Metrics written to {metrics.dump()}")
+        sys.exit(code)
     except Exception as e:
         print(f"Failed to start Salah Widget: {e}")
 
@@ -0,0 +1,215 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+# Off unless SALAH_METRICS is set (or main.py --metrics); every call below is a
+# no-op costing one flag check until then.
+_enabled = os.environ.get("SALAH_METRICS", "") not in ("", "0")
+# None: metrics.json in the per-user cache directory (settings_store.cache_dir)
+METRICS_FILE = os.environ.get("SALAH_METRICS_FILE") or None
+# Recent samples per timer kept for percentiles
+SAMPLES = 512
+
+class Timing:
+    """Count, total, min/max and recent samples of one timed operation"""
+    __slots__ = ("count", "total", "min", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total / self.count * 1000,
+            "min_ms": self.min * 1000,
+            "max_ms": self.max * 1000,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+class Registry:
+    """
+    Named counters and timings, plus sources: callables returning stats that
+    already live elsewhere (the cache's hit counts, the transport's breakers),
+    read only when a snapshot is taken.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.timings = {}
+        self.sources = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = Timing()
+            timing.add(seconds)
+
+    def register_source(self, name, fn):
+        self.sources[name] = fn
+
+    def snapshot(self):
+        """Everything as a JSON-serialisable dict"""
+        with self._lock:
+            result = {
+                "pid": os.getpid(),
+                "uptime_s": time.time() - self.started,
+                "counters": dict(self.counters),
+                "timings": {name: t.summary() for name, t in sorted(self.timings.items())},
+            }
+        for name, fn in self.sources.items():
+            try:
+                result[name] = fn()
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+            self.started = time.time()
+
+_registry = Registry()
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _registry.observe(self.name, time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+def get_registry():
+    """Returns the process-wide Registry"""
+    return _registry
+
+def count(name, n=1):
+    if _enabled:
+        _registry.count(name, n)
+
+def observe(name, seconds):
+    if _enabled:
+        _registry.observe(name, seconds)
+
+def timer(name):
+    """with metrics.timer("io.settings_save"): ..."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+def timed(name):
+    """Decorator timing every call of a function under `name`"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def register_source(name, fn):
+    _registry.register_source(name, fn)
+
+def snapshot():
+    return _registry.snapshot()
+
+def _default_path(name):
+    # settings_store imports this module, so it is imported here
+    from settings_store import cache_dir
+    os.makedirs(cache_dir(), exist_ok=True)
+    return os.path.join(cache_dir(), name)
+
+def dump(path=None):
+    """Writes a snapshot to `path` (default METRICS_FILE) atomically; returns the path"""
+    path = path or METRICS_FILE or _default_path("metrics.json")
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot(), f, indent=1)
+        os.replace(tmp, path)
+    except Exception:
+        os.remove(tmp)
+        raise
+    return path
+
+def serve(port=0):
+    """
+    Serves GET /metrics (JSON) on 127.0.0.1:port from a daemon thread.
+    Returns the server; its server_port is the port actually bound.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,255 @@
+from PyQt6.QtCore import Qt, QRect, QSize
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen, QPixmap
+from PyQt6.QtWidgets import QWidget
+
+import metrics
+from day_schedule import PRAYERS
+
+# The rounded container; SalahWidget's 20 px margins surround it
+WIDTH = 280
+PADDING = 11
+RADIUS = 24
+SPACING = 15
+ROW_HEIGHT = 35
+ROW_SPACING = 5
+BACKGROUND = QColor(20, 20, 25, 230)
+BORDER = QColor(255, 255, 255, 25)
+SEPARATOR = QColor(255, 255, 255, 25)
+ROW_HIGHLIGHT = QColor(255, 255, 255, 25)
+
+def _font(pixels, weight=QFont.Weight.Normal, spacing=0.0, strike=False):
+    font = QFont()
+    font.setPixelSize(pixels)
+    font.setWeight(weight)
+    if spacing:
+        font.setLetterSpacing(QFont.SpacingType.AbsoluteSpacing, spacing)
+    font.setStrikeOut(strike)
+    return font
+
+class PaintedText:
+    """
+    Stands in for a QLabel inside a PaintedView: holds its text and, when the
+    text changes, invalidates only its own rectangle.
+    """
+
+    def __init__(self, view, rect, font, color, align, text=""):
+        self.view = view
+        self.rect = rect
+        self.font = font
+        self.color = color
+        self.align = align
+        self._text = text
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        if text != self._text:
+            self._text = text
+            self.view.update(self.rect)
+
+    def height(self):
+        return self.rect.height()
+
+    def mapToGlobal(self, point):
+        return self.view.mapToGlobal(self.rect.topLeft() + point)
+
+    def paint(self, painter):
+        painter.setFont(self.font)
+        painter.setPen(self.color)
+        painter.drawText(self.rect, self.align, self._text)
+
+class PaintedRow:
+    """Stands in for a PrayerRow: drawn once into a pixmap per state change, then blitted"""
+
+    def __init__(self, view, name, rect):
+        self.view = view
+        self.name = name
+        self.rect = rect
+        self.time_str = None
+        self.is_next = None
+        self.is_completed = None
+        self.pixmap = None
+
+    def set_state(self, time_str, is_next, is_completed):
+        """Updates the row; returns True if anything visible changed"""
+        if (time_str, is_next, is_completed) == (self.time_str, self.is_next, self.is_completed):
+            return False
+        self.time_str, self.is_next, self.is_completed = time_str, is_next, is_completed
+        self.pixmap = None  # Redrawn at the next paint
+        self.view.update(self.rect)
+        metrics.count("widget.row_updates")
+        return True
+
+    def _render(self, ratio):
+        pixmap = QPixmap(self.rect.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        local = QRect(0, 0, self.rect.width(), self.rect.height())
+        if self.is_next:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(ROW_HIGHLIGHT)
+            painter.drawRoundedRect(local, 10, 10)
+        weight = QFont.Weight.Bold if self.is_next else QFont.Weight.Normal
+        painter.setPen(QColor("#ffffff" if self.is_next else "#bbbbbb"))
+        text_rect = local.adjusted(15, 0, -15, 0)
+        align = Qt.AlignmentFlag.AlignVCenter
+        painter.setFont(_font(16, weight, strike=bool(self.is_completed)))
+        painter.drawText(text_rect, align | Qt.AlignmentFlag.AlignLeft, self.name)
+        painter.setFont(_font(16, weight))
+        painter.drawText(text_rect, align | Qt.AlignmentFlag.AlignRight, self.time_str or "--:--")
+        painter.end()
+        return pixmap
+
+    def paint(self, painter, ratio):
+        if self.pixmap is None or self.pixmap.devicePixelRatio() != ratio:
+            self.pixmap = self._render(ratio)
+        painter.drawPixmap(self.rect.topLeft(), self.pixmap)
+
+class _ListSection:
+    """Stands in for the list container: showing it expands the view"""
+
+    def __init__(self, view):
+        self.view = view
+
+    def setVisible(self, visible):
+        self.view.set_expanded(visible)
+
+    def isVisible(self):
+        return self.view.expanded
+
+class PaintedView(QWidget):
+    """
+    The whole widget face (header, countdown, prayer list) as one QWidget
+    drawn in paintEvent, instead of a tree of styled QLabels and layouts.
+    Its texts and rows have the QLabel/PrayerRow methods SalahWidget calls,
+    so the widget drives either face the same way. The background is cached
+    in a pixmap per size, rows in a pixmap per state, and a change only
+    repaints the rectangle it touched. Clicks are hit-tested here.
+    """
+
+    def __init__(self, owner, city=""):
+        super().__init__(owner)
+        self.owner = owner
+        self.expanded = False
+        self._backgrounds = {}  # (height, pixel ratio) -> QPixmap
+        self._hover = False
+        self.setMouseTracking(True)
+
+        inner = WIDTH - 2 * PADDING
+        left, right = Qt.AlignmentFlag.AlignLeft, Qt.AlignmentFlag.AlignRight
+        middle, center = Qt.AlignmentFlag.AlignVCenter, Qt.AlignmentFlag.AlignCenter
+        y = PADDING
+        self.city_label = PaintedText(self, QRect(PADDING + 5, y, inner - 85, 22),
+                                      _font(11, QFont.Weight.Bold, 1), QColor("#4da6ff"), left | middle, city)
+        self.clock_label = PaintedText(self, QRect(WIDTH - PADDING - 80, y, 80, 22),
+                                       _font(14, QFont.Weight.Medium), QColor("#ffffff"), right | middle)
+        y += 22 + SPACING
+        self.next_name_label = PaintedText(self, QRect(PADDING, y + 10, inner, 20),
+                                           _font(16, QFont.Weight.Bold, 2), QColor("#cccccc"), center,
+                                           "NEXT PRAYER")
+        y += 30 + 2
+        self.next_time_label = PaintedText(self, QRect(PADDING, y, inner, 50),
+                                           _font(48, QFont.Weight.Bold), QColor("#ffffff"), center, "--:--")
+        y += 50 + 2
+        self.countdown_label = PaintedText(self, QRect(PADDING, y, inner, 24),
+                                           _font(20, QFont.Weight.Medium), QColor(255, 255, 255, 178), center, "--")
+        y += 24 + SPACING
+        self.toggle_rect = QRect(PADDING, y, inner, 20)
+        y += 20
+        self.collapsed_height = y + PADDING
+
+        y += SPACING
+        self.prayer_rows = []
+        for name in PRAYERS:
+            self.prayer_rows.append(PaintedRow(self, name, QRect(PADDING, y, inner, ROW_HEIGHT)))
+            y += ROW_HEIGHT + ROW_SPACING
+        self.stats_label = PaintedText(self, QRect(PADDING, y, inner, 16),
+                                       _font(11), QColor(255, 255, 255, 128), center)
+        y += 16
+        self.expanded_height = y + PADDING
+
+        self.header = (self.city_label, self.clock_label, self.next_name_label,
+                       self.next_time_label, self.countdown_label)
+        self.list_container = _ListSection(self)
+        self.setFixedSize(WIDTH, self.collapsed_height)
+
+    def set_expanded(self, expanded):
+        if expanded != self.expanded:
+            self.expanded = expanded
+            self.setFixedHeight(self.expanded_height if expanded else self.collapsed_height)
+
+    def sizeHint(self):
+        return QSize(WIDTH, self.expanded_height if self.expanded else self.collapsed_height)
+
+    def _background(self, ratio):
+        key = (self.height(), ratio)
+        pixmap = self._backgrounds.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(self.size() * ratio)
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(QPen(BORDER, 1))
+            painter.setBrush(BACKGROUND)
+            painter.drawRoundedRect(QRect(0, 0, self.width(), self.height()).adjusted(0, 0, -1, -1), RADIUS, RADIUS)
+            painter.setPen(QPen(SEPARATOR, 1))
+            line_y = self.toggle_rect.center().y()
+            painter.drawLine(self.toggle_rect.left(), line_y, self.toggle_rect.right(), line_y)
+            painter.end()
+            pixmap = self._backgrounds[key] = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        metrics.count("widget.paints")
+        dirty = event.rect()
+        ratio = self.devicePixelRatioF()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.drawPixmap(dirty, self._background(ratio),
+                           QRect(dirty.topLeft() * ratio, dirty.size() * ratio))
+        for text in self.header:
+            if text.rect.intersects(dirty):
+                text.paint(painter)
+        if self.expanded:
+            for row in self.prayer_rows:
+                if row.rect.intersects(dirty):
+                    row.paint(painter, ratio)
+            if self.stats_label.rect.intersects(dirty):
+                self.stats_label.paint(painter)
+        painter.end()
+
+    def hit(self, pos):
+        """What is under a point: "city", "toggle", a prayer name, or None"""
+        if self.city_label.rect.contains(pos):
+            return "city"
+        if self.toggle_rect.contains(pos):
+            return "toggle"
+        if self.expanded:
+            for row in self.prayer_rows:
+                if row.rect.contains(pos):
+                    return row.name
+        return None
+
+    def mousePressEvent(self, event):
+        target = self.hit(event.position().toPoint()) if event.button() == Qt.MouseButton.LeftButton else None
+        if target is None:
+            event.ignore()  # Dragging is handled by the window
+        elif target == "city":
+            self.owner.show_location_menu()
+            event.accept()
+        elif target == "toggle":
+            self.owner.toggle_expanded(event)
+        else:
+            self.owner.toggle_prayer_completion(target)
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        hover = self.hit(event.position().toPoint()) is not None
+        if hover != self._hover:
+            self._hover = hover
+            self.setCursor(Qt.CursorShape.PointingHandCursor if hover else Qt.CursorShape.ArrowCursor)
+        event.ignore()
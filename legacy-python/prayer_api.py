@@ -1,16 +1,71 @@
-import requests
-import geocoder
-import json
-import os
+import math
+import threading
+import metrics
 from datetime import datetime, timedelta
+from prayer_calc import compute_prayer_times, compute_prayer_hours, compute_timetable, compute_timetable_parallel, METHODS
+from timing_cache import TimingCache
+from gazetteer import get_gazetteer
+from transport import get_transport
+from clock import get_clock
+from settings_store import cache_file
 
-CACHE_FILE = "prayer_cache.json"
+# geocoder (and requests, via transport) is imported where it's used: they are
+# slow to import and the widget paints from the cache before it needs the network.
+
+# None: prayer_cache.json / prayer_cache.db in the per-user cache directory (settings_store.cache_dir)
+CACHE_FILE = None
+CACHE_DB = None
+# "json" keeps a small LRU in CACHE_FILE, "sqlite" keeps every location and date in CACHE_DB
+CACHE_BACKEND = "json"
+API_URL = "http://api.aladhan.com/v1"
+IP_API_URL = "http://ip-api.com/json"
+ARCGIS_URL = "https://geocode.arcgis.com/arcgis/rest/services/World/GeocodeServer/find"
+# Default Aladhan calculation method (2 = Islamic Society of North America) and
+# school for Asr (0 = Shafi, Maliki and Hanbali; 1 = Hanafi). Saved locations
+# can pick their own; both are part of every cache key.
+METHOD = 2
+SCHOOL = 0
+# Prefetch a whole "month" or "year" per location from the calendar endpoint,
+# or None to request one day at a time
+PREFETCH = "month"
+# Entries kept in memory and in CACHE_FILE (a prefetched month counts as one)
+CACHE_SIZE = 32
+# How old cached timings may be to stand in for today's while the API is down
+STALE_DAYS = 3
+# Days a past date stays cached: long enough to serve it as stale
+CACHE_TTL_DAYS = STALE_DAYS
+# Nearby points share the timings cached for their tile, this many degrees on a
+# side (0.05 is ~5 km; None caches every point separately)
+TILE_DEGREES = 0.05
+# Shift a tile's timings to the exact point by the local engine's difference
+# between the two; without it a 0.05 degree tile is off by up to ~20 s below 55N/S
+TILE_CORRECTION = True
+# Threads warm_cache fetches saved locations on
+WARM_WORKERS = 4
+
+DEFAULT_LOCATION = (51.5074, -0.1278, "London")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Counters that already live on the cache and the transport, read when metrics are dumped
+metrics.register_source("cache", lambda: dict(_cache.stats, entries=len(_cache)) if _cache is not None else None)
+metrics.register_source("network", lambda: get_transport().metrics())
+
+def _geocoder_failed(g):
+    # geocoder reports connection errors instead of raising; "not found" is not a failure
+    if not isinstance(g.status_code, int) or g.status_code >= 500:
+        return g.error or "no response"
+    return None
 
 def get_location():
     """Returns (latitude, longitude, city) using multiple sources"""
+    import geocoder
+    transport = get_transport()
+
     # Try Source 1: ip-api.com (Reliable, no key)
     try:
-        resp = requests.get("http://ip-api.com/json", timeout=5)
+        resp = transport.get(IP_API_URL, timeout=5, endpoint="ip-api")
         if resp.status_code == 200:
             data = resp.json()
             if data['status'] == 'success':
@@ -20,7 +75,8 @@ def get_location():
 
     # Try Source 2: geocoder (ipinfo.io fallback)
     try:
-        g = geocoder.ip('me')
+        g = transport.call("ipinfo.io", "geocoder-ip",
+                           lambda: geocoder.ip('me', session=transport.session), _geocoder_failed)
         if g.latlng:
             return g.latlng[0], g.latlng[1], g.city or "Unknown"
     except Exception as e:
@@ -28,12 +84,24 @@ def get_location():
 
     # Default to London if all else fails
     print("Using default location (London)")
-    return 51.5074, -0.1278, "London"
+    return DEFAULT_LOCATION
 
 def search_location(query):
     """Searches for a location and returns (lat, lon, city) or None"""
+    # Cities in the offline gazetteer never reach the network
+    try:
+        match = get_gazetteer().find(query)
+        if match:
+            return match
+    except Exception as e:
+        print(f"Gazetteer error: {e}")
+
+    import geocoder
+    transport = get_transport()
+
     try:
-        g = geocoder.arcgis(query)
+        g = transport.call("geocode.arcgis.com", "arcgis",
+                           lambda: geocoder.arcgis(query, url=ARCGIS_URL, session=transport.session), _geocoder_failed)
         if g.ok:
             # ArcGIS returns city in g.city, fallback to g.address
             return g.lat, g.lng, g.city or g.address
@@ -41,77 +109,221 @@ def search_location(query):
         print(f"Search failed: {e}")
     return None
 
-def fetch_prayer_times(lat, lon):
-    """Fetches prayer times for today from Aladhan API or local cache (keeps top 2 locations)"""
-    today_str = datetime.now().strftime("%Y-%m-%d")
+def get_cache():
+    """Returns the process-wide timing cache for the configured backend"""
+    global _cache
+    # Called from the widget's fetch threads too
+    with _cache_lock:
+        json_path = CACHE_FILE or cache_file("prayer_cache.json")
+        path = (CACHE_DB or cache_file("prayer_cache.db", ("-wal", "-shm"))) if CACHE_BACKEND == "sqlite" else json_path
+        if _cache is None or _cache.path != path:
+            if _cache is not None:
+                _cache.close()
+            if CACHE_BACKEND == "sqlite":
+                from timing_store import SqliteTimingStore
+                # Imports CACHE_FILE the first time, like the old-format migration
+                _cache = SqliteTimingStore(path, method=METHOD, json_path=json_path)
+            else:
+                _cache = TimingCache(path, capacity=CACHE_SIZE, ttl_days=CACHE_TTL_DAYS)
+        return _cache
+
+def _table_day(table, day_of_month):
+    """Returns one day from a prefetched month table, or None"""
+    if day_of_month <= len(table["days"]):
+        return dict(zip(table["fields"], table["days"][day_of_month - 1]))
+    return None
+
+def prefetch_calendar(lat, lon, year, month=None, method=None, school=None):
+    """
+    Fetches a whole month (or the whole year when month is None) of prayer times
+    in one request and stores it in the cache as dense per-day tables.
+    Returns {month_key: table} for what was stored, empty on failure.
+    """
+    method, school = _settings(method, school)
+    lat, lon = tile_center(lat, lon)
+    params = {"latitude": lat, "longitude": lon, "method": method, "school": school, "year": year}
+    if month:
+        params["month"] = month
+    else:
+        params["annual"] = "true"
+    try:
+        response = get_transport().get(f"{API_URL}/calendar", params=params, timeout=10,
+                                       endpoint="aladhan/calendar")
+        if response.status_code != 200:
+            return {}
+        data = response.json()['data']
+    except Exception as e:
+        print(f"Error fetching calendar: {e}")
+        return {}
+
+    # Annual responses are keyed by month number
+    months = {month: data} if month else {int(m): days for m, days in data.items()}
+    cache = get_cache()
+    tables = {}
+    for m, days in months.items():
+        if not days:
+            continue
+        fields = list(days[0]["timings"])
+        # Calendar timings carry the zone, e.g. "05:12 (BST)"
+        rows = [[d["timings"][name].split(" ")[0] for name in fields] for d in days]
+        month_key = f"{round(float(lat), 4)},{round(float(lon), 4)},{method}-{school},{year:04d}-{m:02d}"
+        tables[month_key] = {"fields": fields, "days": rows}
+        cache.put(month_key, tables[month_key])
+    return tables
+
+def tile_center(lat, lon):
+    """Centre of the cache tile containing a point (the point itself when tiles are off)"""
+    if not TILE_DEGREES:
+        return round(float(lat), 4), round(float(lon), 4)
+    return (round((math.floor(float(lat) / TILE_DEGREES) + 0.5) * TILE_DEGREES, 4),
+            round((math.floor(float(lon) / TILE_DEGREES) + 0.5) * TILE_DEGREES, 4))
+
+def _settings(method, school):
+    method = METHOD if method is None else int(method)
+    school = SCHOOL if school is None else int(school)
+    if method not in METHODS:
+        raise ValueError(f"Unknown calculation method {method}")
+    if school not in (0, 1):
+        raise ValueError(f"Unknown Asr school {school}")
+    return method, school
+
+def _cache_keys(lat, lon, day, method, school):
     # Round lat/lon to 4 decimal places for consistent cache keys
-    cache_key = f"{round(float(lat), 4)},{round(float(lon), 4)},{today_str}"
-    
-    current_cache = {"locations": []}
-
-    # 1. Load Cache
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                data = json.load(f)
-                # Handle migration from old single-object cache if necessary
-                if "locations" in data:
-                    current_cache = data
-                elif "key" in data: # Old format
-                    current_cache["locations"].append(data)
-        except Exception as e:
-            print(f"Cache read error: {e}")
-
-    # 2. Check for key in cache locations
-    locations = current_cache["locations"]
-    for i, loc in enumerate(locations):
-        if loc.get("key") == cache_key:
-            # Move to front (LRU)
-            locations.insert(0, locations.pop(i))
-            # Save back to ensure order updates
-            try:
-                with open(CACHE_FILE, 'w') as f:
-                    json.dump(current_cache, f)
-            except: pass
-            return loc["data"]
-
-    # 3. Fetch from API
+    cache_key = f"{round(float(lat), 4)},{round(float(lon), 4)},{method}-{school},{day.strftime('%Y-%m-%d')}"
+    return cache_key, cache_key[:-3]
+
+def _from_tile(timings, lat, lon, tile, day, method, school):
+    """Moves timings cached for a tile's centre to the point inside it"""
+    if not TILE_CORRECTION or tile == (round(float(lat), 4), round(float(lon), 4)):
+        return timings
+    # Only the difference matters, so any fixed zone will do
+    here = compute_prayer_hours(lat, lon, day, method=method, school=school, tz=0)
+    there = compute_prayer_hours(tile[0], tile[1], day, method=method, school=school, tz=0)
+    shifted = dict(timings)
+    for key, value in timings.items():
+        delta = (here.get(key, 0.0) - there.get(key, 0.0)) * 60
+        if delta != delta:
+            continue  # No such time near the poles
+        minutes = round(int(value[:2]) * 60 + int(value[3:5]) + delta) % 1440
+        shifted[key] = f"{minutes // 60:02d}:{minutes % 60:02d}"
+    return shifted
+
+def _cached_tile(lat, lon, day, method, school):
+    cache_key, month_key = _cache_keys(lat, lon, day, method, school)
+    cache = get_cache()
+    timings = cache.get(cache_key)
+    if timings:
+        return timings
+    table = cache.get(month_key)
+    if table:
+        return _table_day(table, day.day)
+    return None
+
+def get_cached_prayer_times(lat, lon, day=None, method=None, school=None):
+    """Returns prayer times from the cache or a prefetched month table, never the network"""
+    if day is None:
+        day = get_clock().today()
+    method, school = _settings(method, school)
+    tile = tile_center(lat, lon)
+    timings = _cached_tile(tile[0], tile[1], day, method, school)
+    return _from_tile(timings, lat, lon, tile, day, method, school) if timings else None
+
+def _fetch_tile(lat, lon, day, method, school):
+    """Timings for a tile's centre from the cache, the API or stale cache; None if there are none"""
+    cache_key, month_key = _cache_keys(lat, lon, day, method, school)
+
+    # 1. Check the cache and prefetched month tables (memory only)
+    timings = _cached_tile(lat, lon, day, method, school)
+    if timings:
+        metrics.count("fetch.cached")
+        return timings
+    cache = get_cache()
+
+    # 2. Prefetch the month (or year)
+    if PREFETCH:
+        tables = prefetch_calendar(lat, lon, day.year, day.month if PREFETCH == "month" else None,
+                                   method, school)
+        if month_key in tables:
+            metrics.count("fetch.calendar")
+            return _table_day(tables[month_key], day.day)
+
+    # 3. Fetch a single day from API
     try:
-        # Using method 2 (Islamic Society of North America) as a default, 
-        # but the API allows many methods.
-        url = f"http://api.aladhan.com/v1/timings?latitude={lat}&longitude={lon}&method=2"
-        response = requests.get(url, timeout=10)
+        url = (f"{API_URL}/timings/{day.strftime('%d-%m-%Y')}"
+               f"?latitude={lat}&longitude={lon}&method={method}&school={school}")
+        response = get_transport().get(url, timeout=10, endpoint="aladhan/timings")
         if response.status_code == 200:
             data = response.json()
             timings = data['data']['timings']
             
-            # 4. Save to Cache
-            new_entry = {"key": cache_key, "data": timings}
-            locations.insert(0, new_entry)
-            
-            # Keep only top 2
-            if len(locations) > 2:
-                locations = locations[:2]
-            
-            current_cache["locations"] = locations
-            
-            try:
-                with open(CACHE_FILE, 'w') as f:
-                    json.dump(current_cache, f)
-            except Exception as e:
-                print(f"Cache write error: {e}")
-                
+            # 4. Save to Cache (written to disk in the background)
+            cache.put(cache_key, timings)
+            metrics.count("fetch.day")
             return timings
     except Exception as e:
         print(f"Error fetching prayer times: {e}")
-    return None
 
-def get_next_prayer(timings):
+    # 5. Serve the last cached day while the API is down
+    stale = cache.latest(cache_key.rsplit(",", 1)[0], day - timedelta(days=STALE_DAYS), day)
+    if stale:
+        metrics.count("fetch.stale")
+        print("Using stale cached prayer times")
+    return stale
+
+@metrics.timed("fetch_prayer_times")
+def fetch_prayer_times(lat, lon, day=None, method=None, school=None):
+    """
+    Fetches prayer times for a day (default today) from the in-memory cache,
+    prefetched month tables or the Aladhan API, shared by every point in a tile.
+    method and school default to METHOD and SCHOOL.
+    Falls back to computing them locally when the API can't be reached.
+    """
+    if day is None:
+        day = get_clock().today()
+    method, school = _settings(method, school)
+    tile = tile_center(lat, lon)
+    timings = _fetch_tile(tile[0], tile[1], day, method, school)
+    if timings:
+        return _from_tile(timings, lat, lon, tile, day, method, school)
+
+    # 6. Offline fallback (not cached, so the API is retried next time)
+    metrics.count("fetch.local")
+    print("Using locally calculated prayer times")
+    return compute_prayer_times(lat, lon, day, method=method, school=school)
+
+def warm_cache(locations, days=None, workers=WARM_WORKERS):
+    """
+    Fetches timings for every (lat, lon) or (lat, lon, method, school) in
+    `locations` on each of `days` (default today) on a bounded thread pool, so
+    later lookups are cache hits. Points sharing a tile and settings, and days
+    sharing a prefetched month, are fetched once.
+    Returns how many fetches were needed.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if days is None:
+        days = [get_clock().today()]
+    jobs = {}
+    for lat, lon, *settings in locations:
+        method, school = _settings(*(list(settings) + [None, None])[:2])
+        tile = tile_center(lat, lon)
+        for day in days:
+            cache_key, month_key = _cache_keys(tile[0], tile[1], day, method, school)
+            key = {"month": month_key, "year": month_key[:-3]}.get(PREFETCH, cache_key)
+            if key not in jobs and _cached_tile(tile[0], tile[1], day, method, school) is None:
+                jobs[key] = (tile[0], tile[1], day, method, school)
+    if jobs:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            list(pool.map(lambda job: _fetch_tile(*job), jobs.values()))
+    return len(jobs)
+
+def get_next_prayer(timings, now=None):
     """
     Identifies the next prayer and time remaining.
     Timings is a dict: {'Fajr': '05:30', ...}
     """
-    now = datetime.now()
+    if now is None:
+        now = get_clock().now()
     # prayers to track
     prayer_names = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
     
@@ -141,8 +353,8 @@ def get_next_prayer(timings):
     return next_p
 
 def format_countdown(td):
-    """Formats a timedelta as Hh Mm"""
-    total_seconds = int(td.total_seconds())
+    """Formats a timedelta (or a number of seconds) as Hh Mm"""
+    total_seconds = int(td.total_seconds() if isinstance(td, timedelta) else td)
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
     
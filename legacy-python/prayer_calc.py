@@ -0,0 +1,499 @@
+import math
+from datetime import date, datetime
+
+# Order of the keys in an Aladhan "timings" object
+TIMING_KEYS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Sunset", "Maghrib",
+               "Isha", "Imsak", "Midnight", "Firstthird", "Lastthird"]
+
+# Calculation methods, keyed by the Aladhan `method` id.
+# "fajr"/"isha"/"maghrib" are sun depression angles in degrees, the
+# "*_minutes" variants are fixed offsets (Isha after Maghrib, Maghrib after sunset).
+METHODS = {
+    0: {"name": "Shia Ithna-Ansari", "fajr": 16, "isha": 14, "maghrib": 4, "midnight": "jafari"},
+    1: {"name": "University of Islamic Sciences, Karachi", "fajr": 18, "isha": 18},
+    2: {"name": "Islamic Society of North America (ISNA)", "fajr": 15, "isha": 15},
+    3: {"name": "Muslim World League", "fajr": 18, "isha": 17},
+    4: {"name": "Umm Al-Qura University, Makkah", "fajr": 18.5, "isha_minutes": 90},
+    5: {"name": "Egyptian General Authority of Survey", "fajr": 19.5, "isha": 17.5},
+    7: {"name": "Institute of Geophysics, University of Tehran", "fajr": 17.7, "isha": 14, "maghrib": 4.5, "midnight": "jafari"},
+    8: {"name": "Gulf Region", "fajr": 19.5, "isha_minutes": 90},
+    9: {"name": "Kuwait", "fajr": 18, "isha": 17.5},
+    10: {"name": "Qatar", "fajr": 18, "isha_minutes": 90},
+    11: {"name": "Majlis Ugama Islam Singapura, Singapore", "fajr": 20, "isha": 18},
+    12: {"name": "Union Organization Islamic de France", "fajr": 12, "isha": 12},
+    13: {"name": "Diyanet İşleri Başkanlığı, Turkey", "fajr": 18, "isha": 17},
+    14: {"name": "Spiritual Administration of Muslims of Russia", "fajr": 16, "isha": 15},
+    15: {"name": "Moonsighting Committee Worldwide", "fajr": 18, "isha": 18},
+    16: {"name": "Dubai", "fajr": 18.2, "isha": 18.2},
+    17: {"name": "Jabatan Kemajuan Islam Malaysia (JAKIM)", "fajr": 20, "isha": 18},
+    18: {"name": "Tunisia", "fajr": 18, "isha": 18},
+    19: {"name": "Algeria", "fajr": 18, "isha": 17},
+    20: {"name": "KEMENAG - Kementerian Agama Republik Indonesia", "fajr": 20, "isha": 18},
+    21: {"name": "Morocco", "fajr": 19, "isha": 17},
+    22: {"name": "Comunidade Islamica de Lisboa", "fajr": 18, "maghrib_minutes": 3, "isha_minutes": 77},
+    23: {"name": "Ministry of Awqaf, Islamic Affairs and Holy Places, Jordan", "fajr": 18, "isha": 18, "maghrib_minutes": 5},
+}
+
+# Aladhan `school`: 0 = Shafi (shadow ratio 1), 1 = Hanafi (shadow ratio 2)
+ASR_FACTORS = {0: 1, 1: 2}
+
+IMSAK_MINUTES = 10
+SUNRISE_ANGLE = 0.833
+
+def _sin(d): return math.sin(math.radians(d))
+def _cos(d): return math.cos(math.radians(d))
+def _tan(d): return math.tan(math.radians(d))
+def _arcsin(x): return math.degrees(math.asin(x))
+def _arccos(x): return math.degrees(math.acos(x))
+def _arccot(x): return math.degrees(math.atan(1 / x))
+def _arctan2(y, x): return math.degrees(math.atan2(y, x))
+
+def _fix_angle(a):
+    return a - 360.0 * math.floor(a / 360.0)
+
+def _fix_hour(h):
+    return h - 24.0 * math.floor(h / 24.0)
+
+def _time_diff(t1, t2):
+    return _fix_hour(t2 - t1)
+
+def julian_date(year, month, day):
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + day + b - 1524.5
+
+def sun_position(jd):
+    """Returns (declination, equation_of_time) for a julian date"""
+    d = jd - 2451545.0
+    g = _fix_angle(357.529 + 0.98560028 * d)
+    q = _fix_angle(280.459 + 0.98564736 * d)
+    l = _fix_angle(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g))
+    e = 23.439 - 0.00000036 * d
+
+    ra = _arctan2(_cos(e) * _sin(l), _cos(l)) / 15.0
+    eqt = q / 15.0 - _fix_hour(ra)
+    decl = _arcsin(_sin(e) * _sin(l))
+    return decl, eqt
+
+def utc_offset(day, tz=None):
+    """
+    Resolves `tz` to a UTC offset in hours for the given date.
+    tz may be a number of hours, an IANA name ("Europe/London") or None
+    for the timezone this machine is running in.
+    """
+    if isinstance(tz, (int, float)):
+        return float(tz)
+    noon = datetime(day.year, day.month, day.day, 12)
+    if tz is None:
+        offset = noon.astimezone().utcoffset()
+    else:
+        from zoneinfo import ZoneInfo
+        offset = noon.replace(tzinfo=ZoneInfo(tz)).utcoffset()
+    return offset.total_seconds() / 3600.0
+
+class _SolarDay:
+    """
+    Sun geometry for one location and date, shared by every method. Sun
+    positions and the time the sun reaches each angle are memoized, so methods
+    that share angles (most share sunrise, noon, sunset, Asr and some of
+    their Fajr/Isha angles) cost little more than one.
+    """
+
+    def __init__(self, lat, lon, day):
+        self.lat = lat
+        self.lon = lon
+        self.jdate = julian_date(day.year, day.month, day.day) - lon / (15.0 * 24.0)
+        self._suns = {}
+        self._times = {}
+        self._bases = {}
+
+    def sun(self, t):
+        """(declination, equation of time) at day fraction t"""
+        position = self._suns.get(t)
+        if position is None:
+            position = self._suns[t] = sun_position(self.jdate + t)
+        return position
+
+    def mid_day(self, t):
+        _, eqt = self.sun(t)
+        return _fix_hour(12 - eqt)
+
+    def sun_angle_time(self, angle, t, ccw=False, clamp=False):
+        key = (angle, t, ccw, clamp)
+        cached = self._times.get(key)
+        if cached is not None:
+            return cached
+        decl, _ = self.sun(t)
+        noon = self.mid_day(t)
+        x = (-_sin(angle) - _sin(decl) * _sin(self.lat)) / (_cos(decl) * _cos(self.lat))
+        if x < -1 or x > 1:
+            if not clamp:
+                # The sun never reaches this angle (high latitudes), fixed up later
+                self._times[key] = float("nan")
+                return self._times[key]
+            # Polar day/night: use the sun's closest approach instead
+            x = max(-1.0, min(1.0, x))
+        h = _arccos(x) / 15.0
+        self._times[key] = noon - h if ccw else noon + h
+        return self._times[key]
+
+    def asr_time(self, factor, t):
+        decl, _ = self.sun(t)
+        angle = -_arccot(factor + _tan(abs(self.lat - decl)))
+        return self.sun_angle_time(angle, t, clamp=True)
+
+    def base(self, school, offset):
+        """
+        The method-independent part of the day, in local hours:
+        (shift to local time, sunrise, dhuhr, asr, sunset, night length)
+        """
+        key = (school, offset)
+        base = self._bases.get(key)
+        if base is None:
+            shift = offset - self.lon / 15.0
+            sunrise = self.sun_angle_time(SUNRISE_ANGLE, 6 / 24.0, ccw=True, clamp=True) + shift
+            sunset = self.sun_angle_time(SUNRISE_ANGLE, 18 / 24.0, clamp=True) + shift
+            # Unwrapped so polar day/night come out as 0 and 24 hours
+            night = min(max(24.0 - (sunset - sunrise), 0.0), 24.0)
+            base = self._bases[key] = (shift, sunrise, self.mid_day(12 / 24.0) + shift,
+                                       self.asr_time(ASR_FACTORS[school], 13 / 24.0) + shift, sunset, night)
+        return base
+
+def _adjust_high_lat(t, base, angle, night, ccw=False):
+    # Aladhan's default latitudeAdjustmentMethod (3, angle based)
+    portion = angle / 60.0 * night
+    if math.isnan(t):
+        diff = float("inf")
+    else:
+        diff = _time_diff(t, base) if ccw else _time_diff(base, t)
+    if diff > portion:
+        t = base - portion if ccw else base + portion
+    return t
+
+def _format_time(t):
+    t = _fix_hour(t + 0.5 / 60)
+    hours = int(t)
+    minutes = int((t - hours) * 60)
+    return f"{hours:02d}:{minutes:02d}"
+
+def _compute(solar, params, school, offset):
+    """Prayer times as fractional hours for one method"""
+    # Single refinement pass starting from default guesses (as PrayTimes/Aladhan do)
+    shift, sunrise, dhuhr, asr, sunset, night = solar.base(school, offset)
+    fajr = solar.sun_angle_time(params["fajr"], 5 / 24.0, ccw=True) + shift
+    maghrib = solar.sun_angle_time(params.get("maghrib", SUNRISE_ANGLE), 18 / 24.0) + shift
+    isha = solar.sun_angle_time(params.get("isha", 18), 18 / 24.0) + shift
+
+    fajr = _adjust_high_lat(fajr, sunrise, params["fajr"], night, ccw=True)
+    if "isha" in params:
+        isha = _adjust_high_lat(isha, sunset, params["isha"], night)
+    if "maghrib" in params:
+        maghrib = _adjust_high_lat(maghrib, sunset, params["maghrib"], night)
+
+    if "maghrib_minutes" in params:
+        maghrib = sunset + params["maghrib_minutes"] / 60.0
+    elif "maghrib" not in params:
+        maghrib = sunset
+    if "isha_minutes" in params:
+        isha = maghrib + params["isha_minutes"] / 60.0
+    imsak = fajr - IMSAK_MINUTES / 60.0
+
+    if params.get("midnight") == "jafari":
+        night_span = _time_diff(sunset, fajr)
+    else:
+        night_span = night
+
+    return {
+        "Fajr": fajr, "Sunrise": sunrise, "Dhuhr": dhuhr, "Asr": asr,
+        "Sunset": sunset, "Maghrib": maghrib, "Isha": isha, "Imsak": imsak,
+        "Midnight": sunset + night_span / 2,
+        "Firstthird": sunset + night_span / 3,
+        "Lastthird": sunset + 2 * night_span / 3,
+    }
+
+def compute_prayer_hours(lat, lon, day=None, method=2, school=0, tz=None):
+    """Like compute_prayer_times, but as fractional local hours (NaN where a time doesn't exist)"""
+    if day is None:
+        day = date.today()
+    solar = _SolarDay(float(lat), float(lon), day)
+    hours = _compute(solar, METHODS[method], school, utc_offset(day, tz))
+    return {key: hours[key] for key in TIMING_KEYS}
+
+def compute_prayer_times(lat, lon, day=None, method=2, school=0, tz=None):
+    """
+    Computes prayer times locally, without any network access.
+    Returns the same {'Fajr': 'HH:MM', ...} dict as the Aladhan timings.
+    Note: Umm Al-Qura's 120 minute Isha during Ramadan is not applied.
+    """
+    hours = compute_prayer_hours(lat, lon, day, method, school, tz)
+    return {key: _format_time(hours[key]) for key in TIMING_KEYS}
+
+class _Formatted(dict):
+    """hours -> "HH:MM", formatting each value once (methods mostly agree on Sunrise, Dhuhr, Asr...)"""
+
+    def __missing__(self, hours):
+        text = self[hours] = _format_time(hours)
+        return text
+
+def compute_methods(lat, lon, day=None, methods=None, schools=(0, 1), tz=None):
+    """
+    Prayer times for several methods and schools at once (default every method,
+    Shafi and Hanafi Asr), from one shared evaluation of the sun's position.
+    Returns {(method, school): {'Fajr': 'HH:MM', ...}}.
+    """
+    if day is None:
+        day = date.today()
+    solar = _SolarDay(float(lat), float(lon), day)
+    offset = utc_offset(day, tz)
+    formatted = _Formatted()
+    result = {}
+    for method in (METHODS if methods is None else methods):
+        for school in schools:
+            hours = _compute(solar, METHODS[method], school, offset)
+            result[method, school] = {key: formatted[hours[key]] for key in TIMING_KEYS}
+    return result
+
+# Structured row returned by compute_timetable: minutes past local midnight per key
+TIMETABLE_DTYPE = [(key, "i2") for key in TIMING_KEYS]
+
+# Default guesses (hours) used for the single refinement pass
+_GUESSES = (5, 6, 12, 13, 18)
+# Cells evaluated per block, small enough to stay in cache
+_BLOCK_CELLS = 1 << 15
+
+def _sun_position_np(np, jd):
+    """Vectorized sun_position, returns (declination in radians, equation_of_time)"""
+    d = jd - 2451545.0
+    g = np.radians(357.529 + 0.98560028 * d)
+    q = np.mod(280.459 + 0.98564736 * d, 360.0)
+    l = np.radians(q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    e = np.radians(23.439 - 0.00000036 * d)
+
+    ra = np.degrees(np.arctan2(np.cos(e) * np.sin(l), np.cos(l))) / 15.0
+    eqt = q / 15.0 - np.mod(ra, 24.0)
+    decl = np.arcsin(np.sin(e) * np.sin(l))
+    return decl, eqt
+
+def _sun_terms(np, jd):
+    """
+    Sun geometry per date plus its rate of change per day.
+    Longitude only shifts the julian date by up to half a day, and the sun moves
+    slowly enough over that that a first order expansion is accurate to well
+    under a second, so the trigonometry stays one dimensional.
+    """
+    decl, eqt = _sun_position_np(np, jd)
+    decl_next, eqt_next = _sun_position_np(np, jd + 0.5)
+    decl_prev, eqt_prev = _sun_position_np(np, jd - 0.5)
+    ddecl = decl_next - decl_prev
+    deqt = np.mod(eqt_next - eqt_prev + 12.0, 24.0) - 12.0
+    # Wrapped to [-12, 12) so noon needs no fix_hour per cell
+    eqt = np.mod(eqt + 12.0, 24.0) - 12.0
+    sin_d, cos_d = np.sin(decl), np.cos(decl)
+    terms = {"decl": decl, "ddecl": ddecl, "sin": sin_d, "dsin": cos_d * ddecl,
+             "cos": cos_d, "dcos": -sin_d * ddecl, "noon": 12.0 - eqt, "dnoon": -deqt}
+    return {k: v.astype(np.float32) for k, v in terms.items()}
+
+def _angle_time_np(np, sin_angle, sin_d, cos_d, noon, sin_lat, cos_lat, ccw=False, clamp=False):
+    x = (-sin_angle - sin_d * sin_lat) / (cos_d * cos_lat)
+    if clamp:
+        np.clip(x, -1.0, 1.0, out=x)
+    with np.errstate(invalid="ignore"):
+        h = np.arccos(x)
+    h *= np.float32(180.0 / math.pi / 15.0)
+    return noon - h if ccw else noon + h
+
+def _adjust_high_lat_np(np, t, base, angle, night, ccw=False):
+    # Same rule as _adjust_high_lat: fmax/fmin also replace the NaNs
+    portion = angle / 60.0 * night
+    if ccw:
+        return np.fmax(t, base - portion)
+    return np.fmin(t, base + portion)
+
+def _to_minutes_np(np, t):
+    # Same rounding as _format_time
+    minutes = np.floor(t * 60 + 0.5).astype(np.int32)
+    minutes %= 1440
+    return minutes
+
+def compute_timetable(lats, lons, dates, method=2, school=0, tz=None):
+    """
+    Computes prayer times for every (location, date) pair in one vectorized pass.
+    Returns a structured array of shape (len(lats), len(dates)) with TIMETABLE_DTYPE
+    fields holding minutes past local midnight.
+    tz is as for utc_offset, or an array of hour offsets per location.
+    """
+    import numpy as np
+
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    dates = list(dates)
+    params = METHODS[method]
+    factor = ASR_FACTORS[school]
+
+    jd = np.array([julian_date(d.year, d.month, d.day) for d in dates], dtype=np.float64)
+    if tz is None or isinstance(tz, str):
+        offsets = np.array([utc_offset(d, tz) for d in dates], dtype=np.float64)[None, :]
+    else:
+        offsets = np.asarray(tz, dtype=np.float64)
+        if offsets.ndim < 2:
+            offsets = offsets.reshape(-1, 1)
+    offsets = offsets.astype(np.float32)
+    suns = {t: _sun_terms(np, jd + t / 24.0) for t in _GUESSES}
+
+    sin_sunrise = np.float32(_sin(SUNRISE_ANGLE))
+    sin_fajr = np.float32(_sin(params["fajr"]))
+    sin_maghrib = np.float32(_sin(params.get("maghrib", SUNRISE_ANGLE)))
+    sin_isha = np.float32(_sin(params.get("isha", 18)))
+
+    out = np.empty((len(lats), len(dates)), dtype=TIMETABLE_DTYPE)
+    block = max(1, _BLOCK_CELLS // max(1, len(dates)))
+    for start in range(0, len(lats), block):
+        rows = slice(start, start + block)
+        lat = np.radians(lats[rows, None]).astype(np.float32)
+        lon = lons[rows, None].astype(np.float32)
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        dl = -lon / np.float32(360.0)
+        offset = offsets[rows] if offsets.shape[0] > 1 else offsets
+
+        def at(t):
+            s = suns[t]
+            return s["sin"] + s["dsin"] * dl, s["cos"] + s["dcos"] * dl, s["noon"] + s["dnoon"] * dl
+
+        sin_d, cos_d, noon = at(5)
+        fajr = _angle_time_np(np, sin_fajr, sin_d, cos_d, noon, sin_lat, cos_lat, ccw=True)
+        sin_d, cos_d, noon = at(6)
+        sunrise = _angle_time_np(np, sin_sunrise, sin_d, cos_d, noon, sin_lat, cos_lat, ccw=True, clamp=True)
+        _, _, dhuhr = at(12)
+
+        sin_d, cos_d, noon = at(13)
+        decl = suns[13]["decl"] + suns[13]["ddecl"] * dl
+        # sin(-arccot(y)) = -sign(y) / sqrt(1 + y^2)
+        y = factor + np.tan(np.abs(lat - decl))
+        sin_asr = np.copysign(1.0 / np.sqrt(1.0 + y * y), -y)
+        asr = _angle_time_np(np, sin_asr, sin_d, cos_d, noon, sin_lat, cos_lat, clamp=True)
+
+        sin_d, cos_d, noon = at(18)
+        sunset = _angle_time_np(np, sin_sunrise, sin_d, cos_d, noon, sin_lat, cos_lat, clamp=True)
+        maghrib = _angle_time_np(np, sin_maghrib, sin_d, cos_d, noon, sin_lat, cos_lat) if "maghrib" in params else sunset
+        isha = _angle_time_np(np, sin_isha, sin_d, cos_d, noon, sin_lat, cos_lat) if "isha" in params else None
+
+        shift = offset - lon / np.float32(15.0)
+        fajr, sunrise, dhuhr, asr, sunset = (t + shift for t in (fajr, sunrise, dhuhr, asr, sunset))
+        if "maghrib" in params:
+            maghrib = maghrib + shift
+        else:
+            maghrib = sunset
+        if isha is not None:
+            isha = isha + shift
+
+        night = np.clip(24.0 - (sunset - sunrise), 0.0, 24.0)
+        fajr = _adjust_high_lat_np(np, fajr, sunrise, params["fajr"], night, ccw=True)
+        if "isha" in params:
+            isha = _adjust_high_lat_np(np, isha, sunset, params["isha"], night)
+        if "maghrib" in params:
+            maghrib = _adjust_high_lat_np(np, maghrib, sunset, params["maghrib"], night)
+
+        if "maghrib_minutes" in params:
+            maghrib = sunset + params["maghrib_minutes"] / 60.0
+        if "isha_minutes" in params:
+            isha = maghrib + params["isha_minutes"] / 60.0
+        imsak = fajr - IMSAK_MINUTES / 60.0
+
+        if params.get("midnight") == "jafari":
+            night_span = np.mod(fajr - sunset, 24.0)
+        else:
+            night_span = night
+
+        hours = {
+            "Fajr": fajr, "Sunrise": sunrise, "Dhuhr": dhuhr, "Asr": asr,
+            "Sunset": sunset, "Maghrib": maghrib, "Isha": isha, "Imsak": imsak,
+            "Midnight": sunset + night_span / 2,
+            "Firstthird": sunset + night_span / 3,
+            "Lastthird": sunset + 2 * night_span / 3,
+        }
+        block_out = out[rows]
+        for key in TIMING_KEYS:
+            block_out[key] = np.broadcast_to(_to_minutes_np(np, hours[key]), block_out.shape)
+    return out
+
+# Shards per worker in compute_timetable_parallel, so a slow shard doesn't leave the others idle
+SHARDS_PER_WORKER = 4
+# Smaller shards cost more in process overhead than they save
+MIN_SHARD_CELLS = 1 << 16
+
+def _shard_tz(np, tz, rows, cols):
+    """The part of a compute_timetable tz argument that covers one shard"""
+    if tz is None or isinstance(tz, (str, int, float)):
+        return tz
+    offsets = np.asarray(tz, dtype=np.float64)
+    if offsets.ndim == 0:
+        return float(offsets)
+    if offsets.ndim == 1:
+        return offsets[rows[0]:rows[1]] if offsets.shape[0] > 1 else offsets
+    offsets = offsets[rows[0]:rows[1]] if offsets.shape[0] > 1 else offsets
+    return offsets[:, cols[0]:cols[1]] if offsets.shape[1] > 1 else offsets
+
+def _timetable_shard(path, rows, cols, lats, lons, dates, method, school, tz):
+    """Worker: computes one (locations x dates) block straight into the shared output file"""
+    import numpy as np
+
+    out = np.load(path, mmap_mode="r+")
+    out[rows[0]:rows[1], cols[0]:cols[1]] = compute_timetable(lats, lons, dates, method, school, tz)
+    out.flush()
+    return (rows[1] - rows[0]) * (cols[1] - cols[0])
+
+def compute_timetable_parallel(lats, lons, dates, method=2, school=0, tz=None, workers=None,
+                               path=None, shard_cells=None):
+    """
+    compute_timetable on a process pool, for grids too big for one core.
+    The (location x date) grid is cut into contiguous shards, and each worker
+    writes its shard into one memory-mapped .npy file; only shard bounds are
+    pickled back. Every shard has a fixed place in the output, so the result
+    is identical to compute_timetable whatever order the shards finish in.
+    With `path`, the file is kept there and returned as a read-only memmap
+    (for grids bigger than memory); otherwise a temporary file is read back
+    into an ordinary array and removed.
+    """
+    import os
+    import tempfile
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    dates = list(dates)
+    workers = workers or os.cpu_count() or 1
+    n_rows, n_cols = len(lats), len(dates)
+
+    # Whole rows where possible; a long range for few locations is split by date too
+    if shard_cells is None:
+        shard_cells = max(MIN_SHARD_CELLS, -(-n_rows * n_cols // (workers * SHARDS_PER_WORKER)))
+    cols_per_shard = max(1, min(n_cols, shard_cells))
+    rows_per_shard = max(1, shard_cells // cols_per_shard)
+    shards = [((r, min(r + rows_per_shard, n_rows)), (c, min(c + cols_per_shard, n_cols)))
+              for r in range(0, n_rows, rows_per_shard) for c in range(0, n_cols, cols_per_shard)]
+
+    temporary = path is None
+    if temporary:
+        fd, path = tempfile.mkstemp(suffix=".npy")
+        os.close(fd)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=TIMETABLE_DTYPE, shape=(n_rows, n_cols))
+    del out  # Header written; the workers fill in the rest
+
+    try:
+        jobs = [(path, rows, cols, lats[rows[0]:rows[1]], lons[rows[0]:rows[1]], dates[cols[0]:cols[1]],
+                 method, school, _shard_tz(np, tz, rows, cols)) for rows, cols in shards]
+        if workers == 1 or len(jobs) == 1:
+            for job in jobs:
+                _timetable_shard(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                # Raises the first worker error, if any
+                list(pool.map(_timetable_shard, *zip(*jobs)))
+        return np.load(path, mmap_mode=None if temporary else "r")
+    finally:
+        if temporary:
+            os.remove(path)
@@ -0,0 +1,179 @@
+import heapq
+import itertools
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+from clock import get_clock
+from clock_watch import ClockWatch
+
+# Minutes relative to the adhan: negative before it, 0 at it, positive for the iqamah
+DEFAULT_OFFSETS = (-15, 0)
+IQAMAH_MINUTES = 10
+# Reminders missed by more than this (asleep, suspended) are dropped rather than shown late
+LATE_GRACE = timedelta(minutes=5)
+# Fire just after the instant so the wall clock has definitely passed it
+SLACK_MS = 50
+
+Reminder = namedtuple("Reminder", "when location label prayer offset")
+
+def describe(reminder):
+    """Notification text, e.g. "Asr in 15 minutes" """
+    if reminder.offset < 0:
+        text = f"{reminder.prayer} in {-reminder.offset} minutes"
+    elif reminder.offset == 0:
+        text = f"Time for {reminder.prayer}"
+    else:
+        text = f"{reminder.prayer} iqamah"
+    return f"{text} ({reminder.label})" if reminder.label else text
+
+def _shifted(schedule, after, minutes):
+    """(when, prayer, minutes) for every prayer in the schedule shifted by `minutes`, after `after`"""
+    delta = timedelta(minutes=minutes)
+    for name, when in schedule.upcoming(after - delta):
+        yield when + delta, name, minutes
+
+class ReminderQueue:
+    """
+    Pending reminders for any number of locations in one heap. Each location
+    contributes one entry, its next reminder across all offsets (a lazy merge
+    of its DaySchedule), so popping and re-pushing is O(log n) in the number
+    of locations. Replacing a location's schedule (new timings, midnight)
+    leaves its old entry behind to be skipped, rather than searching the heap.
+    `now` is injectable so tests can drive it with a fake clock.
+    """
+
+    def __init__(self, offsets=DEFAULT_OFFSETS, now=datetime.now):
+        self.offsets = tuple(sorted(set(offsets)))
+        self.now = now
+        self.fired = 0
+        self.missed = 0
+        self._heap = []  # (when, seq, key, generation, (when, prayer, minutes))
+        self._locations = {}  # key -> (generation, events iterator, schedule, label)
+        self._seq = itertools.count()
+        self._generations = itertools.count()
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._locations)
+
+    def keys(self):
+        return list(self._locations)
+
+    def set_location(self, key, schedule, label=None):
+        """Adds a location or replaces its schedule"""
+        if key in self._locations:
+            self._stale += 1
+        events = heapq.merge(*(_shifted(schedule, self.now(), m) for m in self.offsets))
+        generation = next(self._generations)
+        self._locations[key] = (generation, events, schedule, label)
+        self._push(key, generation, events)
+        self._compact()
+
+    def remove_location(self, key):
+        if self._locations.pop(key, None) is not None:
+            self._stale += 1
+            self._compact()
+
+    def set_offsets(self, offsets):
+        """Changes the offsets for every location"""
+        self.offsets = tuple(sorted(set(offsets)))
+        for key, (_, _, schedule, label) in list(self._locations.items()):
+            self.set_location(key, schedule, label)
+
+    def _push(self, key, generation, events):
+        event = next(events, None)
+        if event is not None:
+            heapq.heappush(self._heap, (event[0], next(self._seq), key, generation, event))
+
+    def _valid(self, entry):
+        current = self._locations.get(entry[2])
+        return current is not None and current[0] == entry[3]
+
+    def _compact(self):
+        # Rebuild once skipped entries outnumber live ones
+        if self._stale > max(64, len(self._locations)):
+            self._heap = [entry for entry in self._heap if self._valid(entry)]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def next_time(self):
+        """When the earliest pending reminder is due, or None"""
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale = max(0, self._stale - 1)
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now=None):
+        """Pops every reminder due by now; those missed by more than LATE_GRACE are dropped"""
+        now = now or self.now()
+        reminders = []
+        while self.next_time() is not None and self._heap[0][0] <= now:
+            when, _, key, generation, (_, prayer, minutes) = heapq.heappop(self._heap)
+            _, events, _, label = self._locations[key]
+            self._push(key, generation, events)
+            if now - when > LATE_GRACE:
+                self.missed += 1
+                continue
+            self.fired += 1
+            reminders.append(Reminder(when, key, label, prayer, minutes))
+        return reminders
+
+class ReminderScheduler(QObject):
+    """
+    Emits `reminder` for each ReminderQueue entry as it falls due, using one
+    single-shot timer armed for the earliest one. Re-checks the wall clock
+    whenever `watch` (a ClockWatch) reports a resume or a clock change, so a
+    suspend never leaves it waiting on a stale timer.
+    """
+    reminder = pyqtSignal(object)
+
+    def __init__(self, parent=None, offsets=DEFAULT_OFFSETS, now=None, clock=None, watch=None):
+        super().__init__(parent)
+        clock = clock or get_clock()
+        self.queue = ReminderQueue(offsets, now or clock.now)
+        self.wakeups = 0
+        self.timer = clock.timer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._wake)
+
+        self.watch = watch or ClockWatch(self, clock=clock, now=self.queue.now)
+        self.watch.changed.connect(self._fire)
+
+    def set_locations(self, locations, offsets=None):
+        """
+        Replaces everything scheduled: `locations` maps a key to
+        (DaySchedule, label). Call again with new timings, e.g. at midnight.
+        """
+        if offsets is not None:
+            self.queue.offsets = tuple(sorted(set(offsets)))
+        for key in self.queue.keys():
+            if key not in locations:
+                self.queue.remove_location(key)
+        for key, (schedule, label) in locations.items():
+            self.queue.set_location(key, schedule, label)
+        self._arm()
+
+    def set_location(self, key, schedule, label=None):
+        """Adds or replaces one location's schedule, leaving the others as they are"""
+        self.queue.set_location(key, schedule, label)
+        self._arm()
+
+    def _arm(self):
+        when = self.queue.next_time()
+        if when is None:
+            self.timer.stop()
+            return
+        delay = (when - self.queue.now()).total_seconds()
+        self.timer.start(max(0, int(delay * 1000)) + SLACK_MS)
+
+    def _wake(self):
+        self.wakeups += 1
+        self._fire()
+
+    def _fire(self):
+        for reminder in self.queue.due():
+            self.reminder.emit(reminder)
+        self._arm()
@@ -0,0 +1,469 @@
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date, timedelta
+
+import gazetteer
+import metrics
+import prayer_api
+from clock import get_clock
+from day_schedule import DaySchedule
+
+# Clients find the service here; SALAH_SERVICE overrides it with a socket path or host:port.
+# One per machine, shared by every session: a Unix socket that only the service's
+# group may open, or where there are none a port that wants the secret in TOKEN_FILE
+if sys.platform == "win32":
+    SERVICE_DIR = os.path.join(os.environ.get("PROGRAMDATA") or "C:\\ProgramData", "SalahWidget")
+else:
+    SERVICE_DIR = os.path.join(tempfile.gettempdir(), "salah_service")
+DEFAULT_SOCKET = os.path.join(SERVICE_DIR, "salah_service.sock")
+DEFAULT_PORT = 8765
+# SALAH_SERVICE_TOKEN overrides it
+TOKEN_FILE = os.path.join(SERVICE_DIR, "service.token")
+# Seconds a client waits for an answer (a cold fetch can retry the API a few times)
+CLIENT_TIMEOUT = 30
+CONNECT_RETRIES = 20
+# Every widget using the service shares one geolocation for this long
+LOCATE_TTL = 3600
+
+def service_address():
+    """Unix socket path where available, else ("127.0.0.1", port)"""
+    address = os.environ.get("SALAH_SERVICE")
+    if address and ":" in address and not os.path.isabs(address):
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    if address:
+        return address
+    if hasattr(socket, "AF_UNIX"):
+        return DEFAULT_SOCKET
+    return "127.0.0.1", DEFAULT_PORT
+
+def token_file():
+    return os.environ.get("SALAH_SERVICE_TOKEN") or TOKEN_FILE
+
+def _check_folder(folder):
+    """Raises PermissionError unless folder is a directory only its owner can write to"""
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode) or info.st_mode & 0o022:
+        raise PermissionError(f"{folder} can be written by others")
+    return info
+
+def _check_socket(path):
+    """
+    Raises PermissionError unless path is a socket belonging to the owner of
+    its folder, and nobody else could have put it there
+    """
+    folder = _check_folder(os.path.dirname(os.path.abspath(path)))
+    info = os.lstat(path)
+    if not stat.S_ISSOCK(info.st_mode) or info.st_uid != folder.st_uid:
+        raise PermissionError(f"{path} is not the service's socket")
+
+def _group_id(group):
+    import grp
+    return grp.getgrnam(group).gr_gid if isinstance(group, str) else group
+
+def _day(value):
+    return date.fromisoformat(value) if value else None
+
+class Batcher:
+    """Runs one call per key at a time; requests for a key already running wait for that call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}  # key -> Future
+        self.calls = 0
+        self.joined = 0
+
+    def run(self, key, fn, *args):
+        with self._lock:
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+                self.calls += 1
+            else:
+                self.joined += 1
+        if owner:
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._running[key]
+        return future.result()
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    # On Windows SO_REUSEADDR would let another program bind the same port
+    allow_reuse_address = sys.platform != "win32"
+    request_queue_size = 1024  # Every session connects at login
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+class SalahService:
+    """
+    Headless owner of the cache and the network for every widget on the machine.
+    Speaks newline-delimited JSON: each request is {"op": ..., ...} and gets one
+    {"ok": true, ...} or {"ok": false, "error": ...} line back.
+    Only `group` (default the service's own) may connect: the Unix socket and
+    its folder are closed to everyone else, and over TCP every request carries
+    the token the service writes to a file only that group can read.
+    """
+
+    def __init__(self, address=None, group=None, token_path=None):
+        self.address = address or service_address()
+        self.group = group
+        self.token_path = token_path or token_file()
+        self.token = None  # Set for TCP
+        self.batcher = Batcher()
+        self.requests = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._location = None  # (result, monotonic time)
+        self._server = None
+        self.ops = {
+            "ping": self.ping,
+            "times": self.times,
+            "cached": self.cached,
+            "next": self.next_prayer,
+            "locate": self.locate,
+            "search": self.search,
+            "warm": self.warm,
+            "metrics": self.report_metrics,
+        }
+
+    def ping(self, msg):
+        return {"pid": os.getpid(), "requests": self.requests, "uptime": time.time() - self.started,
+                "calls": self.batcher.calls, "joined": self.batcher.joined}
+
+    def _times(self, lat, lon, day, method=None, school=None):
+        day = day or get_clock().today()
+        key = ("times", round(float(lat), 4), round(float(lon), 4), day, method, school)
+        return self.batcher.run(key, prayer_api.fetch_prayer_times, lat, lon, day, method, school)
+
+    def times(self, msg):
+        return {"timings": self._times(msg["lat"], msg["lon"], _day(msg.get("date")),
+                                       msg.get("method"), msg.get("school"))}
+
+    def cached(self, msg):
+        return {"timings": prayer_api.get_cached_prayer_times(msg["lat"], msg["lon"], _day(msg.get("date")),
+                                                              msg.get("method"), msg.get("school"))}
+
+    def next_prayer(self, msg):
+        now = get_clock().now()
+        today = now.date()
+        method, school = msg.get("method"), msg.get("school")
+        timings = self._times(msg["lat"], msg["lon"], today, method, school)
+        tomorrow = prayer_api.get_cached_prayer_times(msg["lat"], msg["lon"], today + timedelta(days=1),
+                                                      method, school)
+        schedule = DaySchedule(timings, today, tomorrow)
+        i, remaining = schedule.lookup(now)
+        return {"name": schedule.names[i], "time": schedule.times[i], "seconds": remaining}
+
+    def locate(self, msg):
+        if self._location is None or get_clock().monotonic() - self._location[1] > LOCATE_TTL:
+            self._location = (self.batcher.run(("locate",), prayer_api.get_location), get_clock().monotonic())
+        return {"location": self._location[0]}
+
+    def search(self, msg):
+        return {"location": self.batcher.run(("search", msg["query"]), prayer_api.search_location, msg["query"])}
+
+    def warm(self, msg):
+        days = [date.fromisoformat(d) for d in msg["days"]] if msg.get("days") else None
+        locations = [tuple(loc) for loc in msg["locations"]]
+        return {"fetched": prayer_api.warm_cache(locations, days)}
+
+    def report_metrics(self, msg):
+        return {"metrics": metrics.snapshot()}
+
+    def handle(self, msg):
+        """Answers one decoded request"""
+        with self._lock:
+            self.requests += 1
+        if self.token and not hmac.compare_digest(str(msg.get("token", "")), self.token):
+            metrics.count("service.refused")
+            return {"ok": False, "error": "not authorized"}
+        op = self.ops.get(msg.get("op"))
+        if op is None:
+            return {"ok": False, "error": f"unknown op {msg.get('op')!r}"}
+        try:
+            with metrics.timer("service." + msg["op"]):
+                return dict(op(msg), ok=True)
+        except Exception as e:
+            metrics.count("service.errors")
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def start(self):
+        """Binds the socket and serves on a background thread"""
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            # TCP only; Unix sockets have no Nagle to disable
+            disable_nagle_algorithm = not isinstance(self.address, str)
+
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        reply = service.handle(json.loads(line))
+                    except ValueError as e:
+                        reply = {"ok": False, "error": f"bad request: {e}"}
+                    try:
+                        self.wfile.write(json.dumps(reply).encode() + b"\n")
+                    except OSError:
+                        return  # Client went away
+
+        if isinstance(self.address, str):
+            server = self._bind_unix(Handler)
+        else:
+            server = _TCPServer(self.address, Handler)
+            self.address = server.server_address
+            self._write_token()
+        self._server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def _owned(self, path, mode):
+        """Gives path to the service's group with `mode`"""
+        if self.group is not None:
+            os.chown(path, -1, _group_id(self.group))
+        os.chmod(path, mode)
+
+    def _folder(self, path):
+        """Creates path's folder for the group to read, or checks nobody else can write to it"""
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder, mode=0o700)
+            self._owned(folder, 0o750)  # The group may reach the socket, not add files
+        try:
+            info = _check_folder(folder)
+            if info.st_uid != os.getuid():
+                raise PermissionError(f"{folder} belongs to another user")
+        except PermissionError as e:
+            raise RuntimeError(f"Not serving from {folder}: {e}")
+
+    def _bind_unix(self, handler):
+        self._folder(self.address)
+        if os.path.lexists(self.address):
+            try:
+                _check_socket(self.address)
+            except PermissionError as e:
+                raise RuntimeError(f"Not replacing {self.address}: {e}")
+        if os.path.lexists(self.address):
+            if ServiceClient.connect(self.address):
+                raise RuntimeError(f"A service is already running on {self.address}")
+            os.remove(self.address)  # Left behind by a service that died
+        # Nobody outside the group may connect, from the moment it exists
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixServer(self.address, handler)
+        finally:
+            os.umask(old_umask)
+        self._owned(self.address, 0o660)
+        return server
+
+    def _write_token(self):
+        """Writes a new secret that clients must send with every request"""
+        self.token = secrets.token_hex(16)
+        if hasattr(os, "getuid"):
+            self._folder(self.token_path)
+        else:
+            # Windows: whoever may read the folder (ProgramData: local users, unless narrowed) may connect
+            os.makedirs(os.path.dirname(os.path.abspath(self.token_path)), exist_ok=True)
+        tmp = self.token_path + ".tmp"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        # O_EXCL: never through a file or link someone else left there
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.token)
+        if hasattr(os, "getuid"):
+            self._owned(tmp, 0o640)
+        os.replace(tmp, self.token_path)
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        if self.token and os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        prayer_api.get_cache().flush()
+
+class ServiceError(Exception):
+    """The service answered a request with an error"""
+
+class ServiceClient:
+    """
+    Connection to a running salah_service. Has the same functions as prayer_api
+    (fetch_prayer_times, get_location, ...), so the widget can use either; if
+    the service goes away it carries on with prayer_api directly.
+    """
+
+    def __init__(self, address=None, timeout=CLIENT_TIMEOUT, token_path=None):
+        self.address = address or service_address()
+        self.timeout = timeout
+        self.token_path = token_path or token_file()
+        self.token = None  # Read from token_path on the first TCP connection
+        self._local = threading.local()  # One connection per thread
+
+    @classmethod
+    def connect(cls, address=None, timeout=0.5, token_path=None):
+        """Returns a client if a service answers at the address and lets us in, else None"""
+        client = cls(address, timeout, token_path)
+        try:
+            client.call("ping")
+        except (OSError, ValueError, ServiceError):
+            return None
+        finally:
+            client.close()
+        client.timeout = CLIENT_TIMEOUT
+        return client
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+            if family == socket.AF_UNIX:
+                _check_socket(self.address)  # Another user's "service" could answer with anything
+            elif self.token is None:
+                # Unreadable unless we are in the service's group
+                with open(self.token_path) as f:
+                    self.token = f.read().strip()
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            for attempt in range(CONNECT_RETRIES):
+                try:
+                    sock.connect(self.address)
+                    break
+                except BlockingIOError:
+                    # Unix socket backlog full: the service is busy accepting
+                    if attempt == CONNECT_RETRIES - 1:
+                        sock.close()
+                        raise
+                    time.sleep(0.01 * (attempt + 1))
+                except OSError:
+                    sock.close()
+                    raise
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    def call(self, op, **params):
+        """Sends one request and returns the decoded reply"""
+        sock, reader = self._connection()
+        try:
+            if self.token:
+                params["token"] = self.token
+            sock.sendall(json.dumps(dict(params, op=op)).encode() + b"\n")
+            line = reader.readline()
+        except OSError:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise ConnectionError("Service closed the connection")
+        reply = json.loads(line)
+        if not reply.pop("ok"):
+            if reply["error"] == "not authorized":
+                self.token = None  # Read again: a restarted service has a new one
+            raise ServiceError(reply["error"])
+        return reply
+
+    def _call_or_local(self, local, op, **params):
+        try:
+            return self.call(op, **params), None
+        except (OSError, ServiceError) as e:
+            print(f"Salah service couldn't answer ({e}), working locally")
+            return None, local()
+
+    def fetch_prayer_times(self, lat, lon, day=None, method=None, school=None):
+        reply, local = self._call_or_local(lambda: prayer_api.fetch_prayer_times(lat, lon, day, method, school),
+                                           "times", lat=lat, lon=lon, date=day and day.isoformat(),
+                                           method=method, school=school)
+        return reply["timings"] if reply else local
+
+    def get_cached_prayer_times(self, lat, lon, day=None, method=None, school=None):
+        reply, local = self._call_or_local(lambda: prayer_api.get_cached_prayer_times(lat, lon, day, method, school),
+                                           "cached", lat=lat, lon=lon, date=day and day.isoformat(),
+                                           method=method, school=school)
+        return reply["timings"] if reply else local
+
+    def get_location(self):
+        reply, local = self._call_or_local(prayer_api.get_location, "locate")
+        return tuple(reply["location"]) if reply else local
+
+    def search_location(self, query):
+        reply, local = self._call_or_local(lambda: prayer_api.search_location(query), "search", query=query)
+        if reply:
+            return tuple(reply["location"]) if reply["location"] else None
+        return local
+
+    def warm_cache(self, locations, days=None):
+        reply, local = self._call_or_local(lambda: prayer_api.warm_cache(locations, days), "warm",
+                                           locations=[list(loc) for loc in locations],
+                                           days=days and [d.isoformat() for d in days])
+        return reply["fetched"] if reply else local
+
+    def next_prayer(self, lat, lon, method=None, school=None):
+        """Returns (name, "HH:MM", seconds remaining) from the service"""
+        reply = self.call("next", lat=lat, lon=lon, method=method, school=school)
+        return reply["name"], reply["time"], reply["seconds"]
+
+def main():
+    # python salah_service.py [--socket PATH | --port N] [--group NAME] [--cache-dir DIR]
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve prayer times to local Salah widgets")
+    parser.add_argument("--socket", help=f"Unix socket path (default {DEFAULT_SOCKET})")
+    parser.add_argument("--port", type=int, help="Listen on 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument("--group", help="Group allowed to use the service (default the service's own)")
+    parser.add_argument("--token-file", help=f"Where --port writes the secret clients send (default {TOKEN_FILE})")
+    parser.add_argument("--cache-dir", help="Directory for the shared prayer cache")
+    parser.add_argument("--metrics", action="store_true", help="Collect metrics (read them with the metrics op)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        prayer_api.CACHE_FILE = os.path.join(args.cache_dir, "prayer_cache.json")
+        prayer_api.CACHE_DB = os.path.join(args.cache_dir, "prayer_cache.db")
+        gazetteer.GAZETTEER_INDEX = os.path.join(args.cache_dir, "gazetteer.idx")
+    address = ("127.0.0.1", args.port) if args.port else args.socket
+    try:
+        service = SalahService(address, args.group, args.token_file).start()
+    except (OSError, RuntimeError, KeyError) as e:
+        print(f"Failed to start Salah service: {e}")
+        sys.exit(1)
+    print(f"Salah service listening on {service.address}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import atexit
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import metrics
+
+APP_NAME = "SalahWidget"
+SETTINGS_NAME = "settings.json"
+# Where settings.json and completions.bin lived before the per-user directory: next to the scripts
+LEGACY_DIR = os.path.dirname(os.path.abspath(__file__))
+LEGACY_FILES = [os.path.join(LEGACY_DIR, SETTINGS_NAME)]
+
+def config_dir():
+    """Per-user settings folder: SALAH_CONFIG_DIR, else the platform's usual place"""
+    override = os.environ.get("SALAH_CONFIG_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, APP_NAME)
+
+def cache_dir():
+    """Per-user folder for files rebuilt when missing: SALAH_CONFIG_DIR, else the platform's cache folder"""
+    override = os.environ.get("SALAH_CONFIG_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, APP_NAME)
+
+def settings_path():
+    return os.path.join(config_dir(), SETTINGS_NAME)
+
+def _moved(legacy, path, suffixes=()):
+    # Unless SALAH_CONFIG_DIR chose the folder (tests, benchmarks), an older version's file is moved in once
+    if not os.environ.get("SALAH_CONFIG_DIR") and not os.path.exists(path) and os.path.exists(legacy):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            for suffix in ("",) + tuple(suffixes):
+                if os.path.exists(legacy + suffix):
+                    shutil.move(legacy + suffix, path + suffix)
+            print(f"Moved {legacy} to {path}")
+        except OSError as e:
+            print(f"Couldn't move {legacy}: {e}")
+            return legacy
+    return path
+
+def user_file(name, suffixes=()):
+    """
+    Path of `name` in the config directory. A copy left next to the scripts by
+    older versions is moved there first, with the files named `name` + each of `suffixes`.
+    """
+    return _moved(os.path.join(LEGACY_DIR, name), os.path.join(config_dir(), name), suffixes)
+
+def cache_file(name, suffixes=()):
+    """Like user_file(), in the cache directory, for files older versions kept in the working directory"""
+    return _moved(os.path.abspath(name), os.path.join(cache_dir(), name), suffixes)
+
+def _location(loc):
+    """A cleaned copy of a saved location, or None if it can't be used"""
+    if not isinstance(loc, dict) or not isinstance(loc.get("name"), str) or not loc["name"]:
+        return None
+    try:
+        lat, lon = float(loc["lat"]), float(loc["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    clean = dict(loc, lat=lat, lon=lon)
+    # A bad method or school falls back to the defaults, like a location saved without one
+    if type(clean.get("method", 0)) is not int:
+        del clean["method"]
+    if clean.get("school", 0) not in (0, 1) or type(clean.get("school", 0)) is not int:
+        del clean["school"]
+    return clean
+
+def validate(data):
+    """
+    A cleaned copy of settings: unusable locations are dropped and bad
+    reminder options left to their defaults. Raises ValueError when no
+    location is usable at all.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("settings are not a JSON object")
+    saved = data.get("saved_locations")
+    saved = [l for l in map(_location, saved if isinstance(saved, list) else []) if l]
+    active = _location(data.get("active_location"))
+    if active is None:
+        if not saved:
+            raise ValueError("no usable location")
+        active = saved[0]
+    clean = dict(data, active_location=active, saved_locations=saved or [active])
+
+    reminders = data.get("reminders")
+    if reminders is not None:
+        reminders = dict(reminders) if isinstance(reminders, dict) else {}
+        offsets = reminders.get("offsets")
+        if not isinstance(offsets, list) or any(type(o) is not int for o in offsets):
+            reminders.pop("offsets", None)
+        if not isinstance(reminders.get("all_locations", False), bool):
+            del reminders["all_locations"]
+        clean["reminders"] = reminders
+    return clean
+
+class SettingsStore:
+    """
+    settings.json as one in-memory dict that every part of the widget shares.
+    Reads never touch the disk. Changes go through set()/update(), which
+    validate them, tell listeners straight away and batch the write: every
+    change within `save_delay` seconds goes to disk together, atomically
+    (temp file + rename) on a background thread.
+    A file that doesn't parse or validate is set aside as settings.json.corrupt
+    and the previous good copy (settings.json.bak) is loaded instead; with
+    neither, `defaults` are used (and `loaded` is False).
+    """
+
+    def __init__(self, path=None, defaults=None, save_delay=0.5, legacy=()):
+        self.path = path or settings_path()
+        self.save_delay = save_delay
+        self.stats = {"writes": 0, "recovered": 0}
+
+        self._data = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps an older snapshot from landing after a newer one
+        self._dirty = False
+        self._timer = None
+        self.loaded = self._load(legacy)
+        if not self.loaded and defaults is not None:
+            self._data = validate(defaults)  # Written once something changes
+        atexit.register(self.flush)
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with metrics.timer("io.settings_load"), open(path, 'r', encoding="utf-8") as f:
+                return validate(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Settings read error in {path}: {e}")
+            if path == self.path:
+                try:
+                    os.replace(path, path + ".corrupt")
+                except OSError:
+                    pass
+            return None
+
+    def _load(self, legacy):
+        for path in [self.path, self.path + ".bak", *legacy]:
+            data = self._read(path)
+            if data is None:
+                continue
+            self._data = data
+            if path != self.path:
+                print(f"Settings loaded from {path}")
+                self.stats["recovered"] += 1
+                with self._lock:
+                    self._mark_dirty()
+            return True
+        return False
+
+    def __getitem__(self, key):
+        # Shared, not copied: change settings with set() so listeners hear about it
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def add_listener(self, callback):
+        """callback(key, value) after each top-level key changes, on the thread that changed it"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    def update(self, changes):
+        """Applies several changes as one; returns True if anything changed"""
+        with self._lock:
+            changed = {k: copy.deepcopy(v) for k, v in changes.items() if self._data.get(k) != v}
+            if not changed:
+                return False
+            # Bad values are a bug in the caller, not something to write
+            clean = validate(dict(self._data, **changed))
+            for key, value in changed.items():
+                if clean.get(key) != value:
+                    raise ValueError(f"Invalid setting {key}: {value!r}")
+            self._data = clean
+            self._mark_dirty()
+        for key in changed:
+            for callback in list(self._listeners):
+                callback(key, self._data[key])
+        return True
+
+    def _mark_dirty(self):
+        # Called with the lock held; one pending save batches every change
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Writes pending changes to disk now"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                snapshot = json.dumps(self._data, indent=4)
+            tmp_path = None
+            try:
+                folder = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(folder, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".settings", suffix=".tmp")
+                with metrics.timer("io.settings_save"):
+                    with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                        f.write(snapshot)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    # Until the rename below, the .bak is what a crash leaves to load
+                    if os.path.exists(self.path):
+                        os.replace(self.path, self.path + ".bak")
+                    os.replace(tmp_path, self.path)
+                self.stats["writes"] += 1
+            except Exception as e:
+                print(f"Settings write error: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
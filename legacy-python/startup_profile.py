@@ -0,0 +1,61 @@
+import builtins
+import sys
+import threading
+import time
+
+class StartupProfiler:
+    """
+    Startup measurement mode (python main.py --startup-profile).
+    Times every first-time import, broken down by top-level package, and the
+    time from process start to the widget's first paint, then quits.
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.self_times = {}   # top-level package -> seconds spent in its own imports
+        self._stack = []
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Background fetches import the network stack; only the startup path counts
+        if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+            return self._original_import(name, globals, locals, fromlist, level)
+        began = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            children = self._stack.pop()
+            elapsed = time.perf_counter() - began
+            package = name.split(".")[0]
+            self.self_times[package] = self.self_times.get(package, 0.0) + elapsed - children
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def watch_first_paint(self, window):
+        from PyQt6.QtCore import QObject, QEvent, QTimer
+
+        profiler = self
+
+        class PaintWatcher(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    window.removeEventFilter(self)
+                    first_paint = time.perf_counter() - profiler.start
+                    # Report once this paint has completed
+                    QTimer.singleShot(0, lambda: profiler.report(first_paint))
+                return False
+
+        self._watcher = PaintWatcher()
+        window.installEventFilter(self._watcher)
+
+    def report(self, first_paint):
+        from PyQt6.QtWidgets import QApplication
+
+        builtins.__import__ = self._original_import
+        print(f"Time to first paint: {first_paint * 1000:.1f} ms")
+        print(f"Import time: {sum(self.self_times.values()) * 1000:.1f} ms")
+        for package, seconds in sorted(self.self_times.items(), key=lambda kv: -kv[1])[:15]:
+            print(f"  {package:<20} {seconds * 1000:8.1f} ms")
+        QApplication.quit()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from clock import get_clock
+from clock_watch import ClockWatch, JUMP_TOLERANCE
+from day_schedule import DaySchedule
+
+# Fire just after the boundary so the clock has definitely rolled over
+SLACK_MS = 50
+
+def next_change(now, timings=None):
+    """
+    Next instant anything the widget shows changes: the HH:mm clock and the
+    minute countdown roll over on the minute, plus the next prayer and midnight.
+    `timings` is a DaySchedule or a raw timings dict.
+    """
+    candidates = [now.replace(second=0, microsecond=0) + timedelta(minutes=1),
+                  datetime.combine(now.date() + timedelta(days=1), datetime.min.time())]
+    if timings:
+        schedule = timings if isinstance(timings, DaySchedule) else DaySchedule(timings, now.date())
+        _, remaining = schedule.lookup(now)
+        candidates.append(now + timedelta(seconds=remaining))
+    return min(candidates)
+
+class TickScheduler(QObject):
+    """
+    Emits `tick` only when the visible text can change, using one single-shot
+    timer armed for exactly that instant instead of polling every second.
+    Timers count monotonic time, which stops while the machine sleeps, so it
+    re-arms whenever `watch` (a ClockWatch, shared with the reminders) reports
+    a resume or a clock change: at once when the platform reports it, else
+    when the pending tick comes due late (reported to the watch in turn).
+    """
+    tick = pyqtSignal()
+
+    def __init__(self, parent=None, timings=None, now=None, clock=None, watch=None):
+        super().__init__(parent)
+        # A SimulatedClock drives both the time read and the timer
+        self.clock = clock or get_clock()
+        self.timings = timings
+        self.now = now or self.clock.now
+        self.ticks = 0
+        self.resyncs = 0
+        self._started = self.clock.monotonic()
+        self._armed_wall = None
+        self._armed_mono = None
+
+        self.timer = self.clock.timer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._fire)
+
+        self.watch = watch or ClockWatch(self, clock=self.clock, now=self.now)
+        self.watch.changed.connect(self.resync)
+
+    def start(self):
+        self._arm()
+
+    def set_timings(self, timings):
+        """The next prayer may have moved; re-arm for the new schedule"""
+        self.timings = timings
+        self._arm()
+
+    def _arm(self):
+        now = self.now()
+        delay = (next_change(now, self.timings) - now).total_seconds()
+        self._armed_wall = now.timestamp()
+        self._armed_mono = self.clock.monotonic()
+        self.timer.start(max(0, int(delay * 1000)) + SLACK_MS)
+
+    def _fire(self):
+        # A suspend or clock change shows up as the two clocks drifting apart
+        wall = self.now().timestamp() - self._armed_wall
+        mono = self.clock.monotonic() - self._armed_mono
+        if abs(wall - mono) > JUMP_TOLERANCE:
+            self.watch.notify()  # Resyncs, and tells the reminders too
+            return
+        self.ticks += 1
+        self.tick.emit()
+        self._arm()
+
+    def resync(self):
+        """Refreshes now and re-arms, e.g. after a resume"""
+        if self._armed_wall is None:
+            return  # Not started
+        self.resyncs += 1
+        self.ticks += 1
+        self.tick.emit()
+        self._arm()
+
+    @property
+    def wakeups(self):
+        """Timer wake-ups: every tick, and every clock comparison of the watch"""
+        return self.ticks + self.watch.wakeups
+
+    def wakeups_per_hour(self):
+        hours = (self.clock.monotonic() - self._started) / 3600
+        return self.wakeups / hours if hours else 0.0
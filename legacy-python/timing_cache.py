@@ -0,0 +1,175 @@
+import atexit
+import calendar
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import metrics
+from clock import get_clock
+
+def key_expiry(key):
+    """
+    Last date an entry is useful for. Keys end in "YYYY-MM-DD" for single days
+    or "YYYY-MM" for prefetched month tables.
+    """
+    parts = key.rsplit(",", 1)[-1].split("-")
+    try:
+        year, month = int(parts[0]), int(parts[1])
+        if len(parts) > 2:
+            return date(year, month, int(parts[2]))
+        return date(year, month, calendar.monthrange(year, month)[1])
+    except (ValueError, IndexError):
+        return None
+
+class TimingCache:
+    """
+    Process-wide in-memory cache of prayer timings backed by prayer_cache.json.
+    Lookups never touch the disk; writes are batched and flushed atomically
+    (temp file + rename) after `flush_delay` seconds.
+    Entries expire `ttl_days` after the date in their key (None keeps them).
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, path, capacity=32, policy="lru", ttl_days=1, flush_delay=2.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.path = path
+        self.capacity = capacity
+        self.policy = policy
+        self.ttl_days = ttl_days
+        self.flush_delay = flush_delay
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "writes": 0}
+
+        self._entries = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps an older snapshot from landing after a newer one
+        self._dirty = False
+        self._timer = None
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with metrics.timer("io.cache_load"), open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Cache read error: {e}")
+            return
+
+        # Files list entries most recent first
+        entries = []
+        if "locations" in data:
+            entries = data["locations"]
+        elif "key" in data: # Old single-object format
+            entries = [data]
+        # Month tables written before the cache kept them alongside days
+        for c in data.get("calendars", []):
+            entries.append({"key": c["key"], "data": {"fields": c["fields"], "days": c["days"]}})
+
+        for entry in reversed(entries):
+            if "key" in entry and not self._expired(entry["key"]):
+                self._entries[entry["key"]] = entry["data"]
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def _expired(self, key):
+        if self.ttl_days is None:
+            return False
+        expiry = key_expiry(key)
+        return expiry is not None and expiry < get_clock().today() - timedelta(days=self.ttl_days)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None and self._expired(key):
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self._mark_dirty()
+                data = None
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._mark_dirty()
+
+    def latest(self, location, since, until):
+        """
+        Most recent cached timings for a "lat,lon" location dated between
+        `since` and `until`, for serving stale data while the API is down.
+        """
+        best, best_date = None, None
+        with self._lock:
+            for key, data in self._entries.items():
+                if not key.startswith(location + ","):
+                    continue
+                when = key_expiry(key)
+                if when is None or not since <= when <= until or (best_date and when <= best_date):
+                    continue
+                if "days" in data:
+                    # Month table: its last day
+                    best = dict(zip(data["fields"], data["days"][-1]))
+                else:
+                    best = data
+                best_date = when
+        return best
+
+    def _mark_dirty(self):
+        # Called with the lock held; one pending flush batches every change
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Writes pending changes to disk now"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                snapshot = {"locations": [{"key": k, "data": v} for k, v in reversed(self._entries.items())]}
+            tmp_path = None
+            try:
+                folder = os.path.dirname(os.path.abspath(self.path))
+                fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".prayer_cache", suffix=".tmp")
+                with metrics.timer("io.cache_write"):
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(snapshot, f)
+                    os.replace(tmp_path, self.path)
+                with self._lock:
+                    self.stats["writes"] += 1
+            except Exception as e:
+                print(f"Cache write error: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self._dirty = True  # Still unsaved: the next flush, or the one at exit, tries again
+
+    def close(self):
+        """Flushes and stops flushing at exit, for a cache that is being replaced"""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def __len__(self):
+        return len(self._entries)
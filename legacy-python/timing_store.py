@@ -0,0 +1,175 @@
+import calendar
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import metrics
+
+# Coordinates are stored as integers at the same 4 decimal precision as the cache keys
+QUANTUM = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timings (
+    lat_q INTEGER NOT NULL,
+    lon_q INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    method INTEGER NOT NULL,
+    school INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (lat_q, lon_q, date, method, school)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def parse_key(key):
+    """
+    Splits "lat,lon,method-school,YYYY-MM-DD" (or a "...,YYYY-MM" month key)
+    into (lat_q, lon_q, method, school, when). Keys from before methods were
+    part of them ("lat,lon,YYYY-MM-DD") give None for method and school.
+    """
+    parts = key.split(",")
+    method = school = None
+    if len(parts) == 4:
+        method, school = map(int, parts[2].split("-"))
+    return round(float(parts[0]) * QUANTUM), round(float(parts[1]) * QUANTUM), method, school, parts[-1]
+
+class SqliteTimingStore:
+    """
+    Single-file SQLite store for timings of many locations and dates.
+    Drop-in alternative to TimingCache: same get/put/flush interface and keys,
+    but every day is its own row, indexed on (lat, lon, date, method, school).
+    Keys without a method use the store's `method` and `school`.
+    """
+
+    def __init__(self, path, method=2, json_path=None, school=0):
+        self.path = path
+        self.method = method
+        self.school = school
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._upgrade()
+        if json_path:
+            self._migrate_json(json_path)
+
+    def _upgrade(self):
+        """Creates the tables, adding the school column to stores from before it existed"""
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(timings)")]
+        if columns and "school" not in columns:
+            # Part of the primary key, so the table is rebuilt; old rows were all Shafi
+            self._db.executescript(
+                "ALTER TABLE timings RENAME TO timings_old;" + SCHEMA +
+                "INSERT INTO timings SELECT lat_q, lon_q, date, method, 0, data FROM timings_old;"
+                "DROP TABLE timings_old;")
+        else:
+            self._db.executescript(SCHEMA)
+
+    def _key(self, key):
+        lat_q, lon_q, method, school, when = parse_key(key)
+        if method is None:
+            method, school = self.method, self.school
+        return lat_q, lon_q, method, school, when
+
+    def _migrate_json(self, json_path):
+        """Imports an existing prayer_cache.json once"""
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'migrated_json'").fetchone()
+        if row or not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Cache read error: {e}")
+            return
+
+        entries = []
+        if "locations" in data:
+            entries = data["locations"]
+        elif "key" in data: # Old single-object format
+            entries = [data]
+        for c in data.get("calendars", []):
+            entries.append({"key": c["key"], "data": {"fields": c["fields"], "days": c["days"]}})
+
+        self.put_many((e["key"], e["data"]) for e in entries if "key" in e)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_json', ?)", (json_path,))
+
+    def _rows(self, key, data):
+        lat_q, lon_q, method, school, when = self._key(key)
+        if len(when) > 7:
+            return [(lat_q, lon_q, when, method, school, json.dumps(data))]
+        # Month table: one row per day
+        fields = data["fields"]
+        return [(lat_q, lon_q, f"{when}-{i + 1:02d}", method, school, json.dumps(dict(zip(fields, day))))
+                for i, day in enumerate(data["days"])]
+
+    @metrics.timed("io.store_read")
+    def get(self, key):
+        lat_q, lon_q, method, school, when = self._key(key)
+        if len(when) > 7:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT data FROM timings WHERE lat_q = ? AND lon_q = ? AND date = ? AND method = ? "
+                    "AND school = ?", (lat_q, lon_q, when, method, school)).fetchone()
+            result = json.loads(row[0]) if row else None
+        else:
+            result = self._month_table(lat_q, lon_q, method, school, when)
+        self.stats["hits" if result else "misses"] += 1
+        return result
+
+    def _month_table(self, lat_q, lon_q, method, school, month):
+        year, mon = map(int, month.split("-"))
+        rows = self._query(lat_q, lon_q, method, school, f"{month}-01", f"{month}-31")
+        # Only a complete month can stand in for the calendar endpoint
+        if len(rows) != calendar.monthrange(year, mon)[1]:
+            return None
+        days = [json.loads(data) for _, data in rows]
+        fields = list(days[0])
+        return {"fields": fields, "days": [[d[f] for f in fields] for d in days]}
+
+    def _query(self, lat_q, lon_q, method, school, start, end):
+        with self._lock:
+            return self._db.execute(
+                "SELECT date, data FROM timings WHERE lat_q = ? AND lon_q = ? AND date BETWEEN ? AND ? "
+                "AND method = ? AND school = ? ORDER BY date",
+                (lat_q, lon_q, start, end, method, school)).fetchall()
+
+    def query_range(self, lat, lon, start, end, method=None, school=None):
+        """Returns [(date, timings), ...] for one location between two dates (inclusive)"""
+        rows = self._query(round(float(lat) * QUANTUM), round(float(lon) * QUANTUM),
+                           self.method if method is None else method, self.school if school is None else school,
+                           start.isoformat(), end.isoformat())
+        return [(date.fromisoformat(d), json.loads(data)) for d, data in rows]
+
+    def latest(self, location, since, until):
+        """Most recent timings for a "lat,lon" (or "lat,lon,method-school") location dated between `since` and `until`"""
+        lat_q, lon_q, method, school, _ = self._key(location + ",")
+        rows = self._query(lat_q, lon_q, method, school, since.isoformat(), until.isoformat())
+        return json.loads(rows[-1][1]) if rows else None
+
+    def put(self, key, data):
+        self.put_many([(key, data)])
+
+    @metrics.timed("io.store_write")
+    def put_many(self, items):
+        """Upserts many (key, data) pairs in one transaction"""
+        rows = [row for key, data in items for row in self._rows(key, data)]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO timings VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.stats["writes"] += 1
+
+    def flush(self):
+        # Every put is committed immediately
+        pass
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM timings").fetchone()[0]
@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import metrics
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call to a host that is known to be down"""
+
+class CircuitBreaker:
+    """
+    Per-host breaker: after `failure_threshold` consecutive failures the host is
+    skipped for `reset_timeout` seconds, then a single trial call is let through.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+class Transport:
+    """
+    Shared HTTP layer for prayer_api: one pooled keep-alive session, bounded
+    exponential backoff with full jitter, a circuit breaker per host and
+    latency/failure counters per endpoint.
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, retries=2, backoff=0.5, max_backoff=8.0, pool_size=4,
+                 failure_threshold=3, reset_timeout=60.0, sleep=time.sleep):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self.breakers = {}
+        self.endpoints = {}
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Created on first use so importing this module stays cheap
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def _stats(self, endpoint):
+        # Called with the lock held
+        return self.endpoints.setdefault(endpoint, {
+            "calls": 0, "failures": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0, "last_error": None})
+
+    def _reject(self, endpoint):
+        with self._lock:
+            self._stats(endpoint)["rejected"] += 1
+
+    def _record(self, endpoint, elapsed, error=None):
+        metrics.observe("net." + endpoint, elapsed)
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed * 1000
+            stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+            if error:
+                stats["failures"] += 1
+                stats["last_error"] = error
+
+    def metrics(self):
+        """Returns {endpoint: {calls, failures, rejected, avg_ms, max_ms, last_error}}"""
+        with self._lock:
+            result = {}
+            for endpoint, stats in self.endpoints.items():
+                result[endpoint] = dict(stats, avg_ms=stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0)
+            result["breakers"] = {host: b.state for host, b in self.breakers.items()}
+            return result
+
+    def _delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, host, endpoint, fn, failed=None):
+        """
+        Runs fn() against `host` with retries and the host's breaker.
+        `failed(result)` can flag a returned result as a failure (for geocoder,
+        which reports errors instead of raising them).
+        """
+        breaker = self.breaker(host)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                self._reject(endpoint)
+                raise CircuitOpenError(f"{host} is unavailable") from last_error
+            start = time.perf_counter()
+            try:
+                result, last_error = fn(), None
+                error = failed(result) if failed else None
+            except Exception as e:
+                result, error, last_error = None, str(e), e
+            self._record(endpoint, time.perf_counter() - start, error)
+            if not error:
+                breaker.record_success()
+                return result
+            breaker.record_failure()
+            if attempt < self.retries:
+                self.sleep(self._delay(attempt))
+        if last_error is not None:
+            raise last_error
+        return result
+
+    def get(self, url, params=None, timeout=10, endpoint=None):
+        """GET through the pooled session; retries connection errors, timeouts and 5xx/429"""
+        host = urlparse(url).netloc
+        endpoint = endpoint or host + urlparse(url).path
+
+        def failed(response):
+            if response.status_code in self.RETRY_STATUS:
+                return f"HTTP {response.status_code}"
+            return None
+
+        return self.call(host, endpoint, lambda: self.session.get(url, params=params, timeout=timeout), failed)
+
+_transport = Transport()
+
+def get_transport():
+    """Returns the process-wide Transport"""
+    return _transport
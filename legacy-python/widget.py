@@ -1,16 +1,46 @@
 import sys
-import json
 import os
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QFrame, QApplication, QMenu, QInputDialog, QMessageBox,
-                             QWidgetAction, QPushButton)
-from PyQt6.QtCore import Qt, QTimer, QTime, QPoint, QDate, QEvent
-from PyQt6.QtGui import QFont, QColor, QPalette, QAction
-from prayer_api import (get_location, fetch_prayer_times, get_next_prayer, 
-                        format_countdown, search_location)
-from datetime import datetime
+                             QFrame, QApplication, QMenu, QMessageBox,
+                             QWidgetAction, QPushButton, QDialog, QDialogButtonBox,
+                             QLineEdit, QCompleter, QTableWidget, QTableWidgetItem,
+                             QAbstractItemView, QHeaderView, QSystemTrayIcon, QStyle)
+from PyQt6.QtCore import Qt, QPoint, QEvent, QStringListModel
+from PyQt6.QtGui import QFont, QColor, QPalette, QAction, QPainter
+import metrics
+import prayer_api
+from prayer_api import format_countdown, compute_prayer_times, DEFAULT_LOCATION, METHOD, SCHOOL
+from prayer_calc import METHODS, compute_methods
+from completion_log import CompletionLog
+from settings_store import SettingsStore, LEGACY_FILES, user_file
+from clock import get_clock
+from clock_watch import ClockWatch
+from painted_view import PaintedView
+from reminders import ReminderScheduler, DEFAULT_OFFSETS, IQAMAH_MINUTES, describe
+from salah_service import ServiceClient
+from fetch_service import FetchService
+from tick_scheduler import TickScheduler
+from day_schedule import DaySchedule
+from gazetteer import get_gazetteer, normalize
+from datetime import date, datetime, time, timedelta
 
-SETTINGS_FILE = "settings.json"
+# None: settings.json in the per-user config directory (settings_store.config_dir)
+SETTINGS_FILE = None
+# None: completions.bin in the same directory
+COMPLETIONS_FILE = None
+# Completion rates in the list footer cover this many days
+STATS_DAYS = 30
+PRAYERS = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+# Single letters match too many cities to be worth listing
+MIN_COMPLETION = 2
+# Tomorrow's timings for every saved location are fetched this long before midnight
+TOMORROW_LEAD_MINUTES = 45
+# Offered in the Reminders menu; settings.json may list any other offsets
+REMINDER_CHOICES = [("15 Minutes Before", -15), ("At Adhan", 0), (f"At Iqamah (+{IQAMAH_MINUTES} min)", IQAMAH_MINUTES)]
+
+def new_location(name, lat, lon, method=METHOD, school=SCHOOL):
+    """A saved location as stored in settings.json"""
+    return {"name": name, "lat": lat, "lon": lon, "method": method, "school": school}
 
 STYLES = {
     "container": """
@@ -32,6 +62,7 @@ STYLES = {
     "next_time_label": "color: #ffffff; font-size: 48px; font-weight: bold;",
     "countdown_label": "color: rgba(255, 255, 255, 0.7); font-size: 20px; font-weight: 500;",
     "separator": "background-color: rgba(255, 255, 255, 0.1); max-height: 1px;",
+    "stats_label": "color: rgba(255, 255, 255, 0.5); font-size: 11px; margin-top: 4px;",
     "menu": """
         QMenu { background-color: #1a1a1f; color: white; border: 1px solid #333; border-radius: 8px; padding: 5px; }
         QMenu::item { padding: 8px 25px; border-radius: 4px; }
@@ -50,41 +81,76 @@ class ClickableLabel(QLabel):
                 self.parent_widget.show_location_menu()
             event.accept()
 
+# Row fonts and palettes are built once and shared by every PrayerRow, so a
+# state change is a setFont/setPalette rather than a stylesheet re-parse
+_ROW_STYLES = {}
+
+def _row_style(is_next, is_completed):
+    key = (is_next, is_completed)
+    if key not in _ROW_STYLES:
+        font = QFont()
+        font.setPixelSize(16)
+        font.setWeight(QFont.Weight.Bold if is_next else QFont.Weight.Normal)
+        name_font = QFont(font)
+        name_font.setStrikeOut(is_completed)
+        palette = QPalette()
+        palette.setColor(QPalette.ColorRole.WindowText, QColor("#ffffff" if is_next else "#bbbbbb"))
+        _ROW_STYLES[key] = (name_font, font, palette)
+    return _ROW_STYLES[key]
+
+ROW_HIGHLIGHT = QColor(255, 255, 255, 25)
+
 class PrayerRow(QWidget):
     def __init__(self, name, time_str, is_next=False, is_completed=False, toggle_callback=None):
         super().__init__()
         self.name = name
         self.toggle_callback = toggle_callback
-        self.is_completed = is_completed
+        self.is_next = None
+        self.is_completed = None
         
         layout = QHBoxLayout()
         layout.setContentsMargins(15, 8, 15, 8)
         self.setLayout(layout)
         
-        color = "#ffffff" if is_next else "#bbbbbb"
-        font_weight = QFont.Weight.Bold if is_next else QFont.Weight.Normal
-        
         self.name_label = QLabel(name)
-        self.update_style(color, font_weight)
-        
-        time_label = QLabel(time_str)
-        time_label.setStyleSheet(f"color: {color}; font-size: 16px; font-weight: {font_weight.value};")
-        time_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.time_label = QLabel(time_str)
+        self.time_label.setAlignment(Qt.AlignmentFlag.AlignRight)
         
         layout.addWidget(self.name_label)
         layout.addStretch()
-        layout.addWidget(time_label)
-        
-        if is_next:
-            self.setStyleSheet("background-color: rgba(255, 255, 255, 0.1); border-radius: 10px;")
+        layout.addWidget(self.time_label)
         
+        self.set_state(time_str, is_next, is_completed)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
 
-    def update_style(self, color, font_weight):
-        style = f"color: {color}; font-size: 16px; font-weight: {font_weight.value};"
-        if self.is_completed:
-            style += " text-decoration: line-through;"
-        self.name_label.setStyleSheet(style)
+    def set_state(self, time_str, is_next, is_completed):
+        """Updates the row in place; returns True if anything visible changed"""
+        changed = False
+        if self.time_label.text() != time_str:
+            self.time_label.setText(time_str)
+            changed = True
+        if (is_next, is_completed) != (self.is_next, self.is_completed):
+            name_font, time_font, palette = _row_style(is_next, is_completed)
+            self.name_label.setFont(name_font)
+            self.name_label.setPalette(palette)
+            self.time_label.setFont(time_font)
+            self.time_label.setPalette(palette)
+            if is_next != self.is_next:
+                self.update()  # Repaint the highlight
+            self.is_next = is_next
+            self.is_completed = is_completed
+            changed = True
+        if changed:
+            metrics.count("widget.row_updates")
+        return changed
+
+    def paintEvent(self, event):
+        if self.is_next:
+            painter = QPainter(self)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(ROW_HIGHLIGHT)
+            painter.drawRoundedRect(self.rect(), 10, 10)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -143,43 +209,189 @@ class LocationMenuItem(QWidget):
         self.select_cb()
         self.parent_menu.close()
 
+class LocationDialog(QDialog):
+    """City name input with autocomplete from the offline gazetteer"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add Location")
+        self.choices = {}  # completion label -> (lat, lon, name)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Enter city name:"))
+
+        self.edit = QLineEdit()
+        self.model = QStringListModel(self)
+        completer = QCompleter(self.model, self)
+        # The gazetteer already ranked and filtered the list
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.edit.setCompleter(completer)
+        self.edit.textEdited.connect(self.update_completions)
+        layout.addWidget(self.edit)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def update_completions(self, text):
+        if len(normalize(text)) < MIN_COMPLETION:
+            self.choices = {}
+        else:
+            self.choices = dict(get_gazetteer().completions(text))
+        self.model.setStringList(list(self.choices))
+        if self.choices:
+            self.edit.completer().complete()
+
+    def text(self):
+        return self.edit.text().strip()
+
+    def selection(self):
+        """(lat, lon, name) if the text is one of the completions, else None"""
+        return self.choices.get(self.text())
+
+def location_schedules(api, locations, today):
+    """
+    DaySchedules for (name, lat, lon, method, school) locations, from the cache
+    or a local calculation. Runs on a FetchService thread.
+    """
+    schedules = {}
+    for name, lat, lon, method, school in locations:
+        # Warmed up in the background; a local calculation until then
+        timings = (api.get_cached_prayer_times(lat, lon, today, method, school)
+                   or compute_prayer_times(lat, lon, today, method=method, school=school))
+        tomorrow = api.get_cached_prayer_times(lat, lon, today + timedelta(days=1), method, school)
+        schedules[name] = DaySchedule(timings, today, tomorrow)
+    return schedules
+
+class MethodComparisonDialog(QDialog):
+    """Today's times for every calculation method at one location, computed locally"""
+    COLUMNS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Asr (Hanafi)", "Maghrib", "Isha"]
+
+    def __init__(self, city, lat, lon, method, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Calculation Methods - {city}")
+        self.methods = list(METHODS)
+        # Every method and both schools from one solar calculation
+        times = compute_methods(lat, lon)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(len(self.methods), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setVerticalHeaderLabels([METHODS[m]["name"] for m in self.methods])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        for row, m in enumerate(self.methods):
+            shafi, hanafi = times[m, 0], times[m, 1]
+            values = [shafi["Fajr"], shafi["Sunrise"], shafi["Dhuhr"], shafi["Asr"], hanafi["Asr"],
+                      shafi["Maghrib"], shafi["Isha"]]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row, col, item)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.selectRow(self.methods.index(method))
+        self.table.doubleClicked.connect(self.accept)
+        layout.addWidget(self.table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.button(QDialogButtonBox.StandardButton.Ok).setText("Use Selected")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.resize(760, 520)
+
+    def selected_method(self):
+        return self.methods[self.table.currentRow()]
+
 class SalahWidget(QWidget):
-    def __init__(self):
+    def __init__(self, painted=False, clock=None):
         super().__init__()
-        self.completed_prayers = set()
-        self.last_date = QDate.currentDate()
+        # One QPainter-drawn view instead of the tree of styled labels (main.py --painted)
+        self.painted = painted
+        # Every time read and timer goes through the clock, so a SimulatedClock can fast-forward it
+        self.clock = clock or get_clock()
+        # Completion history for every day so far; writes go to disk in the background
+        self.completions = CompletionLog(COMPLETIONS_FILE or user_file("completions.bin", (".log",)))
+        self.last_date = self.clock.today()
+        self.completed_prayers = self.completions.completed(self.last_date)
+
+        self.fetcher = FetchService(self)
+        # Tells the ticker and the reminders when the machine resumes or the clock is set
+        self.clock_watch = ClockWatch(self, clock=self.clock)
+        # Armed for the earliest pending reminder; rebuilt whenever the schedule is
+        self.reminders = ReminderScheduler(self, clock=self.clock, watch=self.clock_watch)
+        self.reminders.reminder.connect(self.show_reminder)
+        self.tray = None
+        # A running salah_service owns the cache and the network; otherwise do it ourselves
+        self.api = ServiceClient.connect() or prayer_api
+        # What the service answered for (lat, lon, day, method, school); it is never asked on this thread
+        self.service_times = {}
 
+        # Paint straight away from disk (or a local calculation), the network comes later
         self.load_settings()
-        self.prayer_times = fetch_prayer_times(self.lat, self.lon)
+        self.prayer_times = (self.cached_times(self.lat, self.lon, None, self.method, self.school)
+                             or compute_prayer_times(self.lat, self.lon, self.last_date, method=self.method,
+                                                  school=self.school))
         self.init_ui()
+        self.clock.single_shot(0, self.refresh_data)
         
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_times)
-        self.timer.start(1000)
+        # Wakes up only when the visible text changes (about once a minute)
+        self.ticker = TickScheduler(self, self.schedule, clock=self.clock, watch=self.clock_watch)
+        self.ticker.tick.connect(self.update_times)
+        self.ticker.start()
         
-        self.api_timer = QTimer(self)
+        self.api_timer = self.clock.timer(self)
         self.api_timer.timeout.connect(self.refresh_data)
-        self.api_timer.start(3600000) 
+        self.api_timer.start(3600000)
+
+        # Every saved location, today (and tomorrow late in the evening), so
+        # switching location and crossing midnight are cache hits
+        self.clock.single_shot(0, lambda: self.warm_up(self.seconds_to_tomorrow_prefetch() <= 0))
+        self.tomorrow_timer = self.clock.timer(self)
+        self.tomorrow_timer.setSingleShot(True)
+        self.tomorrow_timer.timeout.connect(self.prefetch_tomorrow)
+        self.schedule_tomorrow_prefetch() 
 
     def load_settings(self):
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                self.settings = json.load(f)
-        else:
-            # Auto-detect on first run
-            lat, lon, city = get_location()
-            self.settings = {
-                "active_location": {"name": city, "lat": lat, "lon": lon},
-                "saved_locations": [{"name": city, "lat": lat, "lon": lon}]
-            }
-            self.save_settings()
-        
-        loc = self.settings["active_location"]
+        lat, lon, city = DEFAULT_LOCATION
+        defaults = {"active_location": new_location(city, lat, lon),
+                    "saved_locations": [new_location(city, lat, lon)]}
+        # Saved in the background; other parts listen for changes rather than re-reading it
+        self.settings = SettingsStore(SETTINGS_FILE, defaults, legacy=() if SETTINGS_FILE else LEGACY_FILES)
+        if not self.settings.loaded:
+            # Auto-detect on first run, in the background; start from the default
+            self.fetcher.request("locate", "locate", self.api.get_location, (), self.on_location_detected)
+        self.settings.add_listener(self.on_settings_changed)
+        self.use_location(self.settings["active_location"])
+
+    def use_location(self, loc):
         self.lat, self.lon, self.city = loc["lat"], loc["lon"], loc["name"]
+        # Locations saved before methods were per location use the defaults
+        self.method = loc.get("method", METHOD)
+        self.school = loc.get("school", SCHOOL)
+        if self.method not in METHODS:
+            print(f"Unknown calculation method {self.method} for {self.city}, using {METHOD}")
+            self.method = METHOD
+
+    def on_location_detected(self, res, error=None):
+        if not res:
+            return  # Still on the default location
+        lat, lon, city = res
+        loc = new_location(city, lat, lon)
+        default = new_location(DEFAULT_LOCATION[2], DEFAULT_LOCATION[0], DEFAULT_LOCATION[1])
+        saved = self.settings["saved_locations"]
+        # Locations added while detection ran are kept; only the untouched default is replaced
+        if saved == [default]:
+            self.settings.set("saved_locations", [loc])
+        elif all(s["name"] != loc["name"] for s in saved):
+            self.settings.set("saved_locations", saved + [loc])
+        if self.settings["active_location"] == default:
+            self.set_active_location(loc)
 
-    def save_settings(self):
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+    def on_settings_changed(self, key, value):
+        if key == "reminders" or (key == "saved_locations" and self.reminder_settings()["all_locations"]):
+            self.schedule_reminders()
 
     def init_ui(self):
         # Removed WindowStaysOnTopHint as requested
@@ -189,7 +401,35 @@ class SalahWidget(QWidget):
         self.main_layout = QVBoxLayout()
         self.main_layout.setContentsMargins(20, 20, 20, 20)
         self.setLayout(self.main_layout)
+
+        if self.painted:
+            self.init_painted_ui()
+        else:
+            self.init_widget_ui()
+        self.update_stats()
+        
+        # Initial State: Hidden
+        self.expanded = False
+        self.list_container.setVisible(False)
         
+        self.update_times()
+        self.setFixedWidth(320)
+        self.resize(320, self.minimumSizeHint().height())
+
+    def init_painted_ui(self):
+        self.view = PaintedView(self, self.city.upper())
+        self.main_layout.addWidget(self.view)
+        # The view's texts and rows take the same calls as the labels and PrayerRows
+        self.city_label = self.view.city_label
+        self.clock_label = self.view.clock_label
+        self.next_name_label = self.view.next_name_label
+        self.next_time_label = self.view.next_time_label
+        self.countdown_label = self.view.countdown_label
+        self.stats_label = self.view.stats_label
+        self.prayer_rows = self.view.prayer_rows
+        self.list_container = self.view.list_container
+
+    def init_widget_ui(self):
         self.container = QFrame()
         self.container.setObjectName("Container")
         self.container.setStyleSheet(STYLES["container"])
@@ -254,13 +494,18 @@ class SalahWidget(QWidget):
         self.list_layout.setSpacing(5)
         self.list_layout.setContentsMargins(0, 0, 0, 0)
         self.container.layout().addWidget(self.list_container)
-        
-        # Initial State: Hidden
-        self.expanded = False
-        self.list_container.setVisible(False)
-        
-        self.update_times()
-        self.setFixedWidth(320)
+
+        # Created once; update_times changes them in place
+        self.prayer_rows = []
+        for p in PRAYERS:
+            row = PrayerRow(p, "--:--", toggle_callback=self.toggle_prayer_completion)
+            self.prayer_rows.append(row)
+            self.list_layout.addWidget(row)
+
+        self.stats_label = QLabel()
+        self.stats_label.setStyleSheet(STYLES["stats_label"])
+        self.stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.list_layout.addWidget(self.stats_label)
 
     def toggle_expanded(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -275,6 +520,7 @@ class SalahWidget(QWidget):
             QApplication.processEvents()
             self.adjustSize()
             self.setFixedWidth(320)  # Ensure width stays consistent
+            metrics.count("widget.relayouts")
             event.accept()
 
     def contextMenuEvent(self, event):
@@ -283,10 +529,27 @@ class SalahWidget(QWidget):
             QMenu { background-color: #1e1e24; color: white; border: 1px solid #333; }
             QMenu::item:selected { background-color: #3e3e4a; }
         """)
+        # Only offered while metrics are being collected (--metrics / SALAH_METRICS)
+        dump_action = menu.addAction("Dump Metrics") if metrics.enabled() else None
+        reminder_menu = menu.addMenu("Reminders")
+        reminder_menu.setStyleSheet(STYLES["menu"])
+        prefs = self.reminder_settings()
+        for label, offset in REMINDER_CHOICES:
+            action = reminder_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(offset in prefs["offsets"])
+            action.triggered.connect(lambda checked, o=offset: self.set_reminder_option(offset=o))
+        reminder_menu.addSeparator()
+        all_action = reminder_menu.addAction("All Saved Locations")
+        all_action.setCheckable(True)
+        all_action.setChecked(prefs["all_locations"])
+        all_action.triggered.connect(lambda checked: self.set_reminder_option(all_locations=checked))
         quit_action = menu.addAction("Quit")
         action = menu.exec(event.globalPos())
         if action == quit_action:
             QApplication.quit()
+        elif action is not None and action == dump_action:
+            print(f"Metrics written to {metrics.dump()}")
 
     def show_location_menu(self):
         menu = QMenu(self)
@@ -310,90 +573,283 @@ class SalahWidget(QWidget):
         menu.addSeparator()
         add_action = menu.addAction("+ Add New Location")
         add_action.triggered.connect(self.add_location_dialog)
+
+        # Calculation settings of the active location
+        menu.addSeparator()
+        method_menu = menu.addMenu("Calculation Method")
+        method_menu.setStyleSheet(STYLES["menu"])
+        for method, params in METHODS.items():
+            action = method_menu.addAction(params["name"])
+            action.setCheckable(True)
+            action.setChecked(method == self.method)
+            action.triggered.connect(lambda checked, m=method: self.set_location_method(method=m))
+        hanafi_action = menu.addAction("Hanafi Asr")
+        hanafi_action.setCheckable(True)
+        hanafi_action.setChecked(self.school == 1)
+        hanafi_action.triggered.connect(lambda checked: self.set_location_method(school=int(checked)))
+        compare_action = menu.addAction("Compare Methods...")
+        compare_action.triggered.connect(self.compare_methods)
         
         menu.exec(self.city_label.mapToGlobal(QPoint(0, self.city_label.height())))
 
     def set_active_location(self, loc):
-        self.settings["active_location"] = loc
-        self.lat, self.lon, self.city = loc["lat"], loc["lon"], loc["name"]
+        self.settings.set("active_location", loc)
+        self.use_location(loc)
         self.city_label.setText(self.city.upper())
-        self.save_settings()
+        # Warmed up in the background, so usually there is nothing to wait for
+        cached = self.cached_times(self.lat, self.lon, None, self.method, self.school)
+        if cached:
+            self.on_prayer_times(cached)
         self.refresh_data()
 
+    def set_location_method(self, method=None, school=None):
+        """Changes the calculation method and/or Asr school of the active location"""
+        loc = dict(self.settings["active_location"],
+                   method=self.method if method is None else method,
+                   school=self.school if school is None else school)
+        # active_location is a copy of its saved entry, not the same dict
+        self.settings.set("saved_locations", [loc if saved["name"] == loc["name"] else saved
+                                              for saved in self.settings["saved_locations"]])
+        self.set_active_location(loc)
+
+    def compare_methods(self):
+        dialog = MethodComparisonDialog(self.city, self.lat, self.lon, self.method, self)
+        if dialog.exec() and dialog.selected_method() != self.method:
+            self.set_location_method(method=dialog.selected_method())
+
+    def warm_up(self, tomorrow=False):
+        """Fetches every saved location in the background"""
+        today = self.clock.today()
+        days = [today, today + timedelta(days=1)] if tomorrow else [today]
+        locations = [(l["lat"], l["lon"], l.get("method", METHOD), l.get("school", SCHOOL))
+                     for l in self.settings["saved_locations"]]
+        key = f"warm:{days[-1]}:{locations}"
+        self.fetcher.request("warm", key, self.api.warm_cache, (locations, days), self.on_warmed)
+
+    def on_warmed(self, fetched, error=None):
+        # Tomorrow may be cached now; the schedule uses it after Isha
+        self.service_times.clear()
+        self.build_schedule()
+        self.ticker.set_timings(self.schedule)
+        self.schedule_reminders()
+
+    def seconds_to_tomorrow_prefetch(self):
+        now = self.clock.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        return (midnight - timedelta(minutes=TOMORROW_LEAD_MINUTES) - now).total_seconds()
+
+    def schedule_tomorrow_prefetch(self):
+        seconds = self.seconds_to_tomorrow_prefetch()
+        if seconds <= 0:
+            seconds += 24 * 3600  # Already past tonight's; startup warm-up covered it
+        self.tomorrow_timer.start(int(seconds * 1000))
+
+    def prefetch_tomorrow(self):
+        self.warm_up(tomorrow=True)
+        self.schedule_tomorrow_prefetch()
+
     def add_location_dialog(self):
-        city_name, ok = QInputDialog.getText(self, "Add Location", "Enter city name:")
-        if ok and city_name:
-            res = search_location(city_name)
-            if res:
-                lat, lon, name = res
-                new_loc = {"name": name, "lat": lat, "lon": lon}
-                # Check if already exists
-                if not any(l["name"] == name for l in self.settings["saved_locations"]):
-                    self.settings["saved_locations"].append(new_loc)
-                    self.set_active_location(new_loc)
-                else:
-                    self.set_active_location(next(l for l in self.settings["saved_locations"] if l["name"] == name))
+        dialog = LocationDialog(self)
+        if dialog.exec() and dialog.text():
+            match = dialog.selection()
+            if match:
+                self.on_location_found(match)
             else:
-                QMessageBox.warning(self, "Error", "Could not find location.")
+                # Typed without picking a completion: the gazetteer, then the network geocoder
+                city_name = dialog.text()
+                self.fetcher.request("search", f"search:{city_name}", self.api.search_location, (city_name,),
+                                     self.on_location_found)
+
+    def on_location_found(self, res, error=None):
+        if res:
+            lat, lon, name = res
+            new_loc = new_location(name, lat, lon)
+            # Check if already exists
+            if not any(l["name"] == name for l in self.settings["saved_locations"]):
+                self.settings.set("saved_locations", self.settings["saved_locations"] + [new_loc])
+                self.set_active_location(new_loc)
+            else:
+                self.set_active_location(next(l for l in self.settings["saved_locations"] if l["name"] == name))
+        else:
+            QMessageBox.warning(self, "Error", "Could not find location.")
 
     def delete_location(self, index):
-        loc_to_del = self.settings["saved_locations"].pop(index)
+        saved = list(self.settings["saved_locations"])
+        loc_to_del = saved.pop(index)
+        self.settings.set("saved_locations", saved)
         if self.settings["active_location"]["name"] == loc_to_del["name"]:
             # Switch to first available
-            self.set_active_location(self.settings["saved_locations"][0])
-        else:
-            self.save_settings()
+            self.set_active_location(saved[0])
 
     def refresh_data(self):
-        self.prayer_times = fetch_prayer_times(self.lat, self.lon)
+        # Runs in the background; switching location again makes this request stale
+        key = f"{self.lat},{self.lon},{self.method}-{self.school},{self.clock.today().isoformat()}"
+        self.fetcher.request("times", key, self.api.fetch_prayer_times,
+                             (self.lat, self.lon, None, self.method, self.school), self.on_prayer_times)
+
+    def on_prayer_times(self, timings, error=None):
+        if timings:
+            if self.api is not prayer_api:
+                self.service_times[(self.lat, self.lon, self.clock.today(), self.method, self.school)] = timings
+            self.prayer_times = timings
+            self.ticker.set_timings(self.schedule)
         self.update_times()
 
     def toggle_prayer_completion(self, prayer_name):
-        if prayer_name in self.completed_prayers:
-            self.completed_prayers.remove(prayer_name)
-        else:
-            self.completed_prayers.add(prayer_name)
+        today = self.clock.today()
+        self.completions.toggle(today, prayer_name)
+        self.completed_prayers = self.completions.completed(today)
+        self.update_stats()
         self.update_times()
 
+    def update_stats(self):
+        # Streak and rates are O(log n) lookups, cheap enough for every toggle
+        today = self.clock.today()
+        rates = self.completions.rates(STATS_DAYS, today)
+        average = sum(rates.values()) / len(rates)
+        self.stats_label.setText(f"Streak: {self.completions.streak(today)} days  ·  "
+                                 f"{STATS_DAYS}-day: {average:.0%}")
+
+    @property
+    def prayer_times(self):
+        return self._prayer_times
+
+    @prayer_times.setter
+    def prayer_times(self, timings):
+        self._prayer_times = timings
+        self.build_schedule()
+
+    def cached_times(self, lat, lon, day, method, school):
+        """
+        Cached timings without blocking the GUI thread: prayer_api's in-memory
+        cache, or with a service what it has already answered. A service miss is
+        asked for in the background and the schedule rebuilt when it answers.
+        """
+        if self.api is prayer_api:
+            return prayer_api.get_cached_prayer_times(lat, lon, day, method, school)
+        key = (lat, lon, day or self.clock.today(), method, school)
+        job = f"cached:{key}"
+        if key not in self.service_times and not self.fetcher.is_pending(job):
+            # A channel per key: asking for another day or location doesn't cancel this one
+            self.fetcher.request(job, job, self.api.get_cached_prayer_times, key,
+                                 lambda timings, error: self.on_service_times(key, timings))
+        return self.service_times.get(key)
+
+    def on_service_times(self, key, timings):
+        self.service_times[key] = timings  # A miss too, until the next warm-up or day
+        if not timings:
+            return
+        if key == (self.lat, self.lon, self.clock.today(), self.method, self.school):
+            self.on_prayer_times(timings)
+        else:
+            # Tomorrow's, or another location's for its reminders
+            self.build_schedule()
+            self.ticker.set_timings(self.schedule)
+
+    def build_schedule(self):
+        # Parsed once here rather than on every tick, with tomorrow's when cached
+        metrics.count("widget.schedule_builds")
+        if self._prayer_times:
+            today = self.clock.today()
+            tomorrow = self.cached_times(self.lat, self.lon, today + timedelta(days=1), self.method, self.school)
+            self.schedule = DaySchedule(self._prayer_times, today, tomorrow)
+        else:
+            self.schedule = None
+        self.schedule_active_reminders()
+
+    def reminder_settings(self):
+        # settings.json files from before reminders get the defaults
+        return dict({"offsets": list(DEFAULT_OFFSETS), "all_locations": False}, **self.settings.get("reminders", {}))
+
+    def schedule_active_reminders(self):
+        """Re-arms the active location's reminders alone, whenever its schedule changes"""
+        prefs = self.reminder_settings()
+        if not prefs["all_locations"]:
+            self.reminders.set_locations({self.city: (self.schedule, None)} if self.schedule else {},
+                                         prefs["offsets"])
+        elif self.schedule:
+            self.reminders.set_location(self.city, self.schedule, self.city)
+
+    def schedule_reminders(self):
+        """
+        Re-arms reminders for the active location, or every saved one. The other
+        locations' schedules are built in the background, so this runs only when
+        settings change, after a warm-up and at midnight.
+        """
+        prefs = self.reminder_settings()
+        if not prefs["all_locations"]:
+            self.schedule_active_reminders()
+            return
+        today = self.clock.today()
+        locations = [(l["name"], l["lat"], l["lon"], l.get("method", METHOD), l.get("school", SCHOOL))
+                     for l in self.settings["saved_locations"]]
+        self.fetcher.request("reminders", f"reminders:{today}:{prefs['offsets']}:{locations}", location_schedules,
+                             (self.api, locations, today), self.on_location_schedules)
+
+    def on_location_schedules(self, schedules, error=None):
+        prefs = self.reminder_settings()
+        if not schedules or not prefs["all_locations"]:
+            return
+        locations = {name: (schedule, name) for name, schedule in schedules.items()}
+        if self.schedule:
+            locations[self.city] = (self.schedule, self.city)
+        self.reminders.set_locations(locations, prefs["offsets"])
+
+    def set_reminder_option(self, offset=None, all_locations=None):
+        prefs = self.reminder_settings()
+        if offset is not None:
+            offsets = set(prefs["offsets"]) ^ {offset}
+            prefs["offsets"] = sorted(offsets)
+        if all_locations is not None:
+            prefs["all_locations"] = all_locations
+        # on_settings_changed re-arms the reminders
+        self.settings.set("reminders", prefs)
+
+    def show_reminder(self, reminder):
+        text = describe(reminder)
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray is None:
+                icon = self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxInformation)
+                self.tray = QSystemTrayIcon(icon, self)
+                self.tray.show()
+            self.tray.showMessage("Salah", text)
+        # Flashes the taskbar entry where there is no tray
+        QApplication.alert(self)
+
+    @metrics.timed("widget.update_times")
     def update_times(self):
-        now = QDate.currentDate()
-        if now != self.last_date:
-            self.completed_prayers.clear()
-            self.last_date = now
+        now = self.clock.now()
+        if now.date() != self.last_date:
+            self.last_date = now.date()
+            self.completed_prayers = self.completions.completed(self.last_date)
+            self.update_stats()
+            self.service_times.clear()
+            # Prefetched before midnight, so normally already in the cache
+            cached = self.cached_times(self.lat, self.lon, None, self.method, self.school)
+            if cached:
+                self.prayer_times = cached
+                self.ticker.set_timings(self.schedule)
+            self.schedule_reminders()
             self.refresh_data()  # Fetch new times for the new day
 
-        curr_time = QTime.currentTime().toString("HH:mm")
+        curr_time = now.strftime("%H:%M")
         self.clock_label.setText(curr_time)
         
-        if not self.prayer_times:
+        if not self.schedule:
             return
             
-        next_p_name, next_p_datetime = get_next_prayer(self.prayer_times)
-        remaining = next_p_datetime - datetime.now()
+        i, remaining = self.schedule.lookup(now)
+        next_p_name = self.schedule.names[i]
         
         self.next_name_label.setText(next_p_name.upper())
-        self.next_time_label.setText(next_p_datetime.strftime("%H:%M"))
+        self.next_time_label.setText(self.schedule.times[i])
         self.countdown_label.setText(format_countdown(remaining))
         
-        # Only populate the list if expanded
+        # Rows are only touched while the list is visible
         if self.expanded:
-            for i in reversed(range(self.list_layout.count())): 
-                widget = self.list_layout.itemAt(i).widget()
-                if widget:
-                    widget.setParent(None)
-                
-            prayers = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
-            for p in prayers:
-                p_time = self.prayer_times[p]
-                is_next = (p == next_p_name)
-                is_completed = (p in self.completed_prayers)
-                self.list_layout.addWidget(PrayerRow(p, p_time, is_next, is_completed, self.toggle_prayer_completion))
-            
-            self.list_container.show()
-        else:
-            self.list_container.hide()
-            
-        self.resize(320, self.minimumSizeHint().height())
+            for row in self.prayer_rows:
+                row.set_state(self.prayer_times[row.name], row.name == next_p_name,
+                              row.name in self.completed_prayers)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton: